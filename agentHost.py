@@ -0,0 +1,187 @@
+# agentHost.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs a team's agents in a process of their own.
+
+With catchExceptions, Game.run stops an agent that overruns its move with a
+SIGALRM timer, or, off the main thread, by no longer waiting for the call,
+which it leaves running in a thread of its own.  Neither stops the agent's
+computation for good: the timer can only interrupt Python code, and the
+abandoned thread keeps using the CPU.  A hosted team plays from a child
+process instead, and the child is killed outright when a call runs out of
+time, so an agent stuck inside C code can not hang or slow the match.
+
+loadAgents here takes the same arguments as capture.loadAgents and returns
+stand-ins for the team's agents.  Both agents of a team share one host, so
+state they share in their module (a team coordinator, say) still works.
+A host that was killed is started again by the next call setting up a
+game, i.e. at the start of the next game.  Hosted agents can not draw on the
+graphics display.
+
+  python capture.py -r myTeam -b staffTeam -c --hostAgents
+  python batchRunner.py -r myTeam -b staffTeam -c --hostAgents -n 20
+"""
+
+import multiprocessing, os, sys, traceback
+
+import capture
+from util import TimeoutFunctionException
+
+def serve(conn, isRed, factory, args, quiet):
+  "The body of a host process: loads the team, then answers calls until the pipe closes"
+  if quiet:
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+  agents = capture.loadAgents(isRed, factory, True, args)
+  if None in agents:
+    conn.send(None)
+    return
+  conn.send([agent.index for agent in agents])
+  observations = {}
+  # Each registerBlackboard call brings its own copy of the game's
+  # blackboard; the first agent to register in a game starts the one the
+  # team shares
+  blackboard, onBlackboard = None, set()
+  while True:
+    try:
+      position, name, args = conn.recv()
+    except EOFError:
+      return
+    agent = agents[position]
+    try:
+      args = [observations.pop(position) if isinstance(arg, RemoteObservation) else arg for arg in args]
+      if name == 'observationFunction':
+        # Keep the observation here; Game.run only hands it back to getAction
+        observations[position] = agent.observationFunction(*args) if hasattr(agent, name) else args[0]
+        result = RemoteObservation()
+      elif name == 'registerBlackboard':
+        if blackboard == None or position in onBlackboard:
+          blackboard, onBlackboard = args[0], set()
+        onBlackboard.add(position)
+        result = agent.registerBlackboard(blackboard) if hasattr(agent, name) else None
+      elif hasattr(agent, name):
+        result = getattr(agent, name)(*args)
+      else:
+        result = None
+      conn.send(('ok', result))
+    except Exception:
+      conn.send(('error', traceback.format_exc()))
+
+class RemoteObservation:
+  "Stands in, in the game's process, for an observation kept in the host"
+  pass
+
+# The calls that set up a game, and so may start a host that was killed
+STARTUP_CALLS = ('registerTeam', 'registerBlackboard', 'registerInitialState')
+
+class TeamHost:
+  """
+  A child process running one team's agents.
+  """
+  def __init__(self, isRed, factory, args, quiet = False):
+    self.isRed = isRed
+    self.factory = factory
+    self.args = args
+    self.quiet = quiet
+    self.process = None
+    self.indices = self.start()
+
+  def start(self):
+    "Starts the host; returns the indices of its agents, or None if the team could not be loaded"
+    self.conn, child = multiprocessing.Pipe()
+    self.process = multiprocessing.Process(target=serve, args=(child, self.isRed, self.factory, self.args, self.quiet),
+                                           daemon=True)
+    self.process.start()
+    child.close()
+    try:
+      indices = self.conn.recv()
+    except EOFError:
+      indices = None
+    if indices == None: self.stop()
+    return indices
+
+  def isAlive(self):
+    return self.process != None
+
+  def stop(self):
+    "Kills the host process at once"
+    if self.process == None: return
+    self.process.kill()
+    self.process.join()
+    self.conn.close()
+    self.process = None
+
+  def call(self, position, name, args, timeout = None):
+    """
+    Calls name(*args) on the agent at position in the team.  If timeout
+    seconds pass without an answer the host is killed and
+    TimeoutFunctionException is raised.
+    """
+    if not self.isAlive():
+      if name not in STARTUP_CALLS or self.start() == None:
+        raise Exception('The host of team %s is not running' % self.factory)
+    self.conn.send((position, name, args))
+    if timeout != None and not self.conn.poll(max(timeout, 0)):
+      self.stop()
+      raise TimeoutFunctionException()
+    try:
+      status, value = self.conn.recv()
+    except EOFError:
+      self.stop()
+      raise Exception('The host of team %s died' % self.factory)
+    if status == 'error':
+      print(value, file=sys.stderr)
+      raise Exception('Agent %d raised an exception in its host' % self.indices[position])
+    return value
+
+class HostedAgent:
+  """
+  An agent whose calls are forwarded to its team's host.  TimeoutFunction
+  hands timed calls to callWithTimeout, so that overruns kill the host
+  rather than waiting for a signal.
+  """
+  def __init__(self, host, position, index):
+    self.host = host
+    self.position = position
+    self.index = index
+
+  def callWithTimeout(self, name, timeout, *args):
+    return self.host.call(self.position, name, args, timeout)
+
+  def registerTeam(self, agentsOnTeam):
+    return self.host.call(self.position, 'registerTeam', (agentsOnTeam,))
+
+  def registerBlackboard(self, blackboard):
+    return self.host.call(self.position, 'registerBlackboard', (blackboard,))
+
+  def registerInitialState(self, gameState):
+    return self.host.call(self.position, 'registerInitialState', (gameState,))
+
+  def observationFunction(self, gameState):
+    return self.host.call(self.position, 'observationFunction', (gameState,))
+
+  def getAction(self, observation):
+    return self.host.call(self.position, 'getAction', (observation,))
+
+  def final(self, gameState):
+    if self.host.isAlive():
+      return self.host.call(self.position, 'final', (gameState,))
+
+def loadAgents(isRed, factory, textgraphics, cmdLineArgs, quiet = False):
+  "capture.loadAgents, but with the team running in a host process"
+  host = TeamHost(isRed, factory, dict(cmdLineArgs), quiet)
+  if host.indices == None:
+    print('Error: The team "' + factory + '" could not be loaded! ', file=sys.stderr)
+    return [None for i in range(2)]
+  return [HostedAgent(host, position, index) for position, index in enumerate(host.indices)]
@@ -0,0 +1,196 @@
+# batchRunner.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Plays many headless capture games in parallel.
+
+capture.runGames plays its games one after another in a single process.
+This runner fans (layout, seed, red, blue) jobs out over a pool of worker
+processes instead.  Every worker loads each team once, through
+capture.loadAgents, and reuses the agents for every game it plays (just as
+runGames reuses them across numGames).  Results are printed as they come
+in, followed by the same summary runGames prints.
+
+  python batchRunner.py -r myTeam -b staffTeam -n 20 -j 8
+  python batchRunner.py -r myTeam -b berkeleyTeam -l ALL -n 5
+  python batchRunner.py -r myTeam -b berkeleyTeam -l RANDOM23 -l jumboCapture
+"""
+
+import io, os, sys, time, random, contextlib
+import concurrent.futures
+
+import capture
+import layout
+import textDisplay
+
+def loadLayout(name):
+  """
+  Loads a layout by name, accepting RANDOM<seed> like capture.py does.
+  """
+  if name.startswith('RANDOM'):
+    return layout.Layout(capture.randomLayout(int(name[6:])).split('\n'))
+  return layout.getLayout(name)
+
+def layoutNames():
+  return sorted(f[:-len('.lay')] for f in os.listdir('layouts') if f.endswith('.lay'))
+
+def makeJobs(layouts, red, blue, numGames, firstSeed = 0):
+  """
+  Returns one (layout, seed, red, blue) job per game: numGames seeds on every
+  layout.
+  """
+  return [(name, firstSeed + i, red, blue) for name in layouts for i in range(numGames)]
+
+###########
+# Workers #
+###########
+
+# Per-process state, filled in by initWorker
+_teams = {}
+_layouts = {}
+_options = {}
+
+def initWorker(options):
+  """
+  Runs once in each worker process.  options is a dict with length,
+  catchExceptions, hostAgents, muteAgents, verbose and the redOpts/blueOpts
+  agent args.
+  """
+  _teams.clear()
+  _layouts.clear()
+  _options.clear()
+  _options.update(options)
+
+def getTeam(isRed, factory):
+  "Loads a team the first time this worker needs it"
+  key = (isRed, factory)
+  if key not in _teams:
+    args = _options.get('redOpts' if isRed else 'blueOpts', {})
+    if _options.get('hostAgents', False):
+      import agentHost
+      _teams[key] = agentHost.loadAgents(isRed, factory, True, dict(args), quiet = not _options.get('verbose', False))
+    else:
+      _teams[key] = capture.loadAgents(isRed, factory, True, dict(args))
+  return _teams[key]
+
+def getLayout(name):
+  if name not in _layouts:
+    _layouts[name] = loadLayout(name)
+  return _layouts[name]
+
+def playMatch(job):
+  """
+  Plays one job and returns its result as a dict.  All output is swallowed
+  unless the runner was started with --verbose.
+  """
+  layoutName, seed, red, blue = job
+  start = time.time()
+  with contextlib.ExitStack() as muted:
+    if not _options.get('verbose', False):
+      sink = io.StringIO()
+      muted.enter_context(contextlib.redirect_stdout(sink))
+      muted.enter_context(contextlib.redirect_stderr(sink))
+    lay = getLayout(layoutName)
+    agents = sum([list(el) for el in zip(getTeam(True, red), getTeam(False, blue))], [])
+    random.seed(seed)
+    rules = capture.CaptureRules(quiet = True)
+    game = rules.newGame(lay, agents, textDisplay.NullGraphics(), _options.get('length', 1200),
+                         _options.get('muteAgents', True), _options.get('catchExceptions', False))
+    game.run()
+  return {'job': job, 'score': game.state.data.score, 'moves': len(game.moveHistory),
+          'crashed': game.agentCrashed, 'timeout': game.agentTimeout, 'seconds': time.time() - start}
+
+##########
+# Runner #
+##########
+
+def runBatch(jobs, processes = None, **options):
+  """
+  Plays every job and yields (jobIndex, result) pairs as games finish,
+  which is not necessarily job order.  processes defaults to one per CPU;
+  with processes=1 the games are played in this process.  The workers are
+  not daemons, so they may start agentHost processes of their own.
+  """
+  if processes == None: processes = os.cpu_count() or 1
+  processes = max(1, min(processes, len(jobs)))
+  indexed = list(enumerate(jobs))
+  if processes == 1:
+    initWorker(options)
+    for i, job in indexed:
+      yield i, playMatch(job)
+    return
+  pool = concurrent.futures.ProcessPoolExecutor(processes, initializer=initWorker, initargs=(options,))
+  try:
+    for future in concurrent.futures.as_completed([pool.submit(_playIndexed, job) for job in indexed]):
+      yield future.result()
+  finally:
+    pool.shutdown(wait=True, cancel_futures=True)
+
+def _playIndexed(indexedJob):
+  i, job = indexedJob
+  return i, playMatch(job)
+
+def describe(result):
+  layoutName, seed, red, blue = result['job']
+  score = result['score']
+  winner = ('Blue', 'Tie', 'Red')[max(0, min(2, 1 + score))]
+  notes = ''
+  if result['crashed']: notes += ' (crash)'
+  if result['timeout']: notes += ' (timeout)'
+  return '%s seed=%d %s vs %s: %d %s in %d moves, %.1fs%s' % (
+    layoutName, seed, red, blue, score, winner, result['moves'], result['seconds'], notes)
+
+def readCommand(argv):
+  from optparse import OptionParser
+  parser = OptionParser('python batchRunner.py [options]')
+  parser.add_option('-r', '--red', help=capture.default('Red team'), default='berkeleyTeam')
+  parser.add_option('-b', '--blue', help=capture.default('Blue team'), default='berkeleyTeam')
+  parser.add_option('--redOpts', help=capture.default('Options for red team (e.g. first=keys)'), default='')
+  parser.add_option('--blueOpts', help=capture.default('Options for blue team (e.g. first=keys)'), default='')
+  parser.add_option('-l', '--layout', dest='layouts', action='append', default=None, metavar='LAYOUT_FILE',
+                    help='Layout to play on; may be repeated.  ALL means every layout in layouts/, '
+                         'RANDOM<seed> a random maze [Default: defaultCapture]')
+  parser.add_option('-n', '--numGames', type='int', help=capture.default('Number of games per layout'), default=1)
+  parser.add_option('-s', '--seed', type='int', help=capture.default('Random seed of the first game on each layout'), default=0)
+  parser.add_option('-j', '--processes', type='int', help='Worker processes [Default: one per CPU]', default=None)
+  parser.add_option('-i', '--time', type='int', dest='length', help=capture.default('TIME limit of a game in moves'),
+                    default=1200, metavar='TIME')
+  parser.add_option('-c', '--catchExceptions', action='store_true', default=False,
+                    help='Catch exceptions and enforce time limits')
+  parser.add_option('--hostAgents', action='store_true', default=False,
+                    help='Run each team in a process of its own, killed if it runs out of time (see agentHost.py)')
+  parser.add_option('-v', '--verbose', action='store_true', default=False,
+                    help='Show game and agent output (interleaved between workers)')
+  options, otherjunk = parser.parse_args(argv)
+  assert len(otherjunk) == 0, "Unrecognized options: " + str(otherjunk)
+
+  layouts = options.layouts or ['defaultCapture']
+  if 'ALL' in layouts:
+    layouts = layoutNames()
+  return options, makeJobs(layouts, options.red, options.blue, options.numGames, options.seed)
+
+if __name__ == '__main__':
+  options, jobs = readCommand(sys.argv[1:])
+  results = [None] * len(jobs)
+  start = time.time()
+  for done, (i, result) in enumerate(runBatch(jobs, options.processes, length=options.length,
+                                             catchExceptions=options.catchExceptions, hostAgents=options.hostAgents,
+                                             muteAgents=not options.verbose, verbose=options.verbose,
+                                             redOpts=capture.parseAgentArgs(options.redOpts),
+                                             blueOpts=capture.parseAgentArgs(options.blueOpts))):
+    results[i] = result
+    print('[%3d/%d] %s' % (done + 1, len(jobs), describe(result)))
+    sys.stdout.flush()
+  print('Played %d games in %.1fs' % (len(jobs), time.time() - start))
+  capture.printScoreSummary([result['score'] for result in results])
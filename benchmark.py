@@ -0,0 +1,576 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Micro benchmarks for the simulator internals.
+
+Each benchmark times a fast path against the implementation it replaced.
+That both give the same answers is checked by the tests in tests/
+(python -m pytest tests), which use the reference implementations here.
+Run the benchmarks by name:
+
+  python benchmark.py distances
+  python benchmark.py distances -l jumboCapture
+
+With no arguments every benchmark is run on every layout in layouts/.
+"""
+
+import contextlib, gc, io, os, random, sys, time, tracemalloc
+
+import capture
+import layout
+import distanceCalculator
+import util
+from game import Actions, Directions, Grid, BitGrid
+
+def layoutNames():
+  return sorted(f[:-len('.lay')] for f in os.listdir('layouts') if f.endswith('.lay'))
+
+def measure(func, *args):
+  """
+  Runs func(*args) twice, once timed and once under tracemalloc, and returns
+  (result, seconds, bytes still held by the result).
+  """
+  gc.collect()
+  start = time.perf_counter()
+  func(*args)
+  elapsed = time.perf_counter() - start
+  gc.collect()
+  tracemalloc.start()
+  result = func(*args)
+  gc.collect()
+  size = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return result, elapsed, size
+
+def timeit(func, repeat):
+  "Returns the mean seconds per call of func() over repeat calls"
+  start = time.perf_counter()
+  for i in range(repeat):
+    func()
+  return (time.perf_counter() - start) / repeat
+
+#############
+# Distances #
+#############
+
+def legacyComputeDistances(layout):
+  "The dict-of-tuples UCS that distanceCalculator used before the array table"
+  distances = {}
+  allNodes = layout.walls.asList(False)
+  for source in allNodes:
+    dist = {}
+    closed = {}
+    for node in allNodes:
+      dist[node] = sys.maxsize
+    queue = util.PriorityQueue()
+    queue.push(source, 0)
+    dist[source] = 0
+    while not queue.isEmpty():
+      node = queue.pop()
+      if node in closed:
+        continue
+      closed[node] = True
+      nodeDist = dist[node]
+      x, y = node
+      for other in ((x,y+1), (x,y-1), (x+1,y), (x-1,y)):
+        if layout.isWall(other) or not other in dist:
+          continue
+        if nodeDist + 1 < dist[other]:
+          dist[other] = nodeDist + 1
+          queue.push(other, nodeDist + 1)
+    for target in allNodes:
+      distances[(target, source)] = dist[target]
+  return distances
+
+def benchmarkDistances(layouts):
+  print('%-18s %6s %10s %10s %10s %10s' % ('layout', 'cells', 'dict s', 'table s', 'dict MB', 'table MB'))
+  for name, lay in layouts:
+    old, oldTime, oldSize = measure(legacyComputeDistances, lay)
+    new, newTime, newSize = measure(distanceCalculator.computeDistances, lay)
+    print('%-18s %6d %10.3f %10.3f %10.2f %10.2f' % (name, new.numCells, oldTime, newTime, oldSize / 1e6, newSize / 1e6))
+
+#########
+# Grids #
+#########
+
+def benchmarkGrids(layouts):
+  print('%-18s %-7s %10s %10s %10s %10s %10s' % ('layout', 'grid', 'copy us', 'count us', 'hash us', 'asList us', 'read us'))
+  for name, lay in layouts:
+    bitGrid = lay.food.copy()
+    listGrid = Grid(lay.width, lay.height)
+    for x, y in bitGrid.asList(): listGrid[x][y] = True
+    cells = [(x, y) for x in range(lay.width) for y in range(lay.height)]
+    for kind, grid in (('list', listGrid), ('bits', bitGrid)):
+      def rehash():
+        # Hash a freshly written grid, as after a food pellet is eaten
+        g = grid.copy()
+        g[0][0] = False
+        hash(g)
+      def readAll():
+        for x, y in cells: grid[x][y]
+      print('%-18s %-7s %10.2f %10.2f %10.2f %10.2f %10.3f' % (name, kind,
+        1e6 * timeit(grid.copy, 2000), 1e6 * timeit(grid.count, 2000), 1e6 * timeit(rehash, 2000),
+        1e6 * timeit(grid.asList, 2000), 1e6 * timeit(readAll, 100) / len(cells)))
+
+###############
+# Legal moves #
+###############
+
+def benchmarkLegalMoves(layouts):
+  from game import Actions, Configuration
+  print('%-18s %6s %12s %12s %12s %12s' % ('layout', 'cells', 'actions us', 'table us', 'nbrs us', 'table us'))
+  for name, lay in layouts:
+    walls = lay.walls
+    plain = walls.copy() # copies do not carry the table
+    cells = walls.asList(False)
+    configs = [Configuration(cell, Directions.STOP) for cell in cells]
+    def actions(grid):
+      return lambda: [Actions.getPossibleActions(config, grid) for config in configs]
+    def neighbors(grid):
+      return lambda: [Actions.getLegalNeighbors(cell, grid) for cell in cells]
+    n = len(cells)
+    print('%-18s %6d %12.3f %12.3f %12.3f %12.3f' % (name, n,
+      1e6 * timeit(actions(plain), 20) / n, 1e6 * timeit(actions(walls), 20) / n,
+      1e6 * timeit(neighbors(plain), 20) / n, 1e6 * timeit(neighbors(walls), 20) / n))
+
+#############
+# Game loop #
+#############
+
+def legacyDeepCopy(self):
+  "GameStateData.deepCopy as it was, re-parsing the layout on every copy"
+  from game import GameStateData
+  state = GameStateData(self)
+  state.food = self.food.deepCopy()
+  state.layout = self.layout.deepCopy()
+  state._agentMoved = self._agentMoved
+  state._foodEaten = self._foodEaten
+  state._foodAdded = self._foodAdded
+  state._capsuleEaten = self._capsuleEaten
+  return state
+
+def benchmarkGameLoop(layouts):
+  import game, textDisplay
+  from captureAgents import CaptureAgent
+  class RandomCaptureAgent(CaptureAgent):
+    "Nearly free to run, so that the time measured is Game.run's own"
+    def chooseAction(self, gameState):
+      return random.choice(gameState.getLegalActions(self.index))
+  def play(lay, seed):
+    random.seed(seed)
+    agents = [RandomCaptureAgent(i) for i in range(4)]
+    with contextlib.redirect_stdout(io.StringIO()): # newGame announces who starts
+      g = capture.CaptureRules(quiet=True).newGame(lay, agents, textDisplay.NullGraphics(), 1200, False, False)
+    start = time.perf_counter()
+    g.run()
+    return g.moveHistory, time.perf_counter() - start
+  print('%-18s %6s %12s %12s' % ('layout', 'moves', 'legacy us', 'shared us'))
+  deepCopy = game.GameStateData.deepCopy
+  for name, lay in layouts:
+    results = []
+    for copier in (legacyDeepCopy, deepCopy):
+      game.GameStateData.deepCopy = copier
+      try:
+        games = [play(lay, seed) for seed in range(3)]
+      finally:
+        game.GameStateData.deepCopy = deepCopy
+      results.append(games)
+    moves = sum(len(h) for h, t in results[0])
+    print('%-18s %6d %12.1f %12.1f' % (name, moves, 1e6 * sum(t for h, t in results[0]) / moves,
+                                       1e6 * sum(t for h, t in results[1]) / moves))
+
+#########
+# Sonar #
+#########
+
+def benchmarkSonar(layouts):
+  print('%-18s %6s %8s %14s %14s' % ('layout', 'cells', 'numpy', 'per cell us', 'vector us'))
+  for name, lay in layouts:
+    state = initialState(lay)
+    model = state.getSonarModel()
+    cells = model.cells
+    pos = cells[len(cells) // 2]
+    def perCell():
+      return [state.getDistanceProb(util.manhattanDistance(pos, cell), 7) for cell in cells]
+    def vector():
+      return model.likelihood(pos, 7)
+    print('%-18s %6d %8s %14.1f %14.1f' % (name, len(cells), capture.numpy != None,
+                                          1e6 * timeit(perCell, 200), 1e6 * timeit(vector, 200)))
+
+###########
+# Tracker #
+###########
+
+def benchmarkTracker(layouts):
+  import textDisplay
+  from captureAgents import CaptureAgent
+  from opponentTracker import OpponentTracker
+  stats = {}
+  class TimedAgent(CaptureAgent):
+    "Moves at random, updating both the exact beliefs and a particle tracker"
+    def registerInitialState(self, gameState):
+      CaptureAgent.registerInitialState(self, gameState)
+      self.initializeBeliefs(gameState)
+      self.tracker = OpponentTracker(self, gameState, seed = self.index)
+    def observationFunction(self, gameState):
+      observation = CaptureAgent.observationFunction(self, gameState)
+      start = time.perf_counter()
+      self.updateBeliefs(observation)
+      stats['exact'].append(time.perf_counter() - start)
+      start = time.perf_counter()
+      self.tracker.update(observation)
+      stats['particles'].append(time.perf_counter() - start)
+      for opponent in self.getOpponents(gameState):
+        cell = self.sonarModel.cellIndex[gameState.getAgentPosition(opponent)]
+        for key, belief in (('exactTruth', self.beliefs[opponent]), ('particleTruth', self.tracker.getBelief(opponent))):
+          stats[key].append(belief[cell])
+      return observation
+    def chooseAction(self, gameState):
+      return random.choice(gameState.getLegalActions(self.index))
+  print('%-18s %6s %10s %10s %10s %8s %8s %8s' % ('layout', 'cells', 'exact us', 'pf us', 'pf max us',
+                                                  'exact p', 'pf p', 'pf miss'))
+  for name, lay in layouts:
+    for key in ('exact', 'particles', 'exactTruth', 'particleTruth'): stats[key] = []
+    for seed in range(2):
+      random.seed(seed)
+      agents = [TimedAgent(i) for i in range(4)]
+      with contextlib.redirect_stdout(io.StringIO()):
+        capture.CaptureRules(quiet=True).newGame(lay, agents, textDisplay.NullGraphics(), 1200, False, False).run()
+    mean = lambda values: sum(values) / len(values)
+    misses = sum(1 for p in stats['particleTruth'] if p == 0) / float(len(stats['particleTruth']))
+    print('%-18s %6d %10.1f %10.1f %10.1f %8.3f %8.3f %8.3f' % (name, agents[0].sonarModel.numCells,
+      1e6 * mean(stats['exact']), 1e6 * mean(stats['particles']), 1e6 * max(stats['particles']),
+      mean(stats['exactTruth']), mean(stats['particleTruth']), misses))
+
+########
+# PDDL #
+########
+
+PDDL_OBJECTS = [('a1', 'current_agent'), ('a2', 'ally'), ('e1', 'enemy1'), ('e2', 'enemy2')]
+PDDL_GOALS = [([], [('food_available',)]), ([('defend_foods',)], []),
+              ([], [('food_available',), ('is_pacman', 'e1'), ('is_pacman', 'e2')]),
+              ([], [('is_pacman', 'a1'), ('capsule_available',)])]
+
+def pddlProblems(domain, count, seed):
+  "Random (init, positive goals, negative goals) problems over the facts the domain's actions mention"
+  domain.ground(PDDL_OBJECTS)
+  rng = random.Random(seed)
+  facts = sorted(set(domain.facts))
+  return [([fact for fact in facts if rng.random() < 0.5],) + rng.choice(PDDL_GOALS) for i in range(count)]
+
+def solveProblems(solver, problems):
+  "The plans solver finds for (init, positive goals, negative goals) problems, [] where it finds none"
+  plans = []
+  for init, positiveGoals, negativeGoals in problems:
+    solver.parser_.reset_problem()
+    solver.parser_.set_objects(PDDL_OBJECTS)
+    solver.parser_.set_state(init)
+    solver.parser_.set_positive_goals(positiveGoals)
+    solver.parser_.set_negative_goals(negativeGoals)
+    plans.append(solver.solve() or [])
+  return plans
+
+def benchmarkPDDL(layouts):
+  import pddlDomain
+  print('%-16s %6s %10s %10s %12s %12s %12s' % ('domain', 'probs', 'solved', 'A* steps', 'piglet us',
+                                                'A* us', 'greedy us'))
+  for name in ('myTeam.pddl', 'staffTeam.pddl'):
+    domain = pddlDomain.getDomain(name)
+    problems = pddlProblems(domain, 200, 0)
+    solvers = dict((label, pddlDomain.DomainSolver(name, backend, greedy)) for label, backend, greedy in
+                   (('piglet', 'piglet', False), ('astar', 'bitset', False), ('greedy', 'bitset', True))
+                   if backend != 'piglet' or pddlDomain.pddl_solver != None)
+    times, plans = {}, {}
+    for label, solver in solvers.items():
+      start = time.perf_counter()
+      plans[label] = solveProblems(solver, problems)
+      times[label] = (time.perf_counter() - start) / len(problems)
+    solved = [plan for plan in plans['astar'] if plan]
+    piglet = '%12.1f' % (1e6 * times['piglet']) if 'piglet' in times else '%12s' % '-'
+    print('%-16s %6d %10d %10.2f %s %12.1f %12.1f' % (name, len(problems), len(solved),
+      sum(len(p) for p in solved) / float(max(len(solved), 1)), piglet, 1e6 * times['astar'], 1e6 * times['greedy']))
+
+#############
+# Team food #
+#############
+
+def benchmarkTeamFood(layouts):
+  print('%-18s %8s %12s %12s %12s' % ('layout', 'states', 'list us', 'halfGrid us', 'views us'))
+  for name, lay in layouts:
+    states = sum([playout(initialState(lay), seed, 1200) for seed in range(3)], [])
+    listFood = []
+    for state in states:
+      grid = Grid(lay.width, lay.height)
+      for x, y in state.data.food.asList(): grid[x][y] = True
+      listFood.append(grid)
+    # An agent asks for its food list many times a turn, e.g. once per candidate target
+    def legacy():
+      for grid in listFood:
+        for i in range(10): capture.halfGrid(grid, False).asList()
+    def halves():
+      for state in states:
+        for i in range(10): capture.halfGrid(state.data.food, False).asList()
+    def views():
+      for state in states:
+        for i in range(10): state.getBlueFood().asList()
+    n = 10 * len(states)
+    print('%-18s %8d %12.2f %12.2f %12.2f' % (name, len(states),
+      1e6 * timeit(legacy, 1) / n, 1e6 * timeit(halves, 1) / n, 1e6 * timeit(views, 1) / n))
+
+##############
+# Successors #
+##############
+
+def initialState(lay):
+  state = capture.GameState()
+  state.initialize(lay, 4)
+  state.data.timeleft = 1200
+  return state
+
+def successorTree(state, agentIndex, depth):
+  """
+  Expands every action of every agent in turn to the given depth and returns
+  the states in expansion order.
+  """
+  states = [state]
+  if depth == 0: return states
+  for action in state.getLegalActions(agentIndex):
+    successor = state.generateSuccessor(agentIndex, action)
+    states.extend(successorTree(successor, (agentIndex + 1) % state.getNumAgents(), depth - 1))
+  return states
+
+def playout(state, seed, moves, history = None):
+  """
+  A random game, so that eating, capsules, deaths and food dumps all happen.
+  The (agentIndex, action) moves played are appended to history if given.
+  """
+  rng = random.Random(seed)
+  states = [state]
+  for i in range(moves):
+    agentIndex = i % state.getNumAgents()
+    # Keep moving rather than dithering, so the agents actually cross the map
+    actions = state.getLegalActions(agentIndex)
+    reverse = Directions.REVERSE[state.getAgentState(agentIndex).configuration.direction]
+    forward = [a for a in actions if a not in (Directions.STOP, reverse)]
+    action = rng.choice(forward or actions)
+    if history != None: history.append((agentIndex, action))
+    state = state.generateSuccessor(agentIndex, action)
+    states.append(state)
+  return states
+
+def timeSuccessors(build):
+  "The (copying, sharing) times of build(), with and without copy-on-write successors"
+  times = []
+  try:
+    for copyOnWrite in (False, True):
+      capture.COPY_ON_WRITE = copyOnWrite
+      times.append(min(timeit(build, 1) for i in range(3)))
+  finally:
+    capture.COPY_ON_WRITE = True
+  return times[0], times[1]
+
+def benchmarkSuccessors(layouts):
+  print('%-18s %-12s %8s %10s %10s' % ('layout', 'states', 'count', 'copy s', 'cow s'))
+  for name, lay in layouts:
+    root = initialState(lay)
+    midgame = playout(root, 0, 100)[-1]
+    tree = lambda: successorTree(midgame, 0, 6)
+    games = lambda: sum([playout(root, seed, 1200) for seed in range(5)], [])
+    for kind, build in (('tree', tree), ('playouts', games)):
+      copyTime, cowTime = timeSuccessors(build)
+      print('%-18s %-12s %8d %10.3f %10.3f' % (name, kind, len(build()), copyTime, cowTime))
+
+def simulatorTree(sim, agentIndex, depth, visit):
+  "successorTree on a capture.Simulator: calls visit(sim.state) in the same order instead of listing states"
+  visit(sim.state)
+  if depth == 0: return
+  for action in sim.state.getLegalActions(agentIndex):
+    sim.apply(agentIndex, action)
+    simulatorTree(sim, (agentIndex + 1) % sim.state.getNumAgents(), depth - 1, visit)
+    sim.undo()
+
+def benchmarkSimulator(layouts):
+  print('%-18s %8s %12s %12s' % ('layout', 'states', 'successor s', 'simulator s'))
+  for name, lay in layouts:
+    midgame = playout(initialState(lay), 0, 100)[-1]
+    count = len(successorTree(midgame, 0, 6))
+    successorTime = timeit(lambda: successorTree(midgame, 0, 6), 3)
+    simulatorTime = timeit(lambda: simulatorTree(capture.Simulator(midgame), 0, 6, lambda state: None), 3)
+    print('%-18s %8d %12.3f %12.3f' % (name, count, successorTime, simulatorTime))
+
+def benchmarkMCTS(layouts):
+  from captureAgents import MCTSAgent
+  print('%-18s %10s %8s %12s %14s %14s' % ('layout', 'playouts', 'nodes', 'playouts/s', 'sim rollout/s',
+                                           'copy rollout/s'))
+  for name, lay in layouts:
+    midgame = playout(initialState(lay), 0, 100)[-1]
+    agent = MCTSAgent(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+      agent.registerInitialState(midgame)
+    start = time.perf_counter()
+    count = agent.search(midgame, 1.0)
+    seconds = time.perf_counter() - start
+    # Rollouts alone, on a Simulator and with a new state per move as generateSuccessor makes them
+    sim = capture.Simulator(midgame)
+    def simulated():
+      for i in range(agent.rolloutDepth):
+        agentIndex = i % sim.state.getNumAgents()
+        sim.apply(agentIndex, agent.rolloutPolicy(sim.state, agentIndex))
+      while sim.depth(): sim.undo()
+    def copying():
+      state = midgame
+      for i in range(agent.rolloutDepth):
+        agentIndex = i % state.getNumAgents()
+        state = state.generateSuccessor(agentIndex, agent.rolloutPolicy(state, agentIndex))
+    print('%-18s %10d %8d %12.0f %14.0f %14.0f' % (name, count, agent.tree.size(), count / seconds,
+      1 / timeit(simulated, 500), 1 / timeit(copying, 500)))
+
+###########
+# Replays #
+###########
+
+def benchmarkReplays(layouts):
+  import pickle, tempfile, replay
+  from game import Agent
+  print('%-18s %6s %10s %10s %10s %10s' % ('layout', 'moves', 'pickle B', 'replay B', 'resim ms', 'seek ms'))
+  path = os.path.join(tempfile.mkdtemp(), 'replay')
+  for name, lay in layouts:
+    root = initialState(lay)
+    moves = []
+    states = playout(root, 0, 1200, moves)
+    writer = replay.ReplayWriter(path, lay, root, 1200)
+    for (agentIndex, action), state in zip(moves, states[1:]):
+      writer.record(agentIndex, action, state)
+    writer.close()
+    pickled = pickle.dumps({'layout': lay, 'agents': [Agent() for i in range(4)], 'actions': moves, 'length': 1200,
+                            'redTeamName': 'Red', 'blueTeamName': 'Blue'})
+    reader = replay.ReplayReader(path)
+    turns = random.Random(0).sample(range(len(moves) + 1), 20)
+    def resimulate():
+      for turn in turns:
+        state = root
+        for agentIndex, action in moves[:turn]: state = state.generateSuccessor(agentIndex, action)
+    def seek():
+      for turn in turns: reader.stateAt(turn)
+    print('%-18s %6d %10d %10d %10.2f %10.2f' % (name, len(moves), len(pickled), os.path.getsize(path),
+      1e3 * timeit(resimulate, 1) / len(turns), 1e3 * timeit(seek, 1) / len(turns)))
+
+########
+# Maze #
+########
+
+def legacyEscapeRoute(table, walls, red, position, ghosts):
+  "myTeam's old hasEscapeRoute: a depth 10 BFS home avoiding cells near ghosts"
+  homeX = walls.width // 2 - 1 if red else walls.width // 2
+  frontier, visited = [position], set([position])
+  for depth in range(10):
+    nextFrontier = []
+    for x, y in frontier:
+      if (red and x <= homeX) or (not red and x >= homeX):
+        return True
+      for nextPos in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+        if not walls[nextPos[0]][nextPos[1]] and nextPos not in visited:
+          if all(table.getDistance(nextPos, ghost) > 2 for ghost in ghosts):
+            visited.add(nextPos)
+            nextFrontier.append(nextPos)
+    frontier = nextFrontier
+  return False
+
+def benchmarkMaze(layouts):
+  import mazeAnalysis
+  print('%-18s %6s %6s %6s %10s %10s %10s' % ('layout', 'cells', 'chokes', 'traps', 'build ms', 'bfs us', 'lookup us'))
+  for name, lay in layouts:
+    table = distanceCalculator.computeDistances(lay)
+    maze = mazeAnalysis.MazeAnalysis(lay.walls)
+    ghosts = [lay.agentPositions[1][1]]
+    enemyCells = [cell for cell in maze.cells if cell[0] >= lay.width // 2]
+    def bfs():
+      for cell in enemyCells: legacyEscapeRoute(table, lay.walls, True, cell, ghosts)
+    def lookup():
+      for cell in enemyCells:
+        depth = maze.trapDepth(cell)
+        if maze.homeDistance(cell, True) < 10 and depth:
+          all(table.getDistance(maze.trapExit(cell), ghost) > depth + 1 for ghost in ghosts)
+    print('%-18s %6d %6d %6d %10.2f %10.2f %10.2f' % (name, len(maze.cells), len(maze.articulationPoints),
+      len(maze.depths), 1e3 * timeit(lambda: mazeAnalysis.MazeAnalysis(lay.walls), 3),
+      1e6 * timeit(bfs, 1) / len(enemyCells), 1e6 * timeit(lookup, 1) / len(enemyCells)))
+
+def legacyClosestFood(pos, food, walls):
+  "The closest food by a BFS per question, with list.pop(0), as MixedAgent.closestFood found it before the food field"
+  fringe = [(pos[0], pos[1], 0)]
+  expanded = set()
+  while fringe:
+    x, y, dist = fringe.pop(0)
+    if (x, y) in expanded: continue
+    expanded.add((x, y))
+    if food[x][y]: return dist
+    for nbr in Actions.getLegalNeighbors((x, y), walls):
+      fringe.append((nbr[0], nbr[1], dist + 1))
+  return None
+
+def benchmarkFields(layouts):
+  import mazeAnalysis, distanceFields
+  print('%-18s %6s %12s %10s %10s' % ('layout', 'states', 'update us', 'bfs us', 'lookup us'))
+  for name, lay in layouts:
+    states = playout(initialState(lay), 0, 600)
+    maze = mazeAnalysis.getMazeAnalysis(lay.walls)
+    fields = distanceFields.TeamFields(maze, True)
+    # The questions of a move: the closest food after each action of each agent
+    questions = [(state, Actions.getLegalNeighbors(state.getAgentPosition(i), lay.walls))
+                 for state in states for i in range(state.getNumAgents())]
+    def bfs():
+      for state, cells in questions:
+        food = state.getBlueFood()
+        for cell in cells: legacyClosestFood(cell, food, lay.walls)
+    def update():
+      fields = distanceFields.TeamFields(maze, True)
+      for state in states: fields.update(state)
+    def lookup():
+      for state, cells in questions:
+        foodField = fields.update(state).food
+        for cell in cells: foodField.distance(cell)
+    count = sum(len(cells) for state, cells in questions)
+    print('%-18s %6d %12.2f %10.2f %10.2f' % (name, len(states), 1e6 * timeit(update, 1) / len(states),
+      1e6 * timeit(bfs, 1) / count, 1e6 * timeit(lookup, 1) / count))
+
+BENCHMARKS = {
+  'distances': benchmarkDistances,
+  'fields': benchmarkFields,
+  'gameLoop': benchmarkGameLoop,
+  'grids': benchmarkGrids,
+  'legalMoves': benchmarkLegalMoves,
+  'maze': benchmarkMaze,
+  'mcts': benchmarkMCTS,
+  'pddl': benchmarkPDDL,
+  'replays': benchmarkReplays,
+  'simulator': benchmarkSimulator,
+  'sonar': benchmarkSonar,
+  'successors': benchmarkSuccessors,
+  'teamFood': benchmarkTeamFood,
+  'tracker': benchmarkTracker,
+}
+
+if __name__ == '__main__':
+  from optparse import OptionParser
+  parser = OptionParser('python benchmark.py [options] [%s]' % '|'.join(sorted(BENCHMARKS)))
+  parser.add_option('-l', '--layout', action='append', dest='layouts', default=None,
+                    help='Layout to benchmark on (may be repeated) [Default: every layout in layouts/]')
+  options, names = parser.parse_args()
+  for name in names:
+    if name not in BENCHMARKS: parser.error('Unknown benchmark: ' + name)
+  layouts = [(name, layout.getLayout(name)) for name in (options.layouts or layoutNames())]
+  for name in (names or sorted(BENCHMARKS)):
+    print('== %s ==' % name)
+    BENCHMARKS[name](layouts)
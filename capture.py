@@ -55,27 +55,161 @@ from game import Actions
 from util import nearestPoint
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
 from game import Configuration
 from game import Agent
 from game import reconstituteGrid
-import sys, util, types, time, random
+import sys, util, types, time, random, collections
 import keyboardAgents
+import captureAgents
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 # If you change these, you won't affect the server, so you can't cheat
 KILL_POINTS = 0
 SONAR_NOISE_RANGE = 13 # Must be odd
 SONAR_NOISE_VALUES = [i - (SONAR_NOISE_RANGE - 1)/2 for i in range(SONAR_NOISE_RANGE)]
+SONAR_NOISE_MAX = (SONAR_NOISE_RANGE - 1) // 2
 SIGHT_RANGE = 5 # Manhattan distance
 MIN_FOOD = 2
 TOTAL_FOOD = 60
 
 DUMP_FOOD_ON_DEATH = True # if we have the gameplay element that dumps dots on death
 
+COPY_ON_WRITE = True # successors share unchanged agent states and capsules with their parent
+
 SCARED_TIME = 40
 
 def noisyDistance(pos1, pos2):
   return int(util.manhattanDistance(pos1, pos2) + random.choice(SONAR_NOISE_VALUES))
 
+SONAR_MODEL_CACHE = {}
+
+def getSonarModel(layout):
+  "Returns the SonarModel of a layout, building it the first time"
+  key = '\n'.join(layout.layoutText)
+  if key not in SONAR_MODEL_CACHE:
+    SONAR_MODEL_CACHE[key] = SonarModel(layout)
+  return SONAR_MODEL_CACHE[key]
+
+class SonarModel:
+  """
+  The sonar readings of makeObservation as vectors over the open cells of a
+  layout, for agents that track where their opponents may be.  Entry i of
+  a vector belongs to cells[i], in the order distanceCalculator uses too.
+  Vectors are numpy float arrays when numpy is installed and lists of
+  floats otherwise.
+  """
+
+  def __init__(self, layout):
+    self.cells = layout.walls.asList(False)
+    self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+    self.numCells = len(self.cells)
+    # An unseen agent is assumed to take each of its legal moves (or stop)
+    # with equal probability: edge k carries weight[k] of cell src[k] to dst[k]
+    src, dst, weight = [], [], []
+    for i, cell in enumerate(self.cells):
+      neighbors = [self.cellIndex[n] for n in Actions.getLegalNeighbors(cell, layout.walls) if n in self.cellIndex]
+      for j in neighbors:
+        src.append(i)
+        dst.append(j)
+        weight.append(1.0 / len(neighbors))
+    if numpy != None:
+      self.xs = numpy.array([x for x, y in self.cells])
+      self.ys = numpy.array([y for x, y in self.cells])
+      src, dst, weight = numpy.array(src, dtype=int), numpy.array(dst, dtype=int), numpy.array(weight)
+    self.src, self.dst, self.weight = src, dst, weight
+
+  def zeros(self):
+    if numpy != None: return numpy.zeros(self.numCells)
+    return [0.0] * self.numCells
+
+  def pointMass(self, pos):
+    "All the probability on pos"
+    belief = self.zeros()
+    belief[self.cellIndex[pos]] = 1.0
+    return belief
+
+  def uniform(self, mask = None):
+    "Equal probability on every cell, or on every cell where mask is non-zero"
+    if mask is None:
+      mask = [1.0] * self.numCells if numpy == None else numpy.ones(self.numCells)
+    return self.normalize(mask)
+
+  def distances(self, pos, distancer = None):
+    """
+    The distance from pos to every cell: the maze distance if distancer has
+    its maze distances, otherwise the Manhattan distance, which is what the
+    sonar measures.
+    """
+    table = distancer._distances if distancer != None else None
+    if table is not None and table.numCells == self.numCells:
+      row = table.getRow(pos)
+      if numpy != None: return numpy.frombuffer(row, dtype=numpy.uint16).astype(int)
+      return list(row)
+    x, y = pos
+    if numpy != None: return numpy.abs(self.xs - x) + numpy.abs(self.ys - y)
+    return [abs(cx - x) + abs(cy - y) for cx, cy in self.cells]
+
+  def likelihood(self, pos, noisyDistance, distancer = None):
+    """
+    For every cell, the probability of reading noisyDistance from pos if the
+    agent were on that cell.  This is getDistanceProb for all cells at once.
+    """
+    distances = self.distances(pos, distancer)
+    p = 1.0 / SONAR_NOISE_RANGE
+    if numpy != None: return numpy.where(numpy.abs(noisyDistance - distances) <= SONAR_NOISE_MAX, p, 0.0)
+    return [p if abs(noisyDistance - d) <= SONAR_NOISE_MAX else 0.0 for d in distances]
+
+  def outOfSight(self, positions):
+    "1 on every cell further than SIGHT_RANGE from all of positions, 0 elsewhere"
+    if numpy != None:
+      mask = numpy.ones(self.numCells)
+      for x, y in positions:
+        mask[numpy.abs(self.xs - x) + numpy.abs(self.ys - y) <= SIGHT_RANGE] = 0.0
+      return mask
+    return [0.0 if any(abs(cx - x) + abs(cy - y) <= SIGHT_RANGE for x, y in positions) else 1.0
+            for cx, cy in self.cells]
+
+  def elapseTime(self, belief):
+    "The belief one move later"
+    if numpy != None:
+      return numpy.bincount(self.dst, weights=belief[self.src] * self.weight, minlength=self.numCells)
+    moved = self.zeros()
+    for i, j, w in zip(self.src, self.dst, self.weight):
+      moved[j] += belief[i] * w
+    return moved
+
+  def observe(self, belief, *likelihoods):
+    """
+    The normalized product of belief and the likelihoods, or None if that is
+    zero everywhere (the evidence rules out every cell the belief allows).
+    """
+    if numpy != None:
+      for likelihood in likelihoods: belief = belief * likelihood
+    else:
+      for likelihood in likelihoods: belief = [b * l for b, l in zip(belief, likelihood)]
+    return self.normalize(belief)
+
+  def normalize(self, belief):
+    if numpy != None:
+      belief = numpy.asarray(belief, dtype=float)
+      total = belief.sum()
+      return belief / total if total > 0 else None
+    total = sum(belief)
+    if total <= 0: return None
+    return [b / total for b in belief]
+
+  def asCounter(self, belief):
+    "The belief as a util.Counter from position to probability, without the zeros"
+    counter = util.Counter()
+    for i in (numpy.flatnonzero(belief) if numpy != None else range(self.numCells)):
+      if belief[i] > 0: counter[self.cells[i]] = float(belief[i])
+    return counter
+
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
@@ -113,7 +247,7 @@ class GameState:
     # Find appropriate rules for the agent
     AgentRules.applyAction( state, action, agentIndex )
     AgentRules.checkDeath(state, agentIndex)
-    AgentRules.decrementTimer(state.data.agentStates[agentIndex])
+    AgentRules.decrementTimer(state.data.getMutableAgentState(agentIndex))
 
     # Book keeping
     state.data._agentMoved = agentIndex
@@ -150,7 +284,7 @@ class GameState:
     For the matrix m, m[x][y]=true if there is food in (x,y) that belongs to
     red (meaning red is protecting it, blue is trying to eat it).
     """
-    return halfGrid(self.data.food, red = True)
+    return self.getTeamFood(red = True)
 
   def getBlueFood(self):
     """
@@ -158,7 +292,46 @@ class GameState:
     For the matrix m, m[x][y]=true if there is food in (x,y) that belongs to
     blue (meaning blue is protecting it, red is trying to eat it).
     """
-    return halfGrid(self.data.food, red = False)
+    return self.getTeamFood(red = False)
+
+  def getTeamFood(self, red):
+    """
+    Returns a copy of one team's half of the food grid.  The halves are kept
+    from state to state (see setFood), so with BitGrid food this is an O(1)
+    copy whose count() and asList() are usually already cached.
+    """
+    food = self.data.food
+    if not isinstance(food, BitGrid):
+      return halfGrid(food, red)
+    teamFood = self._teamFood
+    # Keyed on the bits themselves, so any change to the food, however it was
+    # made, is noticed
+    if teamFood == None or teamFood[0] is not food._bits or teamFood[1] != (food.width, food.height):
+      halves = halfGrid(food, True), halfGrid(food, False)
+      for half in halves:
+        # Fill the caches here, where every later copy will share them
+        half.count()
+        half.asList()
+      teamFood = self._teamFood = (food._bits, (food.width, food.height)) + halves
+    return teamFood[2 if red else 3].copy()
+
+  def setFood(self, positions, value):
+    """
+    Sets the food at each of positions to value, on a copy of the food grid
+    so that the states this one was generated from are unchanged.  The team
+    halves are updated cell by cell rather than rebuilt.
+    """
+    food = self.data.food.copy()
+    for x, y in positions:
+      food[x][y] = value
+    if isinstance(food, BitGrid):
+      red, blue = self.getTeamFood(True), self.getTeamFood(False)
+      halfway = int(food.width / 2)
+      for x, y in positions:
+        if x < halfway: red[x][y] = value
+        else:           blue[x][y] = value
+      self._teamFood = (food._bits, (food.width, food.height), red, blue)
+    self.data.food = food
 
   def getRedCapsules(self):
     return halfList(self.data.capsules, self.data.food, red = True)
@@ -217,11 +390,19 @@ class GameState:
 
   def getDistanceProb(self, trueDistance, noisyDistance):
     "Returns the probability of a noisy distance given the true distance"
-    if noisyDistance - trueDistance in SONAR_NOISE_VALUES:
+    error = noisyDistance - trueDistance
+    if error == int(error) and abs(error) <= SONAR_NOISE_MAX:
       return 1.0/SONAR_NOISE_RANGE
     else:
       return 0
 
+  def getSonarModel(self):
+    """
+    Returns the SonarModel of this layout, which gives getDistanceProb for
+    every open cell at once (and the other pieces of exact inference).
+    """
+    return getSonarModel(self.data.layout)
+
   def getInitialAgentPosition(self, agentIndex):
     "Returns the initial position of an agent."
     return self.data.layout.agentPositions[agentIndex][1]
@@ -242,16 +423,18 @@ class GameState:
     Generates a new state by copying information from its predecessor.
     """
     if prevState != None: # Initial state
-      self.data = GameStateData(prevState.data)
+      self.data = GameStateData(prevState.data, copyOnWrite = COPY_ON_WRITE)
       self.blueTeam = prevState.blueTeam
       self.redTeam = prevState.redTeam
       self.data.timeleft = prevState.data.timeleft
 
       self.teams = prevState.teams
       self.agentDistances = prevState.agentDistances
+      self._teamFood = prevState._teamFood
     else:
       self.data = GameStateData()
       self.agentDistances = []
+      self._teamFood = None # (food bits, size, red half, blue half), see getTeamFood
 
   def deepCopy( self ):
     state = GameState( self )
@@ -328,8 +511,87 @@ class GameState:
     else:
       return configOrPos.pos[0] < width / 2
 
+class Simulator:
+  """
+  Plays moves on one GameState in place, for search agents that look many
+  moves ahead.  generateSuccessor makes a new state for every move and
+  checks the action is legal; a Simulator changes its state and keeps what
+  it needs to take the move back:
+
+    sim = Simulator(gameState)
+    for action in sim.state.getLegalActions(index):
+      sim.apply(index, action)
+      value = evaluate(sim.state)
+      sim.undo()
+
+  After apply, sim.state is what generateSuccessor would have returned
+  (score, food, capsules, agents, timeleft and the _foodEaten, _foodAdded
+  and _capsuleEaten markers).  The rules are the same AgentRules.  The
+  agent states they change are changed in place, with their old fields
+  logged to the move's undo record (see GameStateData._undoLog); food and
+  capsules are replaced rather than changed, so the record keeps the old
+  ones.  undo puts back exactly what the record holds.
+
+  Nothing gameState holds is changed, but states generated from sim.state
+  share its agent states, so they are only good until the next apply or
+  undo.  Actions are not checked, so only apply legal ones.
+  """
+  def __init__(self, gameState):
+    self.state = gameState.deepCopy()
+    self.history = []
+
+  def apply(self, agentIndex, action):
+    "Moves agentIndex as generateSuccessor(agentIndex, action) would, in place"
+    state = self.state
+    data = state.data
+    changed = []
+    self.history.append((changed, data.food, state._teamFood, data.capsules, data.score, data.scoreChange,
+                         data.timeleft, data._foodEaten, data._foodAdded, data._capsuleEaten, data._agentMoved,
+                         data._win, data._lose))
+    # Marked shared, each agent state is logged the first time the rules ask to change it
+    data._sharedAgentStates = (1 << len(data.agentStates)) - 1
+    data._sharedCapsules = True
+    data._undoLog = changed
+    data._foodEaten = data._foodAdded = data._capsuleEaten = None
+    data._win = data._lose = False
+    data.scoreChange = 0
+
+    try:
+      AgentRules.moveAgent( state, action, agentIndex )
+      AgentRules.checkDeath(state, agentIndex)
+      AgentRules.decrementTimer(data.getMutableAgentState(agentIndex))
+    finally:
+      data._undoLog = None
+      data._sharedAgentStates = 0
+
+    data._agentMoved = agentIndex
+    data.score += data.scoreChange
+    data.timeleft -= 1
+    return state
+
+  def undo(self):
+    "Takes back the last move applied"
+    state = self.state
+    data = state.data
+    (changed, data.food, state._teamFood, data.capsules, data.score, data.scoreChange, data.timeleft,
+     data._foodEaten, data._foodAdded, data._capsuleEaten, data._agentMoved, data._win, data._lose) = self.history.pop()
+    for agentState, configuration, isPacman, scaredTimer, numCarrying, numReturned in changed:
+      agentState.configuration = configuration
+      agentState.isPacman = isPacman
+      agentState.scaredTimer = scaredTimer
+      agentState.numCarrying = numCarrying
+      agentState.numReturned = numReturned
+    return state
+
+  def depth(self):
+    "The moves applied and not taken back"
+    return len(self.history)
+
 def halfGrid(grid, red):
   halfway = int(grid.width / 2)
+  if isinstance(grid, BitGrid):
+    if red: return grid.sliceColumns(0, halfway)
+    else:   return grid.sliceColumns(halfway, grid.width)
   halfgrid = Grid(grid.width, grid.height, False)
   if red:    xrange = list(range(halfway))
   else:       xrange = list(range(halfway, grid.width))
@@ -374,6 +636,14 @@ class CaptureRules:
     game.state = initState
     game.length = length
     game.state.data.timeleft = length
+    for team in (initState.getRedTeamIndices(), initState.getBlueTeamIndices()):
+      blackboard = captureAgents.TeamBlackboard(team)
+      for index in team:
+        if index >= len(agents): continue
+        if 'registerTeam' in dir(agents[index]):
+          agents[index].registerTeam(team)
+        if 'registerBlackboard' in dir(agents[index]):
+          agents[index].registerBlackboard(blackboard)
     if 'drawCenterLine' in dir(display):
       display.drawCenterLine()
     self._initBlueFood = initState.getBlueFood().count()
@@ -471,9 +741,17 @@ class AgentRules:
     legal = AgentRules.getLegalActions( state, agentIndex )
     if action not in legal:
       raise Exception("Illegal action " + str(action))
+    AgentRules.moveAgent( state, action, agentIndex )
 
+  applyAction = staticmethod( applyAction )
+
+  def moveAgent( state, action, agentIndex ):
+    """
+    applyAction without the check that the action is legal, for callers
+    that only pass actions from getLegalActions (see Simulator).
+    """
     # Update Configuration
-    agentState = state.data.agentStates[agentIndex]
+    agentState = state.data.getMutableAgentState(agentIndex)
     speed = 1.0
     # if agentState.isPacman: speed = 0.5
     vector = Actions.directionToVector( action, speed )
@@ -512,7 +790,7 @@ class AgentRules:
     if agentState.isPacman and manhattanDistance( nearest, next ) <= 0.9 :
       AgentRules.consume( nearest, state, state.isOnRedTeam(agentIndex) )
 
-  applyAction = staticmethod( applyAction )
+  moveAgent = staticmethod( moveAgent )
 
   def consume( position, state, isRed ):
     x,y = position
@@ -528,16 +806,14 @@ class AgentRules:
         teamIndicesFunc = state.getRedTeamIndices
 
       # go increase the variable for the pacman who ate this
-      agents = [state.data.agentStates[agentIndex] for agentIndex in teamIndicesFunc()]
-      for agent in agents:
-        if agent.getPosition() == position:
-          agent.numCarrying += 1
+      for agentIndex in teamIndicesFunc():
+        if state.data.agentStates[agentIndex].getPosition() == position:
+          state.data.getMutableAgentState(agentIndex).numCarrying += 1
           break # the above should only be true for one agent...
 
       # do all the score and food grid maintainenace 
       #state.data.scoreChange += score
-      state.data.food = state.data.food.copy()
-      state.data.food[x][y] = False
+      state.setFood([position], False)
       state.data._foodEaten = position
       #if (isRed and state.getBlueFood().count() == MIN_FOOD) or (not isRed and state.getRedFood().count() == MIN_FOOD):
       #  state.data._win = True
@@ -546,14 +822,14 @@ class AgentRules:
     if isRed: myCapsules = state.getBlueCapsules()
     else: myCapsules = state.getRedCapsules()
     if( position in myCapsules ):
-      state.data.capsules.remove( position )
+      state.data.getMutableCapsules().remove( position )
       state.data._capsuleEaten = position
 
       # Reset all ghosts' scared timers
       if isRed: otherTeam = state.getBlueTeamIndices()
       else: otherTeam = state.getRedTeamIndices()
       for index in otherTeam:
-        state.data.agentStates[index].scaredTimer = SCARED_TIME
+        state.data.getMutableAgentState(index).scaredTimer = SCARED_TIME
 
   consume = staticmethod( consume )
 
@@ -619,15 +895,15 @@ class AgentRules:
       if (x,y) in state.data.capsules:
         return False
 
-      # loop through agents
-      agentPoses = [state.getAgentPosition(i) for i in range(state.getNumAgents())]
+      # no agent moves during the search, so their positions are found once
       if (x,y) in agentPoses:
         return False
 
       return True
 
+    agentPoses = [state.getAgentPosition(i) for i in range(state.getNumAgents())]
+
     numToDump = agentState.numCarrying
-    state.data.food = state.data.food.copy()
     foodAdded = []
 
     def genSuccessors(x, y):
@@ -636,13 +912,13 @@ class AgentRules:
       return [(x + dx, y + dy) for dx in DX for dy in DY]
 
     # BFS graph search
-    positionQueue = [agentState.getPosition()]
+    positionQueue = collections.deque([agentState.getPosition()])
     seen = set()
     while numToDump > 0:
       if not len(positionQueue):
         raise Exception('Exhausted BFS! uh oh')
       # pop one off, graph check
-      popped = positionQueue.pop(0)
+      popped = positionQueue.popleft()
       if popped in seen:
         continue
       seen.add(popped)
@@ -650,14 +926,15 @@ class AgentRules:
       x, y = popped[0], popped[1]
       x = int(x)
       y = int(y)
+      # Nothing is visited twice, so the food can be placed after the search
       if (allGood(state, x, y)):
-        state.data.food[x][y] = True
         foodAdded.append((x, y))
         numToDump -= 1
 
       # generate successors
-      positionQueue = positionQueue + genSuccessors(x, y)
+      positionQueue.extend(genSuccessors(x, y))
 
+    state.setFood(foodAdded, True)
     state.data._foodAdded = foodAdded
     # now our agentState is no longer carrying food
     agentState.numCarrying = 0
@@ -666,7 +943,7 @@ class AgentRules:
   dumpFoodFromDeath = staticmethod(dumpFoodFromDeath)
 
   def checkDeath( state, agentIndex):
-    agentState = state.data.agentStates[agentIndex]
+    agentState = state.data.getMutableAgentState(agentIndex)
     if state.isOnRedTeam(agentIndex):
       otherTeam = state.getBlueTeamIndices()
     else:
@@ -678,6 +955,7 @@ class AgentRules:
         ghostPosition = otherAgentState.getPosition()
         if ghostPosition == None: continue
         if manhattanDistance( ghostPosition, agentState.getPosition() ) <= COLLISION_TOLERANCE:
+          otherAgentState = state.data.getMutableAgentState(index)
           # award points to the other team for killing Pacmen
           if otherAgentState.scaredTimer <= 0:
             AgentRules.dumpFoodFromDeath(state, agentState, agentIndex)
@@ -704,6 +982,7 @@ class AgentRules:
         pacPos = otherAgentState.getPosition()
         if pacPos == None: continue
         if manhattanDistance( pacPos, agentState.getPosition() ) <= COLLISION_TOLERANCE:
+          otherAgentState = state.data.getMutableAgentState(index)
           #award points to the other team for killing Pacmen
           if agentState.scaredTimer <= 0:
             AgentRules.dumpFoodFromDeath(state, otherAgentState, agentIndex)
@@ -808,6 +1087,8 @@ def readCommand( argv ):
                     help=default('How many episodes are training (suppresses output)'), default=0)
   parser.add_option('-c', '--catchExceptions', action='store_true', default=False,
                     help='Catch exceptions and enforce time limits')
+  parser.add_option('--hostAgents', action='store_true', default=False,
+                    help='Run each team in a process of its own, killed if it runs out of time (see agentHost.py)')
   parser.add_option('--frameTime', dest='frameTime', type='float',
                     help=default('Time to delay between frames; <0 means keyboard'), default=0.001)
 
@@ -846,8 +1127,8 @@ def readCommand( argv ):
   # Special case: recorded games don't use the runGames method or args structure
   if options.replay != None:
     print('Replaying recorded game %s.' % options.replay)
-    import pickle
-    recorded = pickle.load(open(options.replay))
+    import replay
+    recorded = replay.ReplayReader(options.replay).components()
     recorded['display'] = args['display']
     replayGame(**recorded)
     sys.exit(0)
@@ -858,10 +1139,15 @@ def readCommand( argv ):
     redArgs['numTraining'] = options.numTraining
     blueArgs['numTraining'] = options.numTraining
   nokeyboard = options.textgraphics or options.quiet or options.numTraining > 0
+  loader = loadAgents
+  if options.hostAgents:
+    import agentHost
+    loader = lambda isRed, factory, textgraphics, cmdLineArgs: agentHost.loadAgents(
+      isRed, factory, textgraphics, cmdLineArgs, quiet = options.super_quiet)
   print('\nRed team %s with %s:' % (options.red, redArgs))
-  redAgents = loadAgents(True, options.red, nokeyboard, redArgs)
+  redAgents = loader(True, options.red, nokeyboard, redArgs)
   print('\nBlue team %s with %s:' % (options.blue, blueArgs))
-  blueAgents = loadAgents(False, options.blue, nokeyboard, blueArgs)
+  blueAgents = loader(False, options.blue, nokeyboard, blueArgs)
   args['agents'] = sum([list(el) for el in zip(redAgents, blueAgents)],[]) # list of agents
 
   numKeyboardAgents = 0
@@ -1007,32 +1293,34 @@ def runGames( layouts, agents, display, length, numGames, record, numTraining, r
         gameDisplay = display
         rules.quiet = False
     g = rules.newGame( layout, agents, gameDisplay, length, muteAgents, catchExceptions )
-    g.run()
-    if not beQuiet: games.append(g)
-
     g.record = None
     if record:
-      import time, pickle, game
-      #fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-      #f = file(fname, 'w')
-      components = {'layout': layout, 'agents': [game.Agent() for a in agents], 'actions': g.moveHistory, 'length': length, 'redTeamName': redTeamName, 'blueTeamName':blueTeamName }
-      #f.close()
-      print("recorded")
-      g.record = pickle.dumps(components)
-      with open('replay-%d'%i,'wb') as f:
-        f.write(g.record)
+      # Moves are streamed to the file as they are played
+      import replay
+      g.record = 'replay-%d' % i
+      g.recorder = replay.ReplayWriter(g.record, layout, g.state, length, redTeamName, blueTeamName)
+    try:
+      g.run()
+    finally:
+      if g.recorder != None:
+        g.recorder.close()
+        print("recorded")
+    if not beQuiet: games.append(g)
 
   if numGames > 1:
-    scores = [game.state.data.score for game in games]
-    redWinRate = [s > 0 for s in scores].count(True)/ float(len(scores))
-    blueWinRate = [s < 0 for s in scores].count(True)/ float(len(scores))
-    print('Average Score:', sum(scores) / float(len(scores)))
-    print('Scores:       ', ', '.join([str(score) for score in scores]))
-    print('Red Win Rate:  %d/%d (%.2f)' % ([s > 0 for s in scores].count(True), len(scores), redWinRate))
-    print('Blue Win Rate: %d/%d (%.2f)' % ([s < 0 for s in scores].count(True), len(scores), blueWinRate))
-    print('Record:       ', ', '.join([('Blue', 'Tie', 'Red')[max(0, min(2, 1 + s))] for s in scores]))
+    printScoreSummary([game.state.data.score for game in games])
   return games
 
+def printScoreSummary(scores):
+  "Prints the average score, win rates and record of a list of final scores"
+  redWinRate = [s > 0 for s in scores].count(True)/ float(len(scores))
+  blueWinRate = [s < 0 for s in scores].count(True)/ float(len(scores))
+  print('Average Score:', sum(scores) / float(len(scores)))
+  print('Scores:       ', ', '.join([str(score) for score in scores]))
+  print('Red Win Rate:  %d/%d (%.2f)' % ([s > 0 for s in scores].count(True), len(scores), redWinRate))
+  print('Blue Win Rate: %d/%d (%.2f)' % ([s < 0 for s in scores].count(True), len(scores), blueWinRate))
+  print('Record:       ', ', '.join([('Blue', 'Tie', 'Red')[max(0, min(2, 1 + s))] for s in scores]))
+
 def save_score(game):
     with open('score', 'w') as f:
         print(game.state.data.score, file=f)
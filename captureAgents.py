@@ -16,10 +16,67 @@
   Interfaces for capture agents and agent factories
 """
 
-from game import Agent
+from game import Agent, Directions, Actions, Configuration
 import distanceCalculator
+import distanceFields
+import mazeAnalysis
 from util import nearestPoint
 import util
+import array, bisect, itertools, math, random, time
+
+class TeamBlackboard:
+  """
+  What the agents of one team share during a game.  capture.py makes one
+  per team for every game and hands it to each agent through
+  registerBlackboard, so both agents of a team see the same blackboard as
+  self.blackboard.
+
+  share(name, compute) holds things computed once per game, such as the
+  maze distances; they must not change once made.  view(gameState, name,
+  compute) memoizes things derived from an observation (food lists,
+  visible ghosts, ...) by the move number of the observation, so every
+  later call during that move, by either agent, reuses the first result.
+  Given depends, a view is also reused on later moves as long as
+  depends(gameState) is unchanged, which is how the teammate moving next
+  picks up what the first agent computed.  Only pass observations to
+  view: successors made with generateSuccessor have the move numbers of
+  later observations.
+  """
+  def __init__(self, indices = None):
+    self.indices = indices
+    self.registered = set()
+    self.shared = {}
+    self.views = {}
+    self.hits = 0
+    self.misses = 0
+
+  def share(self, name, compute):
+    "compute(), made the first time a member asks for name this game"
+    if name not in self.shared:
+      self.shared[name] = compute()
+    return self.shared[name]
+
+  def moveNumber(gameState):
+    "The move gameState was observed at: the moves made so far"
+    return -gameState.data.timeleft
+  moveNumber = staticmethod(moveNumber)
+
+  def view(self, gameState, name, compute, depends = None):
+    """
+    compute(gameState), or what it returned earlier this move (or, with
+    depends, since depends(gameState) last changed).  Views are shared, so
+    callers must not change them.
+    """
+    move = TeamBlackboard.moveNumber(gameState)
+    key = depends(gameState) if depends != None else None
+    entry = self.views.get(name)
+    if entry != None and (entry[0] == move or (depends != None and entry[1] == key)):
+      self.hits += 1
+      return entry[2]
+    self.misses += 1
+    value = compute(gameState)
+    self.views[name] = (move, key, value)
+    return value
 
 # Note: the following class is not used, but is kept for backwards
 # compatibility with team submissions that try to import it.
@@ -79,6 +136,12 @@ class CaptureAgent(Agent):
     # Maze distance calculator
     self.distancer = None
 
+    # What the team shares, see TeamBlackboard
+    self.blackboard = None
+
+    # Distance fields of states other than the current observation, see getDistanceFields
+    self.lookaheadFields = None
+
     # A history of observations
     self.observationHistory = []
 
@@ -88,6 +151,10 @@ class CaptureAgent(Agent):
     # Access to the graphics
     self.display = None
 
+    # Beliefs about where each opponent is, see initializeBeliefs
+    self.sonarModel = None
+    self.beliefs = {}
+
   def registerInitialState(self, gameState):
     """
     This method handles the initial setup of the
@@ -97,17 +164,30 @@ class CaptureAgent(Agent):
     A distanceCalculator instance caches the maze distances
     between each pair of positions, so your agents can use:
     self.distancer.getDistance(p1, p2)
+
+    The distancer is made once per team, on self.blackboard.  An agent
+    that was not given a blackboard by registerBlackboard gets one of its
+    own.
     """
     self.red = gameState.isOnRedTeam(self.index)
-    self.distancer = distanceCalculator.Distancer(gameState.data.layout)
-
-    # comment this out to forgo maze distance computation and use manhattan distances
-    self.distancer.getMazeDistances()
+    if self.blackboard == None or self.index in self.blackboard.registered:
+      self.blackboard = TeamBlackboard() # not shared, or left over from an earlier game
+    self.blackboard.registered.add(self.index)
+    self.distancer = self.blackboard.share('distancer', lambda: self.makeDistancer(gameState))
+    self.lookaheadFields = None
+    self.sonarModel = gameState.getSonarModel()
 
     import __main__
     if '_display' in dir(__main__):
       self.display = __main__._display
 
+  def makeDistancer(self, gameState):
+    distancer = distanceCalculator.Distancer(gameState.data.layout)
+
+    # comment this out to forgo maze distance computation and use manhattan distances
+    distancer.getMazeDistances()
+    return distancer
+
   def final(self, gameState):
     self.observationHistory = []
 
@@ -118,6 +198,10 @@ class CaptureAgent(Agent):
     """
     self.agentsOnTeam = agentsOnTeam
 
+  def registerBlackboard(self, blackboard):
+    "Fills self.blackboard with the TeamBlackboard the team shares this game"
+    self.blackboard = blackboard
+
   def observationFunction(self, gameState):
     " Changing this won't affect pacclient.py, but will affect capture.py "
     return gameState.makeObservation(self.index)
@@ -247,6 +331,28 @@ class CaptureAgent(Agent):
     d = self.distancer.getDistance(pos1, pos2)
     return d
 
+  def getDistanceFields(self, gameState):
+    """
+    The distances from every cell to the nearest food and capsule you can
+    eat and to the nearest cell you can cross home from, as of gameState
+    (see distanceFields.py):
+
+    self.getDistanceFields(gameState).food.distance(pos)
+
+    The agents of a team share the fields of their current observations on
+    self.blackboard; each call updates them for what changed since the last
+    one.  Other states (successors, say) are worked out in fields of the
+    agent's own, so looking ahead never moves the fields the team shares.
+    """
+    if self.observationHistory and gameState is self.observationHistory[-1]:
+      fields = self.blackboard.share('distanceFields', lambda: distanceFields.TeamFields(
+        mazeAnalysis.getMazeAnalysis(gameState.getWalls()), self.red))
+    else:
+      if self.lookaheadFields == None:
+        self.lookaheadFields = distanceFields.TeamFields(mazeAnalysis.getMazeAnalysis(gameState.getWalls()), self.red)
+      fields = self.lookaheadFields
+    return fields.update(gameState)
+
   def getPreviousObservation(self):
     """
     Returns the GameState object corresponding to the last state this agent saw
@@ -264,6 +370,50 @@ class CaptureAgent(Agent):
     """
     return self.observationHistory[-1]
 
+  #############
+  # Inference #
+  #############
+
+  def initializeBeliefs(self, gameState):
+    """
+    Starts self.beliefs, which maps each opponent to a belief vector over
+    the open cells of the board (see capture.SonarModel), with every
+    opponent at its start position.  Call updateBeliefs on each
+    observation afterwards.
+    """
+    self.sonarModel = gameState.getSonarModel()
+    self.beliefs = {}
+    for opponent in self.getOpponents(gameState):
+      self.beliefs[opponent] = self.sonarModel.pointMass(gameState.getInitialAgentPosition(opponent))
+
+  def updateBeliefs(self, gameState):
+    """
+    Brings self.beliefs up to date with an observation.  An opponent in
+    sight is where it is seen.  Otherwise its belief is moved on by one
+    move, weighed by the sonar reading and cleared near this team, where it
+    would have been seen.  If that leaves nothing, the opponent may be
+    anywhere out of sight.
+    """
+    model = self.sonarModel
+    myPos = gameState.getAgentPosition(self.index)
+    noisyDistances = gameState.getAgentDistances()
+    hidden = model.outOfSight([gameState.getAgentPosition(i) for i in self.getTeam(gameState)])
+    for opponent in self.getOpponents(gameState):
+      pos = gameState.getAgentPosition(opponent)
+      if pos != None:
+        self.beliefs[opponent] = model.pointMass(pos)
+        continue
+      belief = model.elapseTime(self.beliefs[opponent])
+      if noisyDistances:
+        belief = model.observe(belief, model.likelihood(myPos, noisyDistances[opponent]), hidden)
+      else:
+        belief = model.observe(belief, hidden)
+      self.beliefs[opponent] = belief if belief is not None else model.uniform(hidden)
+
+  def getBeliefDistribution(self, opponent):
+    "The belief about opponent as a util.Counter from position to probability"
+    return self.sonarModel.asCounter(self.beliefs[opponent])
+
   def displayDistributionsOverPositions(self, distributions):
     """
     Overlays a distribution over positions onto the pacman board that represents
@@ -271,7 +421,8 @@ class CaptureAgent(Agent):
 
     The arg distributions is a tuple or list of util.Counter objects, where the i'th
     Counter has keys that are board positions (x,y) and values that encode the probability
-    that agent i is at (x,y).
+    that agent i is at (x,y).  Belief vectors over the board's open cells, as kept in
+    self.beliefs, may be passed instead of Counters.
 
     If some elements are None, then they will be ignored.  If a Counter is passed to this
     function, it will be displayed. This is helpful for figuring out if your agent is doing
@@ -279,8 +430,11 @@ class CaptureAgent(Agent):
     """
     dists = []
     for dist in distributions:
-      if dist != None:
-        if not isinstance(dist, util.Counter): raise Exception("Wrong type of distribution")
+      if dist is not None:
+        if not isinstance(dist, util.Counter):
+          if self.sonarModel == None or len(dist) != self.sonarModel.numCells:
+            raise Exception("Wrong type of distribution")
+          dist = self.sonarModel.asCounter(dist)
         dists.append(dist)
       else:
         dists.append(util.Counter())
@@ -290,6 +444,242 @@ class CaptureAgent(Agent):
       self._distributions = dists # These can be read by pacclient.py
 
 
+class MCTSTree:
+  """
+  The statistics of a Monte Carlo search tree, kept as parallel arrays
+  indexed by node rather than as node objects.  Node 0 is the root.  Node i
+  was reached by agent movers[i] taking actions[i] from parents[i]; its
+  values[i] sums the values (for the searching team) of the visits[i]
+  playouts through it, and children[i] maps each action tried from it to
+  its node.  The tree is open loop: nodes hold no states, playouts replay
+  the actions from the root.
+  """
+  def __init__(self):
+    self.parents = array.array('l')
+    self.movers = array.array('l')
+    self.actions = []
+    self.visits = array.array('l')
+    self.values = array.array('d')
+    self.children = []
+    self.addNode(-1, None, -1)
+
+  def addNode(self, parent, action, mover):
+    "Adds the child of parent reached by mover taking action, and returns it"
+    node = len(self.actions)
+    self.parents.append(parent)
+    self.movers.append(mover)
+    self.actions.append(action)
+    self.visits.append(0)
+    self.values.append(0.0)
+    self.children.append({})
+    if parent >= 0:
+      self.children[parent][action] = node
+    return node
+
+  def size(self):
+    return len(self.actions)
+
+  def subtree(self, node):
+    "A new tree of node and what lies below it, with node as its root"
+    tree = MCTSTree()
+    tree.visits[0], tree.values[0] = self.visits[node], self.values[node]
+    stack = [(node, 0)]
+    while stack:
+      old, new = stack.pop()
+      for action, child in self.children[old].items():
+        copy = tree.addNode(new, action, self.movers[child])
+        tree.visits[copy], tree.values[copy] = self.visits[child], self.values[child]
+        stack.append((child, copy))
+    return tree
+
+class MCTSAgent(CaptureAgent):
+  """
+  An anytime Monte Carlo tree search agent.  Each turn it plays as many
+  playouts as fit in its share of the move warning time of
+  CaptureRules.getMoveWarningTime, then takes the most visited action.
+
+  A playout picks an action for every agent in turn down the tree with
+  UCB1 (each agent choosing for its own team), adds one node, then plays
+  on with rolloutPolicy for rolloutDepth moves and scores the end state
+  with evaluate, all on a capture.Simulator, so nothing is copied per
+  move.  Opponents out of sight are placed by sampling self.beliefs
+  (see updateBeliefs): a turn's playouts cycle through a few such
+  determinizations of the observation.  The tree is kept between turns:
+  the moves the other agents made since are read off the observations
+  (for an opponent out of sight, the move the tree expected of it) and
+  the tree is re-rooted on them.
+
+  Subclasses should override evaluate, and may override rolloutPolicy.
+  """
+  budgetFraction = 0.8 # of the move warning time spent searching
+  maxIterations = None # playouts per turn at most, None for no limit
+  rolloutDepth = 20 # moves played by rolloutPolicy after the tree
+  exploration = 1.0 # UCB1 exploration constant, on the scale of evaluate
+  determinizations = 4 # samples of hidden opponents per turn
+
+  def registerInitialState(self, gameState):
+    CaptureAgent.registerInitialState(self, gameState)
+    import capture # capture imports this module
+    self.moveBudget = self.budgetFraction * capture.CaptureRules().getMoveWarningTime(self.index)
+    self.initializeBeliefs(gameState)
+    # The leaves' own fields: the team's follow the observations (see getDistanceFields)
+    self.rolloutFields = distanceFields.TeamFields(mazeAnalysis.getMazeAnalysis(gameState.getWalls()), self.red)
+    self.tree = None
+    self.lastAction = None
+    self.playouts = 0
+
+  def chooseAction(self, gameState):
+    self.updateBeliefs(gameState)
+    self.tree = self.rerootedTree(gameState)
+    self.search(gameState, self.moveBudget, self.maxIterations)
+    legal = gameState.getLegalActions(self.index)
+    children = self.tree.children[0]
+    tried = [action for action in legal if action in children]
+    if not tried:
+      self.lastAction = random.choice(legal)
+    else:
+      self.lastAction = max(tried, key=lambda action: self.tree.visits[children[action]])
+    return self.lastAction
+
+  ##########
+  # Search #
+  ##########
+
+  def search(self, gameState, timeLimit = None, iterations = None):
+    """
+    Plays playouts from gameState into self.tree until timeLimit seconds
+    pass or iterations playouts are played, and returns how many were.
+    """
+    import capture
+    start = time.perf_counter()
+    if self.tree == None: self.tree = MCTSTree()
+    simulators = [capture.Simulator(self.determinize(gameState)) for i in range(self.determinizations)]
+    count = 0
+    while (iterations == None or count < iterations) and (timeLimit == None or time.perf_counter() - start < timeLimit):
+      self.playout(simulators[count % len(simulators)])
+      count += 1
+    self.playouts += count
+    return count
+
+  def playout(self, sim):
+    "One selection, expansion, rollout and backup from the root of self.tree"
+    tree = self.tree
+    state = sim.state
+    numAgents = state.getNumAgents()
+    team = self.getTeam(state)
+    agent = self.index
+    node = 0
+    path = [0]
+    while not state.isOver():
+      legal = state.getLegalActions(agent)
+      children = tree.children[node]
+      untried = [action for action in legal if action not in children]
+      if untried:
+        action = random.choice(untried)
+        node = tree.addNode(node, action, agent)
+      else:
+        node = self.selectChild(node, [children[action] for action in legal], agent in team)
+        action = tree.actions[node]
+      sim.apply(agent, action)
+      path.append(node)
+      agent = (agent + 1) % numAgents
+      if untried: break
+    for i in range(self.rolloutDepth):
+      if state.isOver(): break
+      sim.apply(agent, self.rolloutPolicy(state, agent))
+      agent = (agent + 1) % numAgents
+    value = self.evaluate(state)
+    while sim.depth(): sim.undo()
+    for node in path:
+      tree.visits[node] += 1
+      tree.values[node] += value
+
+  def selectChild(self, node, children, ours):
+    "The UCB1 choice among children of node, maximizing the value for our team if ours and minimizing it otherwise"
+    tree = self.tree
+    logVisits = math.log(max(1, tree.visits[node]))
+    sign = 1 if ours else -1
+    best, bestScore = None, None
+    for child in children:
+      visits = tree.visits[child]
+      if visits == 0: return child
+      score = sign * tree.values[child] / visits + self.exploration * math.sqrt(logVisits / visits)
+      if bestScore == None or score > bestScore:
+        best, bestScore = child, score
+    return best
+
+  def rolloutPolicy(self, gameState, agentIndex):
+    "A random legal action, not stopping or turning back when there is another"
+    actions = gameState.getLegalActions(agentIndex)
+    reverse = Directions.REVERSE[gameState.getAgentState(agentIndex).configuration.direction]
+    forward = [action for action in actions if action != Directions.STOP and action != reverse]
+    return random.choice(forward or actions)
+
+  def evaluate(self, gameState):
+    """
+    The value of gameState for this team: the score, half of the food
+    carried (ours less theirs), and a hundredth of a point less for every
+    move between one of us and the closest food, so that playouts that
+    score nothing still lead somewhere.  Override to do better.
+    """
+    carried = 0
+    for index in range(gameState.getNumAgents()):
+      numCarrying = gameState.getAgentState(index).numCarrying
+      carried += numCarrying if gameState.isOnRedTeam(index) == self.red else -numCarrying
+    value = self.getScore(gameState) + 0.5 * carried
+    foodField = self.rolloutFields.update(gameState).food
+    for index in self.getTeam(gameState):
+      distance = foodField.distance(gameState.getAgentPosition(index))
+      if distance != None: value -= 0.01 * distance
+    return value
+
+  ####################
+  # Hidden opponents #
+  ####################
+
+  def determinize(self, gameState):
+    """
+    A copy of gameState with every opponent out of sight put on a cell
+    drawn from its belief.
+    """
+    state = gameState.deepCopy()
+    for opponent in self.getOpponents(gameState):
+      agentState = state.data.agentStates[opponent]
+      if agentState.configuration != None: continue
+      belief = self.beliefs[opponent]
+      cumulative = list(itertools.accumulate(float(p) for p in belief))
+      i = min(bisect.bisect_right(cumulative, random.random() * cumulative[-1]), len(cumulative) - 1)
+      pos = self.sonarModel.cells[i]
+      agentState.configuration = Configuration(pos, Directions.STOP)
+      agentState.isPacman = state.isRed(pos) == self.red
+    return state
+
+  def rerootedTree(self, gameState):
+    """
+    The subtree of self.tree for the moves made since the last turn: this
+    agent's lastAction, then the move of every other agent, found from
+    where it was and is.  An agent out of sight is taken to have made the
+    move the tree expected of it (its most visited).  None if the tree has
+    no node for the moves, or an agent was eaten.
+    """
+    previous = self.getPreviousObservation()
+    if self.tree == None or self.lastAction == None or previous == None: return None
+    numAgents = gameState.getNumAgents()
+    node = self.tree.children[0].get(self.lastAction)
+    for step in range(1, numAgents):
+      if node == None: return None
+      agent = (self.index + step) % numAgents
+      children = self.tree.children[node]
+      before, after = previous.getAgentPosition(agent), gameState.getAgentPosition(agent)
+      if before == None or after == None:
+        node = max(children.values(), key=lambda child: self.tree.visits[child]) if children else None
+        continue
+      dx, dy = after[0] - before[0], after[1] - before[1]
+      if abs(dx) + abs(dy) > 1: return None # eaten on the way
+      node = children.get(Actions.vectorToDirection((dx, dy)))
+    if node == None: return None
+    return self.tree.subtree(node)
+
 class TimeoutAgent( Agent ):
   """
   A random agent that takes too much time. Taking
@@ -21,7 +21,14 @@ distancer = Distancer(gameState.data.layout)
 distancer.getDistance( (1,1), (10,10) )
 """
 
-import sys, time, random
+import sys, time, random, os
+import array, hashlib, mmap, struct, tempfile
+import util
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 class Distancer:
   def __init__(self, layout, default = 10000):
@@ -55,11 +62,7 @@ class Distancer:
     return bestDistance
 
   def getDistanceOnGrid(self, pos1, pos2):
-    key = (pos1, pos2)
-    if key in self._distances:
-      return self._distances[key]
-    else:
-      raise Exception("Positions not in grid: " + str(key))
+    return self._distances.getDistance(pos1, pos2)
 
   def isReadyForMazeDistance(self):
     return self._distances != None
@@ -90,6 +93,12 @@ def getGrids1D(x):
 
 distanceMap = {}
 
+# Directory holding the persistent distance tables, one file per wall layout:
+# the user's cache directory (see util.cacheDirectory), not the checkout.
+# Point PACMAN_DISTANCE_CACHE somewhere else to move it, or set it to an empty
+# string to keep tables in memory only.
+DISTANCE_CACHE_DIR = os.environ.get('PACMAN_DISTANCE_CACHE', util.cacheDirectory('distances'))
+
 class DistanceCalculator:
   def __init__(self, layout, distancer, default = 10000):
     self.layout = layout
@@ -100,54 +109,193 @@ class DistanceCalculator:
     global distanceMap
 
     if self.layout.walls not in distanceMap:
-      distances = computeDistances(self.layout)
+      distances = loadDistances(self.layout.walls)
+      if distances == None:
+        distances = computeDistances(self.layout)
+        saveDistances(self.layout.walls, distances)
       distanceMap[self.layout.walls] = distances
     else:
       distances = distanceMap[self.layout.walls]
 
     self.distancer._distances = distances
 
+# Marks a pair of cells with no path between them.  Lookups translate it back
+# to sys.maxsize, which is what the old UCS reported for unreachable cells.
+UNREACHABLE = 0xFFFF
+
+class DistanceTable:
+  """
+  All-pairs maze distances for one wall grid.
+
+  Every open cell gets a dense integer index (in walls.asList(False) order)
+  and the distances live in a flat row-major array of unsigned shorts, so the
+  whole table costs two bytes per pair instead of a dict entry keyed by a
+  pair of tuples.  When NumPy is installed asMatrix() exposes the same
+  buffer as an (n, n) uint16 matrix without copying it.
+  """
+
+  def __init__(self, cells, distances, buffer = None):
+    self.buffer = buffer # keeps a memory-mapped cache file open while in use
+    self.cells = cells
+    self.cellIndex = dict((cell, i) for i, cell in enumerate(cells))
+    self.numCells = len(cells)
+    self.distances = distances
+
+  def getDistance(self, pos1, pos2):
+    try:
+      d = self.distances[self.cellIndex[pos1] * self.numCells + self.cellIndex[pos2]]
+    except KeyError:
+      raise Exception("Positions not in grid: " + str((pos1, pos2)))
+    if d == UNREACHABLE:
+      return sys.maxsize
+    return d
+
+  def getRow(self, pos):
+    """
+    Returns the distances from pos to every cell, in cell index order.
+    """
+    n = self.numCells
+    start = self.cellIndex[pos] * n
+    return self.distances[start:start + n]
+
+  def asMatrix(self):
+    """
+    Returns the table as an (n, n) NumPy uint16 matrix sharing this table's
+    memory, or None when NumPy is not available.
+    """
+    if numpy is None:
+      return None
+    return numpy.frombuffer(self.distances, dtype=numpy.uint16).reshape(self.numCells, self.numCells)
+
+  # Mapping protocol, so code written against the old {(pos1, pos2): d} dict keeps working
+  def __getitem__(self, key):
+    return self.getDistance(key[0], key[1])
+
+  def __contains__(self, key):
+    return key[0] in self.cellIndex and key[1] in self.cellIndex
+
+  def __len__(self):
+    return self.numCells * self.numCells
+
 def computeDistances(layout):
-    "Runs UCS to all other positions from each position"
-    distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = sys.maxsize
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
-    return distances
+    "Runs BFS to all other positions from each position"
+    walls = layout.walls
+    cells = walls.asList(False)
+    cellIndex = dict((cell, i) for i, cell in enumerate(cells))
+    neighbors = []
+    for x, y in cells:
+        adjacent = []
+        for other in ((x, y+1), (x, y-1), (x+1, y), (x-1, y)):
+            if other in cellIndex:
+                adjacent.append(cellIndex[other])
+        neighbors.append(adjacent)
+
+    n = len(cells)
+    distances = array.array('H')
+    blank = array.array('H', [UNREACHABLE]) * n
+    for source in range(n):
+        row = blank[:]
+        row[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for node in frontier:
+                for other in neighbors[node]:
+                    if row[other] == UNREACHABLE:
+                        row[other] = depth
+                        nextFrontier.append(other)
+            frontier = nextFrontier
+        distances.extend(row)
+    return DistanceTable(cells, distances)
+
+##########################
+# PERSISTENT TABLE CACHE #
+##########################
+
+# File layout: magic, format version, width, height, number of open cells,
+# followed by the row-major uint16 table in native byte order.
+CACHE_MAGIC = b'PMDT' if sys.byteorder == 'little' else b'TDMP'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('=4sHHHI')
+
+def wallsKey(walls):
+  """
+  A hash of the wall grid that is stable across processes (unlike hash()).
+  """
+  digest = hashlib.sha1(('%d,%d\n' % (walls.width, walls.height)).encode())
+  digest.update(str(walls).encode())
+  return digest.hexdigest()
+
+def cachePath(walls, cacheDir = None):
+  if cacheDir == None: cacheDir = DISTANCE_CACHE_DIR
+  if not cacheDir: return None
+  return os.path.join(cacheDir, wallsKey(walls) + '.dist')
 
+def loadDistances(walls, cacheDir = None):
+  """
+  Memory-maps a cached table for walls.  Returns None if there is no usable
+  cache file; the table reads straight out of the mapped file.
+  """
+  path = cachePath(walls, cacheDir)
+  if path == None or not os.path.exists(path):
+    return None
+  try:
+    with open(path, 'rb') as f:
+      buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  except (OSError, ValueError):
+    return None
+  cells = walls.asList(False)
+  n = len(cells)
+  if len(buffer) != CACHE_HEADER.size + 2 * n * n:
+    buffer.close()
+    return None
+  magic, version, width, height, numCells = CACHE_HEADER.unpack_from(buffer)
+  if (magic, version, width, height, numCells) != (CACHE_MAGIC, CACHE_VERSION, walls.width, walls.height, n):
+    buffer.close()
+    return None
+  distances = memoryview(buffer)[CACHE_HEADER.size:].cast('H')
+  return DistanceTable(cells, distances, buffer)
+
+def saveDistances(walls, table, cacheDir = None):
+  """
+  Writes table to the cache for walls.  The file is written under a temporary
+  name and renamed into place, so concurrent readers never see a partial
+  table.  Failures are ignored; the cache is only an optimization.
+  """
+  path = cachePath(walls, cacheDir)
+  if path == None:
+    return None
+  tmpPath = None
+  try:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+      f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, walls.width, walls.height, table.numCells))
+      f.write(table.distances)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmpPath, path)
+    return path
+  except OSError:
+    if tmpPath != None and os.path.exists(tmpPath):
+      os.remove(tmpPath)
+    return None
+
+def prewarm(layouts, cacheDir = None, force = False):
+  """
+  Computes and stores the distance table of every (name, layout) pair that
+  is not cached yet.
+  """
+  for name, layout in layouts:
+    path = cachePath(layout.walls, cacheDir)
+    if not force and loadDistances(layout.walls, cacheDir) != None:
+      print('%-24s %8s  %s' % (name, 'cached', path))
+      continue
+    start = time.time()
+    saveDistances(layout.walls, computeDistances(layout), cacheDir)
+    print('%-24s %7.2fs  %s' % (name, time.time() - start, path))
 
 def getDistanceOnGrid(distances, pos1, pos2):
     key = (pos1, pos2)
@@ -155,3 +303,38 @@ def getDistanceOnGrid(distances, pos1, pos2):
       return distances[key]
     return 100000
 
+
+if __name__ == '__main__':
+  """
+  Pre-warms the persistent distance cache:
+
+  > python distanceCalculator.py                  (every layouts/*.lay)
+  > python distanceCalculator.py RANDOM23 RANDOM7 (specific random mazes)
+  > python distanceCalculator.py --seeds SEEDS    (one random seed per line)
+  """
+  from optparse import OptionParser
+  import layout, mazeGenerator
+  parser = OptionParser('python distanceCalculator.py [options] [LAYOUT|RANDOM<seed> ...]')
+  parser.add_option('--cache', dest='cacheDir', default=DISTANCE_CACHE_DIR,
+                    help='Cache directory [Default: %default]')
+  parser.add_option('--seeds', dest='seeds', default=None,
+                    help='File of random maze seeds, one per line, as written by generateTournamentLayouts.py')
+  parser.add_option('--force', action='store_true', default=False,
+                    help='Recompute tables that are already cached')
+  options, names = parser.parse_args()
+
+  if not names and not options.seeds:
+    names = sorted(f[:-len('.lay')] for f in os.listdir('layouts') if f.endswith('.lay'))
+  if options.seeds:
+    with open(options.seeds) as f:
+      names += ['RANDOM' + line.strip() for line in f if line.strip()]
+
+  layouts = []
+  for name in names:
+    if name.startswith('RANDOM'):
+      l = layout.Layout(mazeGenerator.generateMaze(int(name[6:])).split('\n'))
+    else:
+      l = layout.getLayout(name)
+    if l == None: parser.error('The layout ' + name + ' cannot be found')
+    layouts.append((name, l))
+  prewarm(layouts, options.cacheDir, options.force)
@@ -0,0 +1,181 @@
+# distanceFields.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Distances from every cell of a maze to the nearest of a set of cells.
+
+A DistanceField holds, for every open cell, the maze distance to the
+nearest of its sources, found by one breadth first search from all of
+them at once.  "How far is the closest food from here" is then a list
+lookup for any cell, instead of a search per question.  Sources can be
+added and removed; adding one relaxes the cells it is now closer to, and
+removing one only searches again the cells whose nearest source it was.
+
+TeamFields keeps the fields one team asks about during a game: the food
+it is after, the capsules it can eat, and the border crossings home.
+update brings them up to a state.  From a state to its successor the
+_foodEaten and _foodAdded markers say what changed; they are checked
+against the food bits, and when the state is not the successor of the
+last one the bits are compared (one xor) to find the changes.  The few
+capsules are just compared as lists.
+
+  fields = distanceFields.TeamFields(mazeAnalysis.getMazeAnalysis(walls), self.red)
+  fields.update(gameState)
+  fields.food.distance(pos)      # None if no food can be reached from pos
+"""
+
+import heapq
+
+from game import BitGrid
+
+FAR = 1 << 30 # the distance of cells no source reaches
+
+class DistanceField:
+  """
+  The distances from the cells of maze (a mazeAnalysis.MazeAnalysis) to
+  the nearest source.
+  """
+  def __init__(self, maze, sources = ()):
+    self.maze = maze
+    self.sources = set()
+    self.distances = [FAR] * len(maze.cells)
+    self.add(sources)
+
+  def distance(self, pos):
+    "The distance from pos to the nearest source, or None if none can be reached (or pos is a wall)"
+    i = self.maze.cellIndex.get(pos)
+    if i == None: return None
+    d = self.distances[i]
+    return None if d == FAR else d
+
+  def __getitem__(self, pos):
+    return self.distance(pos)
+
+  def add(self, cells):
+    "Makes cells sources, relaxing the cells now closer to one of them"
+    index = self.maze.cellIndex
+    frontier = []
+    for cell in cells:
+      if cell in index and cell not in self.sources:
+        self.sources.add(cell)
+        self.distances[index[cell]] = 0
+        frontier.append(index[cell])
+    distances, neighbors = self.distances, self.maze.neighbors
+    depth = 0
+    while frontier:
+      depth += 1
+      nextFrontier = []
+      for node in frontier:
+        for other in neighbors[node]:
+          if distances[other] > depth:
+            distances[other] = depth
+            nextFrontier.append(other)
+      frontier = nextFrontier
+
+  def remove(self, cells):
+    """
+    Stops cells being sources.  Only the cells with a shortest path to one
+    of them can get further from the sources; they are cleared and filled
+    in again from the cells around them.
+    """
+    index = self.maze.cellIndex
+    removed = [index[cell] for cell in cells if cell in self.sources]
+    if not removed: return
+    for i in removed:
+      self.sources.discard(self.maze.cells[i])
+    distances, neighbors = self.distances, self.maze.neighbors
+    region = set(removed)
+    stack = list(removed)
+    while stack:
+      node = stack.pop()
+      for other in neighbors[node]:
+        if other not in region and distances[other] == distances[node] + 1:
+          region.add(other)
+          stack.append(other)
+    for node in region:
+      distances[node] = FAR
+    heap = []
+    for node in region:
+      best = min([distances[other] for other in neighbors[node] if other not in region] or [FAR])
+      if best < FAR:
+        heap.append((best + 1, node))
+    heapq.heapify(heap)
+    while heap:
+      d, node = heapq.heappop(heap)
+      if d >= distances[node]: continue
+      distances[node] = d
+      for other in neighbors[node]:
+        if d + 1 < distances[other]:
+          heapq.heappush(heap, (d + 1, other))
+
+  def setSources(self, cells):
+    "Makes cells the sources, changing only what differs"
+    cells = set(cells)
+    self.remove(self.sources - cells)
+    self.add(cells - self.sources)
+
+class TeamFields:
+  """
+  The food, capsule and home fields of the team isRed, kept up to date
+  with update(gameState).
+  """
+  def __init__(self, maze, isRed):
+    self.maze = maze
+    self.isRed = isRed
+    self.home = DistanceField(maze, maze.borderCells(isRed))
+    self.food = DistanceField(maze)
+    self.capsules = DistanceField(maze)
+    self.foodGrid = None
+    self.capsuleList = None
+    self.updates = 0
+
+  def targets(self, gameState):
+    "The food and capsules the team is after in gameState"
+    if self.isRed:
+      return gameState.getBlueFood(), gameState.getBlueCapsules()
+    return gameState.getRedFood(), gameState.getRedCapsules()
+
+  def foodChanges(self, food, data):
+    """
+    The cells whose food differs from the last update: the cells of the
+    _foodEaten and _foodAdded markers when they account for every change
+    (the bits of BitGrids tell), and otherwise the difference of the grids.
+    """
+    old = self.foodGrid
+    if isinstance(food, BitGrid) and isinstance(old, BitGrid):
+      cells = [cell for cell in [data._foodEaten] + list(data._foodAdded or []) if cell != None]
+      bits = old._bits
+      for x, y in cells:
+        bit = 1 << (x * food.height + y)
+        bits = bits | bit if food[x][y] else bits & ~bit
+      if bits == food._bits:
+        return cells
+      return BitGrid(food.width, food.height, bits=food._bits ^ old._bits).asList()
+    return list(set(food.asList()) ^ set(old.asList()))
+
+  def update(self, gameState):
+    "Brings the fields up to gameState, and returns self"
+    food, capsules = self.targets(gameState)
+    if self.foodGrid == None:
+      self.food.setSources(food.asList())
+    elif food != self.foodGrid:
+      changes = self.foodChanges(food, gameState.data)
+      self.food.remove([(x, y) for x, y in changes if not food[x][y]])
+      self.food.add([(x, y) for x, y in changes if food[x][y]])
+    if capsules != self.capsuleList:
+      self.capsules.setSources(capsules)
+    self.foodGrid = food
+    self.capsuleList = capsules
+    self.updates += 1
+    return self
@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import bisect
 import traceback
 import sys
 
@@ -167,6 +168,8 @@ class Grid:
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
+    legalMoves = None # a LegalMoves table, set on the walls of a Layout
+
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
         self.CELLS_PER_INT = 30
@@ -183,6 +186,14 @@ class Grid:
     def __setitem__(self, key, item):
         self.data[key] = item
 
+    def __getstate__(self):
+        # Leave out what can be rebuilt: the column views of a BitGrid, and
+        # the move table (Layout puts it back on its walls when unpickled)
+        state = self.__dict__.copy()
+        state.pop('legalMoves', None)
+        state.pop('_columns', None)
+        return state
+
     def __str__(self):
         out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
         out.reverse()
@@ -274,6 +285,193 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid(Grid):
+    """
+    A boolean Grid backed by a single Python int with one bit per cell.  It
+    keeps the grid[x][y] read/write API, but copy() is O(1), count() is a
+    popcount, asList() only visits the set bits and the hash is cached until
+    the next write.  The count and the asList() cells are cached as well, and
+    copies share those caches; a write that flips a bit adjusts them rather
+    than throwing them away.
+
+    Cell (x, y) is bit x * height + y, the order Grid.__hash__ walks the
+    cells in, so a BitGrid hashes and compares equal to a list-backed Grid
+    with the same contents.  Reading a cell costs a little more than with a
+    list of lists, so walls stay list-backed and food uses this class.
+    """
+    def __init__(self, width, height, initialValue=False, bits=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        if bits is None:
+            bits = (1 << (width * height)) - 1 if initialValue else 0
+        self._bits = bits
+        self._hash = None
+        self._count = None
+        self._cells = None # sorted (x, y) of the set bits; shared by copies, so never changed in place
+        self._columns = None
+
+    def fromGrid(grid):
+        "Builds a BitGrid with the same contents as any boolean grid"
+        bits = 0
+        base = 1
+        for x in range(grid.width):
+            for y in range(grid.height):
+                if grid[x][y]:
+                    bits |= base
+                base <<= 1
+        return BitGrid(grid.width, grid.height, bits=bits)
+    fromGrid = staticmethod(fromGrid)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._columns = None
+
+    def __getitem__(self, i):
+        columns = self._columns
+        if columns is None:
+            columns = self._columns = [_BitColumn(self, x) for x in range(self.width)]
+        return columns[i]
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y in range(self.height):
+            column[y] = item[y]
+
+    def __iter__(self):
+        return iter(self[x] for x in range(self.width))
+
+    def _getData(self):
+        return [list(self[x]) for x in range(self.width)]
+    data = property(_getData, doc="The grid as a fresh list of lists, for code written against Grid.data")
+
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self._bits == other._bits and self.width == other.width and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self._bits)
+        return self._hash
+
+    def copy(self):
+        g = BitGrid(self.width, self.height, bits=self._bits)
+        g._hash = self._hash
+        g._count = self._count
+        g._cells = self._cells
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # A shallow Grid copy shares its storage, so writes through either one
+        # are seen by both; handing back the same object keeps that contract.
+        return self
+
+    def count(self, item=True):
+        ones = self._count
+        if ones is None:
+            ones = self._count = bin(self._bits).count('1')
+        if item == True: return ones
+        if item == False: return self.width * self.height - ones
+        return 0
+
+    def asList(self, key=True):
+        if key == True:
+            if self._cells is None:
+                self._cells = self._scan(self._bits)
+            return self._cells[:]
+        elif key == False:
+            bits = self._bits ^ ((1 << (self.width * self.height)) - 1)
+        else:
+            return []
+        return self._scan(bits)
+
+    def _scan(self, bits):
+        # Scan the binary string (lowest bit first) for set bits: str.find
+        # skips the empty cells at C speed.
+        digits = bin(bits)[:1:-1]
+        height = self.height
+        list = []
+        i = digits.find('1')
+        while i >= 0:
+            list.append((i // height, i % height))
+            i = digits.find('1', i + 1)
+        return list
+
+    def sliceColumns(self, start, stop):
+        """
+        Returns a BitGrid of the same size that keeps only the cells with
+        start <= x < stop.
+        """
+        mask = (1 << (stop * self.height)) - (1 << (start * self.height))
+        return BitGrid(self.width, self.height, bits=self._bits & mask)
+
+    def _flipped(self, x, y, value):
+        "Brings the caches up to date after cell (x, y) was changed to value"
+        self._hash = None
+        if self._count is not None:
+            self._count += 1 if value else -1
+        if self._cells is not None:
+            cells = self._cells[:]
+            if value:
+                bisect.insort(cells, (x, y))
+            else:
+                del cells[bisect.bisect_left(cells, (x, y))]
+            self._cells = cells
+
+class _BitColumn:
+    """
+    The grid[x] view of a BitGrid column.  It reads and writes through to the
+    grid's bits, so it stays valid across writes to the grid.
+    """
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def _bit(self, y):
+        height = self.grid.height
+        if y < 0: y += height
+        if not 0 <= y < height: raise IndexError('grid index out of range')
+        return self.x * height + y
+
+    def __getitem__(self, y):
+        grid = self.grid
+        height = grid.height
+        if 0 <= y < height:
+            return (grid._bits >> (self.x * height + y)) & 1 == 1
+        return (grid._bits >> self._bit(y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        grid = self.grid
+        mask = 1 << self._bit(y)
+        if value:
+            bits = grid._bits | mask
+        else:
+            bits = grid._bits & ~mask
+        if bits != grid._bits:
+            grid._bits = bits
+            grid._flipped(self.x, y % grid.height, bool(value))
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        bits = self.grid._bits >> (self.x * self.grid.height)
+        return iter([(bits >> y) & 1 == 1 for y in range(self.grid.height)])
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -330,6 +528,10 @@ class Actions:
     directionToVector = staticmethod(directionToVector)
 
     def getPossibleActions(config, walls):
+        table = walls.legalMoves
+        if table is not None:
+            actions = table.actions.get(config.pos)
+            if actions is not None: return list(actions)
         possible = []
         x, y = config.pos
         x_int, y_int = int(x + 0.5), int(y + 0.5)
@@ -349,6 +551,10 @@ class Actions:
     getPossibleActions = staticmethod(getPossibleActions)
 
     def getLegalNeighbors(position, walls):
+        table = walls.legalMoves
+        if table is not None:
+            neighbors = table.neighbors.get(position)
+            if neighbors is not None: return list(neighbors)
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
         neighbors = []
@@ -368,18 +574,55 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class LegalMoves:
+    """
+    The legal actions and neighbors of every open cell of a walls grid,
+    worked out once so that Actions.getPossibleActions and
+    Actions.getLegalNeighbors only look them up for agents standing exactly
+    on a cell.  Both are tuples in the order the Actions methods produce.
+    Only valid while the walls are not changed, which is why it is only set
+    on the walls of a Layout (copies of the grid do not carry it).
+    """
+    def __init__(self, walls):
+        self.actions = {}
+        self.neighbors = {}
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if walls[x][y]: continue
+                config = Configuration((x, y), Directions.STOP)
+                self.actions[(x, y)] = tuple(Actions.getPossibleActions(config, walls))
+                self.neighbors[(x, y)] = tuple(Actions.getLegalNeighbors((x, y), walls))
+
 class GameStateData:
     """
 
     """
-    def __init__( self, prevState = None ):
+    # While a list, getMutableAgentState changes shared agent states in place
+    # and logs their old fields to it instead of copying them (see
+    # capture.Simulator)
+    _undoLog = None
+
+    def __init__( self, prevState = None, copyOnWrite = False ):
         """
         Generates a new data packet by copying information from its predecessor.
+
+        With copyOnWrite the agent states and capsules list are shared with
+        prevState instead of copied.  Code that changes them must then go
+        through getMutableAgentState and getMutableCapsules, which copy a
+        shared object the first time it is written.
         """
+        self._sharedAgentStates = 0 # bit i set: agentStates[i] still belongs to prevState
+        self._sharedCapsules = False
         if prevState != None:
             self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            if copyOnWrite:
+                self.capsules = prevState.capsules
+                self.agentStates = prevState.agentStates[:]
+                self._sharedAgentStates = (1 << len(self.agentStates)) - 1
+                self._sharedCapsules = True
+            else:
+                self.capsules = prevState.capsules[:]
+                self.agentStates = self.copyAgentStates( prevState.agentStates )
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
@@ -393,9 +636,13 @@ class GameStateData:
         self.scoreChange = 0
 
     def deepCopy( self ):
+        """
+        Copies everything that changes during a game.  The layout does not,
+        so the copy shares it (and its walls and move table) instead of
+        re-parsing the layout text.
+        """
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -408,6 +655,30 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def getMutableAgentState( self, index ):
+        """
+        Returns agent index's state, copying it first if it is still shared
+        with the state this one was generated from.
+        """
+        if self._sharedAgentStates >> index & 1:
+            self._sharedAgentStates &= ~(1 << index)
+            agentState = self.agentStates[index]
+            if self._undoLog != None:
+                self._undoLog.append((agentState, agentState.configuration, agentState.isPacman,
+                                      agentState.scaredTimer, agentState.numCarrying, agentState.numReturned))
+            else:
+                self.agentStates[index] = agentState.copy()
+        return self.agentStates[index]
+
+    def getMutableCapsules( self ):
+        """
+        Returns the capsule list, copying it first if it is still shared.
+        """
+        if self._sharedCapsules:
+            self._sharedCapsules = False
+            self.capsules = self.capsules[:]
+        return self.capsules
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -510,6 +781,59 @@ try:
 except:
     _BOINC_ENABLED = False
 
+class AgentTimer:
+    """
+    Keeps each agent's time account for a Game played with catchExceptions.
+    Times come from the monotonic time.perf_counter clock and are kept as
+    floats, so budgets are not rounded to whole seconds.  The limits are the
+    rules' getMaxStartupTime, getMoveTimeout, getMoveWarningTime,
+    getMaxTimeWarnings and getMaxTotalTime.
+    """
+    def __init__(self, rules, numAgents):
+        self.rules = rules
+        self.totalTimes = [0 for i in range(numAgents)]
+        self.warnings = [0 for i in range(numAgents)]
+        self.lastCallTime = 0
+
+    def call(self, timeout, function, *args):
+        """
+        Returns (function(*args), seconds taken), or raises
+        TimeoutFunctionException once timeout seconds have passed.
+        """
+        start = time.perf_counter()
+        try:
+            result = TimeoutFunction(function, timeout)(*args)
+        finally:
+            self.lastCallTime = time.perf_counter() - start
+        return result, self.lastCallTime
+
+    def startupTimeout(self, agentIndex):
+        return self.rules.getMaxStartupTime(agentIndex)
+
+    def moveTimeout(self, agentIndex, spent = 0):
+        "The time left for agentIndex's move when spent has already been used on it"
+        return self.rules.getMoveTimeout(agentIndex) - spent
+
+    def chargeStartup(self, agentIndex, seconds):
+        self.totalTimes[agentIndex] += seconds
+
+    def chargeMove(self, agentIndex, seconds):
+        """
+        Adds a move's time to the agent's account, printing any warning.
+        Returns True if the agent has now lost on time.
+        """
+        if seconds > self.rules.getMoveWarningTime(agentIndex):
+            self.warnings[agentIndex] += 1
+            print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.warnings[agentIndex]), file=sys.stderr)
+            if self.warnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.warnings[agentIndex]), file=sys.stderr)
+                return True
+        self.totalTimes[agentIndex] += seconds
+        if self.totalTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+            print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalTimes[agentIndex]), file=sys.stderr)
+            return True
+        return False
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
@@ -525,8 +849,10 @@ class Game:
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
         self.moveHistory = []
-        self.totalAgentTimes = [0 for agent in agents]
-        self.totalAgentTimeWarnings = [0 for agent in agents]
+        self.recorder = None # e.g. a replay.ReplayWriter, told of every move
+        self.timer = AgentTimer(rules, len(agents))
+        self.totalAgentTimes = self.timer.totalTimes
+        self.totalAgentTimeWarnings = self.timer.warnings
         self.agentTimeout = False
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
@@ -587,12 +913,9 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
                         try:
-                            start_time = time.time()
-                            timed_func(self.state.deepCopy())
-                            time_taken = time.time() - start_time
-                            self.totalAgentTimes[i] += time_taken
+                            result, time_taken = self.timer.call(self.timer.startupTimeout(i), agent.registerInitialState, self.state.deepCopy())
+                            self.timer.chargeStartup(i, time_taken)
                         except TimeoutFunctionException:
                             print("Agent %d ran out of time on startup!" % i, file=sys.stderr)
                             self.unmute()
@@ -621,13 +944,11 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
                         try:
-                            start_time = time.time()
-                            observation = timed_func(self.state.deepCopy())
+                            observation, time_taken = self.timer.call(self.timer.moveTimeout(agentIndex), agent.observationFunction, self.state.deepCopy())
                         except TimeoutFunctionException:
                             skip_action = True
-                        move_time += time.time() - start_time
+                        move_time += self.timer.lastCallTime
                         self.unmute()
                     except Exception as data:
                         self.unmute()
@@ -644,12 +965,10 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
                     try:
-                        start_time = time.time()
                         if skip_action:
                             raise TimeoutFunctionException()
-                        action = timed_func( observation )
+                        action, time_taken = self.timer.call(self.timer.moveTimeout(agentIndex, move_time), agent.getAction, observation)
                     except TimeoutFunctionException:
                         print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
                         self.agentTimeout = True
@@ -657,22 +976,9 @@ class Game:
                         self._agentCrash(agentIndex, quiet=True)
                         return
 
-                    move_time += time.time() - start_time
-
-                    if move_time > self.rules.getMoveWarningTime(agentIndex):
-                        self.totalAgentTimeWarnings[agentIndex] += 1
-                        print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
-                        if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
-                            print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
-                            self.agentTimeout = True
-                            self.unmute()
-                            self._agentCrash(agentIndex, quiet=True)
-                            return
+                    move_time += time_taken
 
-                    self.totalAgentTimes[agentIndex] += move_time
-                    #print "Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex])
-                    if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
-                        print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
+                    if self.timer.chargeMove(agentIndex, move_time):
                         self.agentTimeout = True
                         self.unmute()
                         self._agentCrash(agentIndex, quiet=True)
@@ -698,6 +1004,8 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
+            if self.recorder != None:
+                self.recorder.record( agentIndex, action, self.state )
 
             # Change the display
             self.display.update( self.state.data )
@@ -13,12 +13,13 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, BitGrid, LegalMoves
 import os
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+LEGAL_MOVES_CACHE = {}
 
 class Layout:
     """
@@ -29,13 +30,14 @@ class Layout:
         self.width = len(layoutText[0])
         self.height= len(layoutText)
         self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.initializeLegalMoves()
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -62,6 +64,17 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.initializeLegalMoves()
+
+    def initializeLegalMoves(self):
+        # Layouts are re-created from their text (see deepCopy), so share the table
+        key = '\n'.join(self.layoutText)
+        if key not in LEGAL_MOVES_CACHE:
+            LEGAL_MOVES_CACHE[key] = LegalMoves(self.walls)
+        self.walls.legalMoves = LEGAL_MOVES_CACHE[key]
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -0,0 +1,87 @@
+# linearQ.py
+# ----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Linear Q functions over numpy feature matrices.
+
+A LinearQ wraps a dict of weights (as the teams keep them, e.g. in
+QLWeights files) as a vector, giving every feature name a column.  The
+features of all the legal actions of a state are rows of one (actions x
+features) matrix, so their Q values are a single product:
+
+  q = linearQ.LinearQ(MixedAgent.QLWeights['offensiveWeights'])
+  features = q.newMatrix(len(actions))   # filled in by a feature extractor
+  values = q.values(features)
+
+tdUpdate does the approximate Q-learning update for one action,
+  w(i) = w(i) + alpha((reward + discount*max Q(s', a')) - Q(s,a)) * f(i)(s,a)
+one feature at a time with Q and max Q(s', a') recomputed after each, just
+like the dict-based loop it replaces, so that training gives the same
+weights; but the successor's features are a matrix extracted once instead
+of once per feature.  store writes the vector back into the dict.
+"""
+
+import numpy
+
+class LinearQ:
+  """
+  A weight vector with a column per key of weights (a dict), in key order.
+  """
+  def __init__(self, weights):
+    self.weights = weights
+    self.names = list(weights)
+    self.ids = dict((name, i) for i, name in enumerate(self.names))
+    self.vector = numpy.array([weights[name] for name in self.names], dtype=float)
+
+  def newMatrix(self, numActions):
+    "A zeroed (numActions x features) matrix for a feature extractor to fill"
+    return numpy.zeros((numActions, len(self.names)))
+
+  def fromCounters(self, counters):
+    """
+    The matrix of a list of feature Counters, and for each row the columns
+    of its features in the order the Counter has them (the order tdUpdate
+    should update them in).  Features without a weight are left out, as
+    Counter * dict leaves them out of the Q value.
+    """
+    features = self.newMatrix(len(counters))
+    orders = []
+    for row, counter in enumerate(counters):
+      order = []
+      for name, value in counter.items():
+        if name in self.ids:
+          features[row, self.ids[name]] = value
+          order.append(self.ids[name])
+      orders.append(order)
+    return features, orders
+
+  def values(self, features):
+    "The Q value of every row of features"
+    return features.dot(self.vector)
+
+  def tdUpdate(self, features, order, reward, nextFeatures, discount, learningRate):
+    """
+    Updates the weights for one action with features (a row vector) that
+    led to reward and to a state whose actions have nextFeatures (a
+    matrix, with no rows if the state has no legal actions).
+    """
+    for i in order:
+      value = self.values(nextFeatures).max() if len(nextFeatures) else 0.0
+      correction = (reward + discount * value) - features.dot(self.vector)
+      self.vector[i] = self.vector[i] + learningRate * correction * features[i]
+
+  def store(self):
+    "Writes the weights back into the dict they came from"
+    for name, weight in zip(self.names, self.vector):
+      self.weights[name] = float(weight)
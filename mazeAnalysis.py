@@ -0,0 +1,194 @@
+# mazeAnalysis.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Traps, chokepoints and border crossings of a maze, found once per layout.
+
+The open cells of a layout form a graph whose shape does not change
+during a game, so what an agent wants to know about it can be worked out
+once and then looked up:
+
+ - the articulation points (chokepoints): cells whose loss splits the
+   maze, found with Tarjan's lowlink algorithm;
+ - the dead-end tunnels: the cells left when cells with at most one open
+   neighbour are peeled off until none are left.  What is peeled off are
+   trees hanging off the rest of the maze, each at a single exit cell; a
+   pacman in one can only get out through its exit.  Every tunnel cell
+   knows its exit and its depth, the number of moves to the exit;
+ - the border crossings of each side: the cells next to the center line
+   with an open cell on the other side, and how far every cell is from
+   the nearest of them.
+
+Analyses are cached per wall grid, like the distance tables of
+distanceCalculator, so every agent of every game on a layout shares one:
+
+  maze = mazeAnalysis.getMazeAnalysis(gameState.getWalls())
+  if maze.trapDepth(pos) > 0: exit = maze.trapExit(pos)
+"""
+
+class MazeAnalysis:
+  """
+  The analysis of one wall grid.  Queries take (x, y) cells and cost one
+  dict lookup; walls and cells off the grid are neither traps nor
+  chokepoints.
+  """
+  def __init__(self, walls):
+    self.width = walls.width
+    self.height = walls.height
+    self.cells = walls.asList(False)
+    self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+    self.neighbors = []
+    for x, y in self.cells:
+      adjacent = [self.cellIndex[other] for other in ((x, y+1), (x, y-1), (x+1, y), (x-1, y))
+                  if other in self.cellIndex]
+      self.neighbors.append(adjacent)
+    self.articulationPoints = self.findArticulationPoints()
+    self.depths, self.exits = self.findTunnels()
+    middle = self.width // 2
+    self.borders = {
+      True: [(middle - 1, y) for y in range(self.height)
+             if (middle - 1, y) in self.cellIndex and (middle, y) in self.cellIndex],
+      False: [(middle, y) for y in range(self.height)
+              if (middle, y) in self.cellIndex and (middle - 1, y) in self.cellIndex],
+    }
+    self.homeDistances = dict((isRed, self.distancesFrom(self.borders[isRed])) for isRed in (True, False))
+
+  def findArticulationPoints(self):
+    "Tarjan's lowlink search, with an explicit stack so big mazes do not hit the recursion limit"
+    n = len(self.cells)
+    order = [-1] * n
+    low = [0] * n
+    points = set()
+    counter = 0
+    for root in range(n):
+      if order[root] != -1: continue
+      order[root] = low[root] = counter
+      counter += 1
+      rootChildren = 0
+      stack = [(root, -1, iter(self.neighbors[root]))]
+      while stack:
+        node, parent, children = stack[-1]
+        child = next(children, None)
+        if child == None:
+          stack.pop()
+          if parent != -1:
+            low[parent] = min(low[parent], low[node])
+            if parent != root and low[node] >= order[parent]:
+              points.add(self.cells[parent])
+          continue
+        if order[child] == -1:
+          order[child] = low[child] = counter
+          counter += 1
+          if node == root: rootChildren += 1
+          stack.append((child, node, iter(self.neighbors[child])))
+        elif child != parent:
+          low[node] = min(low[node], order[child])
+      if rootChildren > 1:
+        points.add(self.cells[root])
+    return frozenset(points)
+
+  def findTunnels(self):
+    """
+    Peels off cells with at most one neighbour left, then walks each peeled
+    tree from the cell it hangs off.  Returns the depth and exit of every
+    tunnel cell.  A maze that is all tree has no cells left to exit to; its
+    tunnels then lead to the cell peeled last.
+    """
+    n = len(self.cells)
+    degree = [len(adjacent) for adjacent in self.neighbors]
+    peeled = [False] * n
+    queue = [i for i in range(n) if degree[i] <= 1]
+    for i in queue:
+      peeled[i] = True
+    head = 0
+    while head < len(queue):
+      node = queue[head]
+      head += 1
+      for other in self.neighbors[node]:
+        if not peeled[other]:
+          degree[other] -= 1
+          if degree[other] <= 1:
+            peeled[other] = True
+            queue.append(other)
+    depths, exits = {}, {}
+    roots = [i for i in range(n) if not peeled[i]]
+    if not roots and queue:
+      # No cycles at all: call the last cell peeled (a center of the tree) the exit
+      roots = [queue[-1]]
+      peeled[queue[-1]] = False
+    for root in roots:
+      frontier = [other for other in self.neighbors[root] if peeled[other] and other not in depths]
+      depth = 1
+      while frontier:
+        nextFrontier = []
+        for node in frontier:
+          cell = self.cells[node]
+          if cell in depths: continue
+          depths[cell] = depth
+          exits[cell] = self.cells[root]
+          nextFrontier.extend(other for other in self.neighbors[node]
+                              if peeled[other] and self.cells[other] not in depths)
+        frontier = nextFrontier
+        depth += 1
+    return depths, exits
+
+  def distancesFrom(self, sources):
+    "Maze distances from the nearest of sources to every cell they reach, by one BFS"
+    distances = dict((cell, 0) for cell in sources)
+    frontier = [self.cellIndex[cell] for cell in sources]
+    depth = 0
+    while frontier:
+      depth += 1
+      nextFrontier = []
+      for node in frontier:
+        for other in self.neighbors[node]:
+          if self.cells[other] not in distances:
+            distances[self.cells[other]] = depth
+            nextFrontier.append(other)
+      frontier = nextFrontier
+    return distances
+
+  def trapDepth(self, pos):
+    "Moves from pos to the exit of its dead-end tunnel; 0 outside tunnels"
+    return self.depths.get(pos, 0)
+
+  def trapExit(self, pos):
+    "The cell a pacman at pos must pass to leave its tunnel, or None outside tunnels"
+    return self.exits.get(pos)
+
+  def openNeighbors(self, pos):
+    return len(self.neighbors[self.cellIndex[pos]]) if pos in self.cellIndex else 0
+
+  def homeDistance(self, pos, isRed):
+    "Moves from pos to the nearest border crossing of a side, i.e. home for a pacman; None if there is none"
+    return self.homeDistances[bool(isRed)].get(pos)
+
+  def isDeadEnd(self, pos):
+    return pos in self.depths
+
+  def isChokepoint(self, pos):
+    "Whether taking pos out of the maze would split it"
+    return pos in self.articulationPoints
+
+  def borderCells(self, isRed):
+    "The cells of a side's home column that a pacman can cross the center line from"
+    return self.borders[bool(isRed)]
+
+MAZE_CACHE = {}
+
+def getMazeAnalysis(walls):
+  "The analysis of walls, made once per process"
+  if walls not in MAZE_CACHE:
+    MAZE_CACHE[walls] = MazeAnalysis(walls)
+  return MAZE_CACHE[walls]
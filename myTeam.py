@@ -27,7 +27,15 @@ from util import nearestPoint
 
 # Import PDDL solver
 BASE_FOLDER = os.path.dirname(os.path.abspath(__file__))
-from lib_piglet.utils.pddl_solver import pddl_solver
+import pddlDomain
+import pddlState
+import planCache
+import mazeAnalysis
+
+# Set to a file name (e.g. BASE_FOLDER + '/myTeam.plans') to keep solved PDDL plans between runs
+PLAN_CACHE_FILE = None
+# PDDL planner: 'piglet', 'bitset' (built in, see pddlDomain.py), or None for pddlDomain.DEFAULT_BACKEND
+PDDL_BACKEND = None
 
 #################
 # Team Coordination #
@@ -65,7 +73,6 @@ class TeamCoordinator:
     def isClaimedByTeammate(self, food, myIndex):
         return food in self.claimedFood
 
-teamCoordinator = TeamCoordinator()
 
 #################
 # Team creation #
@@ -91,8 +98,11 @@ class HybridAgent(CaptureAgent):
         CaptureAgent.registerInitialState(self, gameState)
         self.start = gameState.getAgentPosition(self.index)
         
-        # PDDL solver setup
-        self.pddl_solver = pddl_solver(BASE_FOLDER + '/myTeam.pddl')
+        # PDDL solver setup; the domain is compiled once per process and shared
+        self.pddl_solver = pddlDomain.DomainSolver(BASE_FOLDER + '/myTeam.pddl', PDDL_BACKEND)
+        self.planCache = planCache.getPlanCache(BASE_FOLDER + '/myTeam.pddl', PLAN_CACHE_FILE)
+        self.predicates = self.buildPredicates(gameState)
+        self.pddlChanges = None
         self.currentPlan = []
         self.currentAction = None
         
@@ -101,16 +111,25 @@ class HybridAgent(CaptureAgent):
         self.planExecutionSteps = 0
         self.MAX_PLAN_STEPS = 15
         
-        # Caching for performance
-        self.deadEndCache = {}
-        self.pathCache = {}
-        self.pathCacheTime = {}
+        # Traps and chokepoints of the layout, worked out once per process
+        self.maze = mazeAnalysis.getMazeAnalysis(gameState.getWalls())
         
-        # Register with team coordinator
-        global teamCoordinator
-        self.coordinator = teamCoordinator
-        self.coordinator.updateStrategy(self.index, "initializing")
+        # Caching for performance, shared with the teammate for this game
+        self.pathCache = self.blackboard.share('pathCache', dict)
+        self.pathCacheTime = self.blackboard.share('pathCacheTime', dict)
         
+        # Register with the team's coordinator
+        self.coordinator = self.blackboard.share('coordinator', TeamCoordinator)
+        self.coordinator.updateStrategy(self.index, "initializing")
+
+    def final(self, gameState):
+        """
+        Saves the solved PDDL plans for later runs, if PLAN_CACHE_FILE is set.
+        """
+        CaptureAgent.final(self, gameState)
+        if PLAN_CACHE_FILE:
+            self.planCache.save(PLAN_CACHE_FILE)
+
     def chooseAction(self, gameState):
         """
         Main decision loop: uses PDDL for strategic planning and heuristics for tactical execution.
@@ -155,7 +174,7 @@ class HybridAgent(CaptureAgent):
         
         # Check for significant state changes
         myState = gameState.getAgentState(self.index)
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         ghosts = [a for a in enemies if not a.isPacman and a.getPosition() != None]
         
         # Replan if threat level changed drastically
@@ -173,14 +192,9 @@ class HybridAgent(CaptureAgent):
         """
         objects, initState, positiveGoals, negativeGoals = self.getPDDLState(gameState)
         
-        self.pddl_solver.parser_.reset_problem()
-        self.pddl_solver.parser_.set_objects(objects)
-        self.pddl_solver.parser_.set_state(initState)
-        self.pddl_solver.parser_.set_positive_goals(positiveGoals)
-        self.pddl_solver.parser_.set_negative_goals(negativeGoals)
-        
         try:
-            plan = self.pddl_solver.solve()
+            # Both agents share the cache, so a problem is only solved once per game (or run)
+            plan = self.planCache.plan(self.pddl_solver, objects, initState, positiveGoals, negativeGoals)
             if plan and len(plan) > 0:
                 self.currentPlan = plan
                 self.currentAction = plan[0][0].name
@@ -192,6 +206,92 @@ class HybridAgent(CaptureAgent):
             self.currentAction = "collect-food"
             print(f"Agent {self.index}: PDDL solver error: {e}")
     
+    def buildPredicates(self, gameState):
+        """
+        Sets up the PDDL :init predicates as groups, each recomputed by
+        getPDDLState only when the parts of the state it reads change.
+        """
+        me = 'a{}'.format(self.index)
+        enemies = self.getOpponents(gameState)
+        team_indices = self.getTeam(gameState)
+        builder = pddlState.PredicateBuilder()
+
+        def food(gameState):
+            return [('food_available',)] if self.getFood(gameState).count() > 0 else []
+
+        def carrying(gameState):
+            myState = gameState.getAgentState(self.index)
+            atoms = []
+            if myState.numCarrying > 0:
+                atoms.append(('food_in_backpack', me))
+                if myState.numCarrying >= 2:
+                    atoms.append(('2_food_in_backpack', me))
+                if myState.numCarrying >= 3:
+                    atoms.append(('3_food_in_backpack', me))
+                if myState.numCarrying >= 5:
+                    atoms.append(('5_food_in_backpack', me))
+            if myState.isPacman:
+                atoms.append(('is_pacman', me))
+            return atoms
+
+        def invaders(gameState):
+            atoms = []
+            for enemy in enemies:
+                if gameState.getAgentState(enemy).isPacman:
+                    atoms += [('is_pacman', 'e{}'.format(enemy)), ('invaders_present',)]
+            return atoms
+
+        def scared(gameState):
+            atoms = []
+            for enemy in enemies:
+                if gameState.getAgentState(enemy).scaredTimer > 0:
+                    atoms += [('is_scared', 'e{}'.format(enemy)), ('can_hunt_ghosts',)]
+            return atoms
+
+        def enemiesAround(gameState):
+            myPos = gameState.getAgentPosition(self.index)
+            atoms = []
+            for enemy in enemies:
+                enemyState = gameState.getAgentState(enemy)
+                if enemyState.getPosition() is not None and self.getMazeDistance(myPos, enemyState.getPosition()) <= 4:
+                    atoms.append(('enemy_around', 'e{}'.format(enemy), me))
+                    if enemyState.scaredTimer > 0:
+                        atoms.append(('scared_ghost_near', me))
+            return atoms
+
+        def capsules(gameState):
+            myPos = gameState.getAgentPosition(self.index)
+            capsules = self.getCapsules(gameState)
+            if len(capsules) == 0:
+                return []
+            capsuleDist = self.getDistanceFields(gameState).capsules.distance(myPos)
+            if capsuleDist is not None and capsuleDist <= 4:
+                return [('capsule_available',), ('near_capsule', me)]
+            return [('capsule_available',)]
+
+        def nearFood(gameState):
+            myPos = gameState.getAgentPosition(self.index)
+            foodDist = self.getDistanceFields(gameState).food.distance(myPos)
+            if foodDist is not None and foodDist <= 4:
+                return [('near_food', me)]
+            return []
+
+        def role(gameState):
+            # Assign roles
+            if self.index == min(team_indices):
+                return [('is_attacker', me)]
+            return [('is_defender', me)]
+
+        builder.addGroup(('food',), food)
+        builder.addGroup(('carrying', 'pacman'), carrying)
+        builder.addGroup(('pacman',), invaders)
+        builder.addGroup(('scared',), scared)
+        builder.addGroup(('positions', 'scared'), enemiesAround)
+        builder.addGroup(('capsules', 'positions'), capsules)
+        builder.addGroup(('food', 'positions'), nearFood)
+        builder.addGroup((), role)
+        return builder
+
     def getPDDLState(self, gameState):
         """
         Converts game state to PDDL representation with dynamic goal prioritization.
@@ -212,71 +312,14 @@ class HybridAgent(CaptureAgent):
         objects.append(('e{}'.format(enemies[0]), 'enemy1'))
         objects.append(('e{}'.format(enemies[1]), 'enemy2'))
         
-        # Build predicates
-        initState = []
-        
-        # Food availability
-        foodList = self.getFood(gameState).asList()
-        if len(foodList) > 0:
-            initState.append(('food_available',))
-        
-        # Food carrying status
-        if myState.numCarrying > 0:
-            initState.append(('food_in_backpack', 'a{}'.format(self.index)))
-            if myState.numCarrying >= 2:
-                initState.append(('2_food_in_backpack', 'a{}'.format(self.index)))
-            if myState.numCarrying >= 3:
-                initState.append(('3_food_in_backpack', 'a{}'.format(self.index)))
-            if myState.numCarrying >= 5:
-                initState.append(('5_food_in_backpack', 'a{}'.format(self.index)))
-        
-        if myState.isPacman:
-            initState.append(('is_pacman', 'a{}'.format(self.index)))
-        
-        # Enemy states
-        enemyStates = [gameState.getAgentState(i) for i in enemies]
-        for i, enemyState in enumerate(enemyStates):
-            enemy_obj = 'e{}'.format(enemies[i])
-            
-            if enemyState.isPacman:
-                initState.append(('is_pacman', enemy_obj))
-                initState.append(('invaders_present',))
-            
-            if enemyState.scaredTimer > 0:
-                initState.append(('is_scared', enemy_obj))
-                initState.append(('can_hunt_ghosts',))
-            
-            if enemyState.getPosition() is not None:
-                dist = self.getMazeDistance(myPos, enemyState.getPosition())
-                if dist <= 4:
-                    initState.append(('enemy_around', enemy_obj, 'a{}'.format(self.index)))
-                    if enemyState.scaredTimer > 0:
-                        initState.append(('scared_ghost_near', 'a{}'.format(self.index)))
-        
-        # Capsule availability and proximity
+        # Build predicates; only the groups whose inputs changed are recomputed
+        initState, self.pddlChanges = self.predicates.update(gameState)
+        foodList = self.getFoodList(gameState)
         capsules = self.getCapsules(gameState)
-        if len(capsules) > 0:
-            initState.append(('capsule_available',))
-            for cap in capsules:
-                if self.getMazeDistance(myPos, cap) <= 4:
-                    initState.append(('near_capsule', 'a{}'.format(self.index)))
-                    break
-        
-        # Food proximity
-        if len(foodList) > 0:
-            minFoodDist = min([self.getMazeDistance(myPos, food) for food in foodList])
-            if minFoodDist <= 4:
-                initState.append(('near_food', 'a{}'.format(self.index)))
         
         # Check teammate coordination
         teammateStrategy = self.coordinator.getTeammateStrategy(self.index, team_indices)
         
-        # Assign roles
-        if self.index == min(team_indices):
-            initState.append(('is_attacker', 'a{}'.format(self.index)))
-        else:
-            initState.append(('is_defender', 'a{}'.format(self.index)))
-        
         # Dynamic goal prioritization based on game state
         positiveGoals = []
         negativeGoals = []
@@ -288,7 +331,7 @@ class HybridAgent(CaptureAgent):
         foodDefending = len(self.getFoodYouAreDefending(gameState).asList())
         
         # Assess threats
-        enemyStatesVisible = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemyStatesVisible = self.getEnemyStates(gameState)
         ghosts = [a for a in enemyStatesVisible if not a.isPacman and a.getPosition() != None and a.scaredTimer == 0]
         invaders = [a for a in enemyStatesVisible if a.isPacman and a.getPosition() != None]
         scaredGhosts = [a for a in enemyStatesVisible if a.scaredTimer > 5 and a.getPosition() != None]
@@ -472,78 +515,63 @@ class HybridAgent(CaptureAgent):
         else:
             return self.collectFood(gameState, actions)
     
+    # Views of the current observation, made once per move for the team (see captureAgents.TeamBlackboard)
+    
+    def getFoodList(self, gameState):
+        """
+        The food to eat as a list; the teammate reuses it until food is eaten.
+        """
+        return self.blackboard.view(gameState, 'foodList', lambda state: self.getFood(state).asList(),
+                                    lambda state: state.data.food)
+    
+    def getEnemyStates(self, gameState):
+        """
+        The AgentStates of the opponents as this team observes them.
+        """
+        return self.blackboard.view(gameState, 'enemyStates',
+                                    lambda state: [state.getAgentState(i) for i in self.getOpponents(state)])
+    
     # Low-level helper methods for strategic decisions
     
     def isDeadEnd(self, gameState, position):
         """
         Returns True if position has only one exit.
         """
-        if position in self.deadEndCache:
-            return self.deadEndCache[position]
-        
-        walls = gameState.getWalls()
-        x, y = int(position[0]), int(position[1])
-        
-        neighbors = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-        openNeighbors = 0
-        for nx, ny in neighbors:
-            if 0 <= nx < walls.width and 0 <= ny < walls.height:
-                if not walls[nx][ny]:
-                    openNeighbors += 1
-        
-        isDeadEnd = openNeighbors <= 1
-        self.deadEndCache[position] = isDeadEnd
-        return isDeadEnd
+        return self.maze.isDeadEnd(position) and self.maze.openNeighbors(position) <= 1
     
     def hasEscapeRoute(self, gameState, position, ghosts):
         """
-        Uses BFS to check if there's a safe path back to home territory.
+        Checks that a pacman at position can get home past the ghosts: home must be
+        less than 10 moves away, no dangerous ghost may reach the border cell nearest
+        the pacman before it does, and inside a dead-end tunnel no dangerous ghost may
+        reach the tunnel's exit first either.
         """
         if len(ghosts) == 0:
             return True
         
-        walls = gameState.getWalls()
         homeX = gameState.data.layout.width // 2 - 1 if self.red else gameState.data.layout.width // 2
+        if (self.red and position[0] <= homeX) or (not self.red and position[0] >= homeX):
+            return True
         
-        from util import Queue
-        queue = Queue()
-        queue.push(position)
-        visited = set([position])
+        homeDistance = self.maze.homeDistance(position, self.red)
+        if homeDistance == None or homeDistance >= 10:
+            return False # too far to count on getting home
         
-        maxDepth = 10
-        depth = 0
+        dangerous = [ghost.getPosition() for ghost in ghosts if ghost.scaredTimer == 0]
+        if dangerous:
+            crossing = min(self.maze.borderCells(self.red), key=lambda cell: self.getMazeDistance(position, cell))
+            for ghostPos in dangerous:
+                if self.getMazeDistance(ghostPos, crossing) <= homeDistance:
+                    return False # the ghost is at the border first
         
-        while not queue.isEmpty() and depth < maxDepth:
-            size = len(queue.list)
-            for _ in range(size):
-                pos = queue.pop()
-                x, y = int(pos[0]), int(pos[1])
-                
-                if (self.red and x <= homeX) or (not self.red and x >= homeX):
-                    return True
-                
-                for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    nx, ny = x + dx, y + dy
-                    nextPos = (nx, ny)
-                    
-                    if (0 <= nx < walls.width and 0 <= ny < walls.height and 
-                        not walls[nx][ny] and nextPos not in visited):
-                        
-                        tooClose = False
-                        for ghost in ghosts:
-                            if ghost.scaredTimer == 0:
-                                gPos = ghost.getPosition()
-                                if self.getMazeDistance(nextPos, gPos) <= 2:
-                                    tooClose = True
-                                    break
-                        
-                        if not tooClose:
-                            visited.add(nextPos)
-                            queue.push(nextPos)
-            
-            depth += 1
-        
-        return False
+        depth = self.maze.trapDepth(position)
+        if depth == 0:
+            return True
+        exitCell = self.maze.trapExit(position)
+        for ghostPos in dangerous:
+            if self.getMazeDistance(exitCell, ghostPos) <= depth + 1:
+                return False
+        return True
     
     def evaluateFoodTarget(self, gameState, food, ghosts):
         """
@@ -573,7 +601,7 @@ class HybridAgent(CaptureAgent):
         distToHome = abs(food[0] - homeX)
         score -= distToHome * 0.5 * myState.numCarrying
         
-        foodList = self.getFood(gameState).asList()
+        foodList = self.getFoodList(gameState)
         nearbyFood = sum(1 for f in foodList if self.getMazeDistance(food, f) <= 3)
         score += nearbyFood * 3
         
@@ -712,12 +740,12 @@ class HybridAgent(CaptureAgent):
         """
         myPos = gameState.getAgentPosition(self.index)
         myState = gameState.getAgentState(self.index)
-        foodList = self.getFood(gameState).asList()
+        foodList = self.getFoodList(gameState)
         
         if len(foodList) == 0:
             return self.returnHome(gameState, actions)
         
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         ghosts = [a for a in enemies if not a.isPacman and a.getPosition() != None and a.scaredTimer == 0]
         
         # Emergency retreat if carrying food and ghost nearby
@@ -763,7 +791,7 @@ class HybridAgent(CaptureAgent):
         """
         myPos = gameState.getAgentPosition(self.index)
         
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         ghosts = [a for a in enemies if not a.isPacman and a.getPosition() != None and a.scaredTimer == 0]
         
         # Determine home boundary
@@ -820,7 +848,7 @@ class HybridAgent(CaptureAgent):
         if len(capsules) == 0:
             return self.collectFood(gameState, actions)
         
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         ghosts = [a for a in enemies if not a.isPacman and a.getPosition() != None and a.scaredTimer == 0]
         
         if len(ghosts) > 0:
@@ -835,7 +863,7 @@ class HybridAgent(CaptureAgent):
         Pursues scared ghosts for bonus points.
         """
         myPos = gameState.getAgentPosition(self.index)
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         scaredGhosts = [a for a in enemies if a.scaredTimer > 0 and a.getPosition() != None]
         
         if len(scaredGhosts) == 0:
@@ -849,7 +877,7 @@ class HybridAgent(CaptureAgent):
         Intercepts invaders using A* pathfinding and coordination to split targets.
         """
         myPos = gameState.getAgentPosition(self.index)
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         invaders = [a for a in enemies if a.isPacman and a.getPosition() != None]
         ghosts = []
         
@@ -895,12 +923,11 @@ class HybridAgent(CaptureAgent):
         myPos = gameState.getAgentPosition(self.index)
         
         foodDefending = self.getFoodYouAreDefending(gameState).asList()
+        walls = gameState.getWalls()
+        width = walls.width
+        height = walls.height
         
         if len(foodDefending) > 0:
-            walls = gameState.getWalls()
-            width = walls.width
-            height = walls.height
-            
             if self.red:
                 boundary = width // 2 - 1
             else:
@@ -948,8 +975,11 @@ class HybridAgent(CaptureAgent):
             centerX = width // 2 - 3
         else:
             centerX = width // 2 + 3
+        center = (centerX, centerY)
+        if walls[centerX][centerY]:
+            center = min(self.maze.cells, key=lambda cell: util.manhattanDistance(cell, center))
         
-        return self.moveTowards(gameState, actions, (centerX, centerY), avoidGhosts=False)
+        return self.moveTowards(gameState, actions, center, avoidGhosts=False)
     
     def moveTowardsSmart(self, gameState, actions, target, ghosts):
         """
@@ -1016,7 +1046,7 @@ class HybridAgent(CaptureAgent):
         bestDist = 999999
         bestAction = random.choice(actions)
         
-        enemies = [gameState.getAgentState(i) for i in self.getOpponents(gameState)]
+        enemies = self.getEnemyStates(gameState)
         ghosts = [a for a in enemies if not a.isPacman and a.getPosition() != None]
         
         for action in actions:
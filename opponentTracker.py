@@ -0,0 +1,242 @@
+# opponentTracker.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Particle filters that track where unseen opponents are.
+
+Each opponent gets a ParticleFilter over the open cells of the board (the
+cells of capture.SonarModel).  On every observation its particles take one
+random legal move, are weighed by the sonar reading (getDistanceProb for
+every cell, via SonarModel.likelihood), are ruled out wherever the
+opponent would have been seen or where it would be on the wrong side for
+its isPacman flag, and are resampled.  Deaths send an agent back to its
+start, which the filter notices from what the observation still shows:
+
+  - a pacman that turns into a ghost was eaten or has made it home, so
+    half the particles are moved to its start;
+  - a scared ghost whose timer drops straight to 0 was eaten;
+  - if no particle is left that fits the evidence, the opponent is most
+    likely back at its start (otherwise anywhere out of sight).
+
+Particles are numpy arrays when numpy is installed and lists otherwise.
+Subclass TrackingAgent to have the tracker updated from
+observationFunction:
+
+  class MyAgent(TrackingAgent):
+    def chooseAction(self, gameState):
+      ghost = self.tracker.mostLikelyPosition(self.getOpponents(gameState)[0])
+      ...
+"""
+
+import random
+
+from captureAgents import CaptureAgent
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+NUM_PARTICLES = 1000
+
+class ParticleFilter:
+  """
+  Particles for one agent, each the index of a cell of model.
+  """
+
+  def __init__(self, model, numParticles = NUM_PARTICLES, seed = None):
+    self.model = model
+    self.numParticles = numParticles
+    n = model.numCells
+    # The legal-move graph as adjacency lists, compressed into one array
+    # (neighbors[offsets[i]:offsets[i + 1]] are the moves from cell i); the
+    # model lists its edges grouped by source cell
+    counts = [0] * n
+    for i in model.src: counts[i] += 1
+    offsets = [0]
+    for c in counts: offsets.append(offsets[-1] + c)
+    if numpy != None:
+      self.rng = numpy.random.default_rng(seed)
+      self.offsets = numpy.array(offsets)
+      self.degrees = numpy.array(counts)
+      self.neighbors = numpy.asarray(model.dst)
+    else:
+      self.rng = random.Random(seed)
+      self.moves = [list(model.dst[offsets[i]:offsets[i + 1]]) for i in range(n)]
+    self.particles = None
+
+  def placeAt(self, cell):
+    "Puts every particle on the cell at index cell"
+    if numpy != None: self.particles = numpy.full(self.numParticles, cell)
+    else: self.particles = [cell] * self.numParticles
+
+  def spread(self, weights):
+    "Draws every particle afresh from the cell weights (a model vector)"
+    total = float(sum(weights))
+    if numpy != None:
+      self.particles = self.rng.choice(self.model.numCells, size=self.numParticles, p=numpy.asarray(weights) / total)
+    else:
+      self.particles = self.rng.choices(range(self.model.numCells), weights, k=self.numParticles)
+
+  def elapseTime(self):
+    "Moves every particle to a random legal neighbor (staying put included)"
+    p = self.particles
+    if numpy != None:
+      steps = (self.rng.random(self.numParticles) * self.degrees[p]).astype(int)
+      self.particles = self.neighbors[self.offsets[p] + steps]
+    else:
+      self.particles = [self.rng.choice(self.moves[i]) for i in p]
+
+  def observe(self, cellWeights):
+    """
+    Weighs the particles by the weight of their cell and resamples them.
+    Returns False, leaving the particles alone, if every weight is zero.
+    """
+    p = self.particles
+    if numpy != None:
+      weights = numpy.asarray(cellWeights)[p]
+      total = weights.sum()
+      if total <= 0: return False
+      # Systematic resampling: one random offset, evenly spaced picks
+      picks = (self.rng.random() + numpy.arange(self.numParticles)) * (total / self.numParticles)
+      chosen = numpy.searchsorted(numpy.cumsum(weights), picks, side='right')
+      self.particles = p[numpy.minimum(chosen, self.numParticles - 1)]
+    else:
+      weights = [cellWeights[i] for i in p]
+      if sum(weights) <= 0: return False
+      self.particles = self.rng.choices(p, weights, k=self.numParticles)
+    return True
+
+  def mix(self, cell, fraction):
+    "Moves a random fraction of the particles to the cell at index cell"
+    k = int(self.numParticles * fraction)
+    if numpy != None:
+      self.particles = self.particles.copy()
+      self.particles[self.rng.choice(self.numParticles, size=k, replace=False)] = cell
+    else:
+      for i in self.rng.sample(range(self.numParticles), k): self.particles[i] = cell
+
+  def getBelief(self):
+    "The share of particles on each cell, as a model vector"
+    if numpy != None:
+      return numpy.bincount(self.particles, minlength=self.model.numCells) / float(self.numParticles)
+    belief = self.model.zeros()
+    for i in self.particles: belief[i] += 1.0 / self.numParticles
+    return belief
+
+class OpponentTracker:
+  """
+  Tracks the opponents of agent from the observations it is given.
+  """
+
+  def __init__(self, agent, gameState, numParticles = NUM_PARTICLES, seed = None):
+    self.agent = agent
+    self.model = gameState.getSonarModel()
+    self.opponents = agent.getOpponents(gameState)
+    self.team = agent.getTeam(gameState)
+    if seed == None: seed = random.getrandbits(32)
+    self.starts = {}
+    self.filters = {}
+    self.lastStates = {}
+    # Cells on which an opponent is a pacman, and on which it is a ghost
+    halfway = gameState.data.layout.width // 2
+    redSide = [1.0 if x < halfway else 0.0 for x, y in self.model.cells]
+    blueSide = [1.0 - r for r in redSide]
+    self.sides = {}
+    for i, opponent in enumerate(self.opponents):
+      home = redSide if gameState.isOnRedTeam(opponent) else blueSide
+      away = blueSide if gameState.isOnRedTeam(opponent) else redSide
+      self.sides[opponent] = {True: self.vector(away), False: self.vector(home)}
+      self.starts[opponent] = self.model.cellIndex[gameState.getInitialAgentPosition(opponent)]
+      self.filters[opponent] = ParticleFilter(self.model, numParticles, seed + i)
+      self.filters[opponent].placeAt(self.starts[opponent])
+
+  def vector(self, values):
+    return numpy.array(values) if numpy != None else list(values)
+
+  def product(self, a, b):
+    if numpy != None: return a * b
+    return [x * y for x, y in zip(a, b)]
+
+  def update(self, observation):
+    "Brings every opponent's particles up to date with an observation"
+    model = self.model
+    myPos = observation.getAgentPosition(self.agent.index)
+    noisyDistances = observation.getAgentDistances()
+    hidden = model.outOfSight([observation.getAgentPosition(i) for i in self.team])
+    for opponent in self.opponents:
+      particles = self.filters[opponent]
+      agentState = observation.getAgentState(opponent)
+      last = self.lastStates.get(opponent)
+      self.lastStates[opponent] = (agentState.isPacman, agentState.scaredTimer)
+      pos = observation.getAgentPosition(opponent)
+      if pos != None:
+        particles.placeAt(model.cellIndex[pos])
+        continue
+
+      particles.elapseTime()
+      if last != None:
+        wasPacman, wasScared = last
+        if wasScared > 1 and agentState.scaredTimer == 0:
+          # Eaten while scared: the timer only drops one step at a time otherwise
+          particles.placeAt(self.starts[opponent])
+        elif wasPacman and not agentState.isPacman:
+          # Eaten, or home with its food; the sonar will tell which
+          particles.mix(self.starts[opponent], 0.5)
+
+      weights = self.product(hidden, self.sides[opponent][agentState.isPacman])
+      if noisyDistances:
+        weights = self.product(weights, model.likelihood(myPos, noisyDistances[opponent]))
+      if not particles.observe(weights):
+        # Nothing fits: a death we did not see sends it home; failing that,
+        # it may be anywhere the evidence allows
+        if weights[self.starts[opponent]] > 0:
+          particles.placeAt(self.starts[opponent])
+        elif sum(weights) > 0:
+          particles.spread(weights)
+        else:
+          particles.spread(hidden if sum(hidden) > 0 else model.uniform())
+
+  def getBelief(self, opponent):
+    "The belief about opponent as a vector over model.cells"
+    return self.filters[opponent].getBelief()
+
+  def getBeliefDistribution(self, opponent):
+    "The belief about opponent as a util.Counter from position to probability"
+    return self.model.asCounter(self.getBelief(opponent))
+
+  def getBeliefs(self, numAgents):
+    "A belief per agent index (None for teammates), for displayDistributionsOverPositions"
+    return [self.getBelief(i) if i in self.filters else None for i in range(numAgents)]
+
+  def mostLikelyPosition(self, opponent):
+    belief = self.getBelief(opponent)
+    best = max(range(self.model.numCells), key=lambda i: belief[i])
+    return self.model.cells[best]
+
+class TrackingAgent(CaptureAgent):
+  """
+  A CaptureAgent whose self.tracker follows the opponents.  It is updated
+  in observationFunction, so chooseAction always sees an up to date tracker.
+  """
+  numParticles = NUM_PARTICLES
+
+  def registerInitialState(self, gameState):
+    CaptureAgent.registerInitialState(self, gameState)
+    self.tracker = OpponentTracker(self, gameState, self.numParticles)
+
+  def observationFunction(self, gameState):
+    observation = CaptureAgent.observationFunction(self, gameState)
+    self.tracker.update(observation)
+    return observation
@@ -0,0 +1,404 @@
+# pddlDomain.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+PDDL domains compiled once per process and shared by every agent.
+
+Building a lib_piglet pddl_solver parses and grounds its domain file, and
+each agent used to build its own in registerInitialState.  getDomain
+instead parses a domain file once (per path and modification time) into a
+CompiledDomain.  Its action schemas are grounded once per set of objects,
+and every ground atom gets a fact id, so that preconditions and effects
+become integer bitmasks over those ids.
+
+A DomainSolver is the per-agent handle.  It offers the pddl_solver methods
+the teams call (parser_.set_objects and friends, solve, satisfyPrecondition
+and matchEffect) on top of the shared domain.  It solves with one of two
+backends: 'piglet' hands the problem to lib_piglet, 'bitset' searches the
+bitmasks itself (A* with the admissible h_max heuristic, or greedy best
+first with h_add).  Both return plans as lists of (action, state) pairs:
+
+  self.pddl_solver = pddlDomain.DomainSolver(BASE_FOLDER + '/myTeam.pddl')
+  self.pddl_solver = pddlDomain.DomainSolver(BASE_FOLDER + '/myTeam.pddl', backend='bitset')
+
+Only the STRIPS subset the team domains use is understood: typed objects
+and parameters, and conjunctions of atoms and negated atoms.
+"""
+
+import heapq, itertools, os
+
+try:
+  from lib_piglet.utils.pddl_solver import pddl_solver
+except ImportError:
+  pddl_solver = None
+
+BACKENDS = ['piglet', 'bitset']
+DEFAULT_BACKEND = 'piglet' if pddl_solver != None else 'bitset'
+
+###########
+# Parsing #
+###########
+
+def tokenize(text):
+  "The tokens of a PDDL file, without its ; comments"
+  tokens = []
+  for line in text.split('\n'):
+    line = line.split(';', 1)[0]
+    tokens.extend(line.replace('(', ' ( ').replace(')', ' ) ').split())
+  return tokens
+
+def parseExpression(tokens):
+  "Nests a list of tokens into lists, one per parenthesis"
+  stack = [[]]
+  for token in tokens:
+    if token == '(':
+      stack.append([])
+    elif token == ')':
+      if len(stack) == 1: raise Exception('Unbalanced ) in PDDL')
+      expression = stack.pop()
+      stack[-1].append(expression)
+    else:
+      stack[-1].append(token.lower())
+  if len(stack) != 1: raise Exception('Unbalanced ( in PDDL')
+  return stack[0]
+
+def parseTypedList(tokens):
+  "Turns 'a b - t c' into [(a, t), (b, t), (c, 'object')]"
+  typed, names = [], []
+  i = 0
+  while i < len(tokens):
+    if tokens[i] == '-':
+      typed.extend((name, tokens[i + 1]) for name in names)
+      names = []
+      i += 2
+    else:
+      names.append(tokens[i])
+      i += 1
+  typed.extend((name, 'object') for name in names)
+  return typed
+
+def parseLiterals(formula):
+  """
+  Splits a conjunction into (positive atoms, negated atoms), atoms being
+  tuples of a predicate and its arguments.
+  """
+  positive, negative = [], []
+  if not formula: return positive, negative
+  if formula[0] == 'and':
+    for part in formula[1:]:
+      p, n = parseLiterals(part)
+      positive.extend(p)
+      negative.extend(n)
+  elif formula[0] == 'not':
+    negative.append(tuple(formula[1]))
+  elif any(isinstance(term, list) for term in formula):
+    raise Exception('Unsupported PDDL formula: %s' % formula[0])
+  else:
+    positive.append(tuple(formula))
+  return positive, negative
+
+class ActionSchema:
+  """
+  A lifted action: its parameters are (variable, type) pairs, and its
+  preconditions and effects atoms over those variables.
+  """
+  def __init__(self, name, parameters, precondition, effect):
+    self.name = name
+    self.parameters = parameters
+    self.positivePreconditions, self.negativePreconditions = parseLiterals(precondition)
+    self.addEffects, self.delEffects = parseLiterals(effect)
+
+#############
+# Grounding #
+#############
+
+class GroundAction:
+  """
+  An action with its parameters bound to objects.  The atom sets carry the
+  names lib_piglet's Action uses, so plans can mix both; pre, preNeg, add
+  and delete are the same sets as bitmasks of the domain's fact ids.
+  """
+  def __init__(self, domain, schema, objects):
+    self.name = schema.name
+    self.parameters = tuple(objects)
+    binding = dict(zip([variable for variable, type in schema.parameters], objects))
+    bind = lambda atoms: frozenset(tuple(binding.get(term, term) for term in atom) for atom in atoms)
+    self.positive_preconditions = bind(schema.positivePreconditions)
+    self.negative_preconditions = bind(schema.negativePreconditions)
+    self.add_effects = bind(schema.addEffects)
+    self.del_effects = bind(schema.delEffects)
+    self.pre = domain.mask(self.positive_preconditions)
+    self.preNeg = domain.mask(self.negative_preconditions)
+    self.add = domain.mask(self.add_effects)
+    self.delete = domain.mask(self.del_effects)
+
+  def applicable(self, state):
+    return state & self.pre == self.pre and not state & self.preNeg
+
+  def apply(self, state):
+    return (state & ~self.delete) | self.add
+
+  def __repr__(self):
+    return '%s(%s)' % (self.name, ', '.join(self.parameters))
+
+class CompiledDomain:
+  """
+  A parsed domain file.  Fact ids are shared by every problem over the
+  domain, so a bitmask means the same thing whichever agent built it.
+  """
+  def __init__(self, path):
+    self.path = path
+    with open(path) as f:
+      expression = parseExpression(tokenize(f.read()))
+    if len(expression) != 1 or expression[0][:1] != ['define']:
+      raise Exception('%s is not a PDDL domain' % path)
+    self.name = None
+    self.parents = {}
+    self.constants = []
+    self.schemas = []
+    for part in expression[0][1:]:
+      if part[0] == 'domain':
+        self.name = part[1]
+      elif part[0] == ':types':
+        self.parents.update(parseTypedList(part[1:]))
+      elif part[0] == ':constants':
+        self.constants = parseTypedList(part[1:])
+      elif part[0] == ':action':
+        fields = dict(zip(part[2::2], part[3::2]))
+        self.schemas.append(ActionSchema(part[1], parseTypedList(fields.get(':parameters', [])),
+                                         fields.get(':precondition', []), fields.get(':effect', [])))
+    self.facts = []
+    self.factIds = {}
+    self.groundings = {}
+    self.external = None
+
+  def isA(self, type, ancestor):
+    "Whether objects of type are also of type ancestor"
+    while True:
+      if type == ancestor or ancestor == 'object': return True
+      if type not in self.parents or self.parents[type] == type: return False
+      type = self.parents[type]
+
+  def factId(self, atom):
+    atom = tuple(atom)
+    if atom not in self.factIds:
+      self.factIds[atom] = len(self.facts)
+      self.facts.append(atom)
+    return self.factIds[atom]
+
+  def mask(self, atoms):
+    "The bitmask of a collection of atoms"
+    bits = 0
+    for atom in atoms: bits |= 1 << self.factId(atom)
+    return bits
+
+  def atoms(self, bits):
+    "The atoms of a bitmask"
+    return [atom for i, atom in enumerate(self.facts) if bits >> i & 1]
+
+  def ground(self, objects):
+    """
+    Every ground action over objects, a list of (name, type) pairs.  The
+    result is kept, so each set of objects is only grounded once.
+    """
+    key = frozenset(tuple(o) for o in objects)
+    if key not in self.groundings:
+      objects = sorted(key) + [c for c in self.constants if c not in key]
+      actions = []
+      for schema in self.schemas:
+        choices = [[name for name, objectType in objects if self.isA(objectType, type)] for variable, type in schema.parameters]
+        for binding in itertools.product(*choices):
+          actions.append(GroundAction(self, schema, binding))
+      self.groundings[key] = actions
+    return self.groundings[key]
+
+  def externalSolver(self):
+    "One lib_piglet solver for the domain, shared by every DomainSolver"
+    if self.external == None:
+      if pddl_solver == None:
+        raise Exception('lib_piglet is not installed')
+      self.external = pddl_solver(self.path)
+    return self.external
+
+DOMAIN_CACHE = {}
+
+def getDomain(path):
+  """
+  The CompiledDomain of a domain file, parsed again only when the file has
+  changed since.
+  """
+  path = os.path.abspath(path)
+  key = (path, os.path.getmtime(path))
+  if key not in DOMAIN_CACHE:
+    for old in [k for k in DOMAIN_CACHE if k[0] == path]: del DOMAIN_CACHE[old]
+    DOMAIN_CACHE[key] = CompiledDomain(path)
+  return DOMAIN_CACHE[key]
+
+##########
+# Search #
+##########
+
+def bits(mask):
+  "The fact ids set in mask"
+  ids = []
+  i = 0
+  while mask:
+    if mask & 1: ids.append(i)
+    mask >>= 1
+    i += 1
+  return ids
+
+def relaxedCosts(relaxed, state, numFacts, additive):
+  """
+  The number of steps each literal is from state when deletes are ignored:
+  entry i is fact i, entry numFacts + i its negation.  relaxed holds the
+  (precondition literals, effect literals) of every action.  Costs of
+  preconditions are added up for h_add and maximized for h_max.
+  """
+  infinity = float('inf')
+  cost = [0 if state >> i & 1 else infinity for i in range(numFacts)]
+  cost += [infinity if state >> i & 1 else 0 for i in range(numFacts)]
+  changed = True
+  while changed:
+    changed = False
+    for pre, effects in relaxed:
+      if pre:
+        reach = sum(cost[i] for i in pre) if additive else max(cost[i] for i in pre)
+        if reach == infinity: continue
+      else:
+        reach = 0
+      for i in effects:
+        if reach + 1 < cost[i]:
+          cost[i] = reach + 1
+          changed = True
+  return cost
+
+def search(domain, objects, initState, positiveGoals, negativeGoals, greedy = False):
+  """
+  A plan from initState to the goals as a list of (GroundAction, state
+  after it) pairs, states being frozensets of atoms, or [] if there is
+  none.  A* with h_max finds a shortest plan; greedy best first search
+  with h_add finds some plan, usually with fewer expansions.
+  """
+  actions = domain.ground(objects)
+  start = domain.mask(initState)
+  goal, goalNeg = domain.mask(positiveGoals), domain.mask(negativeGoals)
+  numFacts = len(domain.facts)
+  relaxed = [(bits(a.pre) + [numFacts + i for i in bits(a.preNeg)], bits(a.add) + [numFacts + i for i in bits(a.delete)])
+             for a in actions]
+  goalLiterals = bits(goal) + [numFacts + i for i in bits(goalNeg)]
+  def heuristic(state):
+    cost = relaxedCosts(relaxed, state, numFacts, greedy)
+    if not goalLiterals: return 0
+    return sum(cost[i] for i in goalLiterals) if greedy else max(cost[i] for i in goalLiterals)
+
+  h = heuristic(start)
+  if h == float('inf'): return []
+  frontier = [(h, 0, 0, start)]
+  parents = {start: None}
+  bestCost = {start: 0}
+  tie = itertools.count(1)
+  while frontier:
+    f, t, g, state = heapq.heappop(frontier)
+    if g > bestCost[state]: continue
+    if state & goal == goal and not state & goalNeg:
+      plan = []
+      while parents[state] != None:
+        previous, action = parents[state]
+        plan.append((action, frozenset(domain.atoms(state))))
+        state = previous
+      plan.reverse()
+      return plan
+    for action in actions:
+      if not action.applicable(state): continue
+      successor = action.apply(state)
+      if successor in bestCost and bestCost[successor] <= g + 1: continue
+      h = heuristic(successor)
+      if h == float('inf'): continue
+      bestCost[successor] = g + 1
+      parents[successor] = (state, action)
+      heapq.heappush(frontier, (h if greedy else g + 1 + h, next(tie), g + 1, successor))
+  return []
+
+##########
+# Solver #
+##########
+
+class Problem:
+  "The problem a DomainSolver solves next, set up like lib_piglet's parser_"
+  def __init__(self):
+    self.reset_problem()
+
+  def reset_problem(self):
+    self.objects = []
+    self.state = []
+    self.positiveGoals = []
+    self.negativeGoals = []
+
+  def set_objects(self, objects):
+    self.objects = objects
+
+  def set_state(self, state):
+    self.state = state
+
+  def set_positive_goals(self, goals):
+    self.positiveGoals = goals
+
+  def set_negative_goals(self, goals):
+    self.negativeGoals = goals
+
+class DomainSolver:
+  """
+  A per-agent stand-in for lib_piglet's pddl_solver.  Its domain is
+  compiled once per process and shared; only the problem is its own.
+  backend is one of BACKENDS; greedy only applies to the bitset backend.
+  """
+  def __init__(self, domainFile, backend = None, greedy = False):
+    if backend == None: backend = DEFAULT_BACKEND
+    if backend not in BACKENDS: raise Exception('Unknown PDDL backend: %s' % backend)
+    self.domain = getDomain(domainFile)
+    self.backend = backend
+    self.greedy = greedy
+    self.parser_ = Problem()
+
+  def solve(self):
+    "Solves the problem set up in parser_"
+    problem = self.parser_
+    if self.backend == 'bitset':
+      return search(self.domain, problem.objects, problem.state, problem.positiveGoals, problem.negativeGoals,
+                    self.greedy)
+    solver = self.domain.externalSolver()
+    solver.parser_.reset_problem()
+    solver.parser_.set_objects(problem.objects)
+    solver.parser_.set_state(problem.state)
+    solver.parser_.set_positive_goals(problem.positiveGoals)
+    solver.parser_.set_negative_goals(problem.negativeGoals)
+    return solver.solve()
+
+  def groundActions(self):
+    "The ground actions of the current problem's objects"
+    return self.domain.ground(self.parser_.objects)
+
+  def satisfyPrecondition(self, state, action):
+    "Whether action can be taken in state, a list of atoms"
+    if not isinstance(action, GroundAction):
+      return self.domain.externalSolver().satisfyPrecondition(state, action)
+    return action.applicable(self.domain.mask(state))
+
+  def matchEffect(self, state, action):
+    "Whether state, a list of atoms, already shows every effect of action"
+    if not isinstance(action, GroundAction):
+      return self.domain.externalSolver().matchEffect(state, action)
+    bits = self.domain.mask(state)
+    return bits & action.add == action.add and not bits & action.delete
@@ -0,0 +1,143 @@
+# pddlState.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Builds the :init atoms of an agent's PDDL problem incrementally.
+
+The predicates a team derives from the game each turn fall into groups
+that only depend on part of the state: the food, the capsules, the score,
+where agents are, what they carry, their scared timers, whether they are
+pacmen, and the noisy distances.  A PredicateBuilder takes each group as
+a function together with the parts (DELTAS) it reads, and on update only
+calls the functions whose parts changed since the previous update.  The
+changes are found by comparing a snapshot of those parts rather than from
+the _foodEaten, _agentMoved, ... markers of the state, which only record
+the last move while an agent sees every fourth.
+
+update returns a StateDiff of the atoms added and removed, so that a plan
+can be kept without rechecking it when none of its atoms changed:
+
+  self.predicates = pddlState.PredicateBuilder()
+  self.predicates.addGroup(('food',), lambda state: [('food_available',)] if ... else [])
+  atoms, diff = self.predicates.update(gameState)
+"""
+
+DELTAS = ('food', 'capsules', 'score', 'positions', 'carrying', 'scared', 'pacman', 'distances')
+
+def snapshot(gameState):
+  "The parts of gameState predicates depend on, one entry per delta"
+  agentStates = gameState.data.agentStates
+  return {
+    'food': gameState.data.food,
+    'capsules': tuple(gameState.data.capsules),
+    'score': gameState.data.score,
+    'positions': tuple(gameState.getAgentPosition(i) for i in range(len(agentStates))),
+    'carrying': tuple(s.numCarrying for s in agentStates),
+    'scared': tuple(s.scaredTimer for s in agentStates),
+    'pacman': tuple(s.isPacman for s in agentStates),
+    'distances': tuple(gameState.getAgentDistances() or ()),
+  }
+
+def actionAtoms(action):
+  """
+  The atoms an action's preconditions and effects mention, for pddlDomain
+  and lib_piglet actions alike.
+  """
+  atoms = set()
+  for name in ('positive_preconditions', 'negative_preconditions', 'add_effects', 'del_effects'):
+    atoms.update(getattr(action, name, ()))
+  return atoms
+
+class StateDiff:
+  "The atoms one update added and removed"
+  def __init__(self, added, removed):
+    self.added = added
+    self.removed = removed
+
+  def __bool__(self):
+    return bool(self.added or self.removed)
+
+  def touches(self, atoms):
+    "Whether any of atoms was added or removed"
+    return any(atom in self.added or atom in self.removed for atom in atoms)
+
+  def __repr__(self):
+    return 'StateDiff(+%s, -%s)' % (sorted(self.added), sorted(self.removed))
+
+class PredicateBuilder:
+  """
+  Keeps the atoms of every group and recomputes a group only when a delta
+  it depends on has changed.  The states given to update must not be
+  changed afterwards (observations never are), since the last one is kept
+  to compare with.
+  """
+  def __init__(self):
+    self.groups = []
+    self.last = None
+    self.counts = {}
+    self.present = set()
+    self.recomputed = 0
+
+  def addGroup(self, deltas, function):
+    """
+    function(gameState) returns the atoms of a group; it is called again
+    whenever one of deltas has changed.  A group with no deltas is only
+    computed once.
+    """
+    for delta in deltas:
+      if delta not in DELTAS: raise Exception('Unknown delta: %s' % delta)
+    self.groups.append([tuple(deltas), function, None])
+
+  def changes(self, gameState):
+    "The deltas that changed since the last update (all of them the first time)"
+    current = snapshot(gameState)
+    if self.last == None:
+      changed = set(DELTAS)
+    else:
+      changed = set(delta for delta in DELTAS if current[delta] != self.last[delta])
+    self.last = current
+    return changed
+
+  def atoms(self):
+    "Every atom, in the order the groups were added"
+    return [atom for deltas, function, atoms in self.groups for atom in atoms]
+
+  def update(self, gameState):
+    "Returns (every atom, StateDiff) after bringing the groups up to date"
+    changed = self.changes(gameState)
+    touched = set()
+    for group in self.groups:
+      deltas, function, old = group
+      if old != None and not changed.intersection(deltas): continue
+      new = list(function(gameState))
+      self.recomputed += 1
+      for atom in old or ():
+        self.counts[atom] -= 1
+        touched.add(atom)
+      for atom in new:
+        self.counts[atom] = self.counts.get(atom, 0) + 1
+        touched.add(atom)
+      group[2] = new
+    # Only atoms of recomputed groups can have changed; an atom counts as
+    # present while any group has it
+    added, removed = set(), set()
+    for atom in touched:
+      present = self.counts[atom] > 0
+      if present and atom not in self.present:
+        added.add(atom)
+        self.present.add(atom)
+      elif not present and atom in self.present:
+        removed.add(atom)
+        self.present.discard(atom)
+    return self.atoms(), StateDiff(added, removed)
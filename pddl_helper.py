@@ -1,5 +1,5 @@
 
-from lib_piglet.utils.pddl_solver import pddl_solver
+import pddlDomain
 from lib_piglet.domains.pddl import pddl_state
 from lib_piglet.utils.pddl_parser import Action
 from typing import List, Tuple
@@ -21,15 +21,16 @@ def getHighLevelPlan(solver, objects, initState, positiveGoalStates, negtiveGoal
         # Solve the problem and return the plan
         return solver.solve()
 
-# Specify the pddle model here
-solver = pddl_solver(BASE_FOLDER+'/myTeam.pddl')
+if __name__ == '__main__':
+    # Specify the pddle model here
+    solver = pddlDomain.DomainSolver(BASE_FOLDER+'/myTeam.pddl')
 
-# Specify the pddl states, objects, goal states here.
-positiveGoalStates = [("defend_foods",)]
-negtiveGoalStates = []
-objects=[("a1","current_agent"),("a2","ally"),("e1","enemy1"),("e2","enemy2")]
-initStates = [("is_pacman", "a1"),("winning_gt5",)]
+    # Specify the pddl states, objects, goal states here.
+    positiveGoalStates = [("defend_foods",)]
+    negtiveGoalStates = []
+    objects=[("a1","current_agent"),("a2","ally"),("e1","enemy1"),("e2","enemy2")]
+    initStates = [("is_pacman", "a1"),("winning_gt5",)]
 
-# Solve and print the plan.
-plan = getHighLevelPlan(solver, objects, initStates, positiveGoalStates,negtiveGoalStates)
-print(plan)
+    # Solve and print the plan.
+    plan = getHighLevelPlan(solver, objects, initStates, positiveGoalStates,negtiveGoalStates)
+    print(plan)
@@ -0,0 +1,152 @@
+# planCache.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Remembers the plans a PDDL solver found.
+
+The high level states the teams build for their PDDL problems are sets of
+a few predicates about a handful of objects, so the same problem comes up
+again and again over a game.  A PlanCache solves each distinct problem
+once.  Problems are keyed by the solver's backend, and by their objects,
+initial state and goals as frozensets, so the order atoms were listed in
+does not matter.  The cache
+keeps the most recently used plans, up to maxSize of them, and counts its
+hits and misses.
+
+getPlanCache returns one cache per domain file, so both agents of a team
+(and every game played in the same process) share it.  Given a path, the
+cache is loaded from that file and can be saved back to it at the end of
+a game, so that later games start with the plans already found:
+
+  self.planCache = planCache.getPlanCache(BASE_FOLDER + '/myTeam.pddl')
+  plan = self.planCache.plan(self.pddl_solver, objects, initState, positiveGoals, negativeGoals)
+"""
+
+import collections, os, pickle, tempfile
+
+PLAN_CACHE_SIZE = 4096
+PLAN_CACHE_VERSION = 2
+
+def solverName(solver):
+  """
+  The backend of solver as it goes in the cache key: the backend of a
+  pddlDomain.DomainSolver ('greedy' for its greedy bitset search), or
+  'piglet' for lib_piglet's own pddl_solver.
+  """
+  if getattr(solver, 'greedy', False): return 'greedy'
+  return getattr(solver, 'backend', 'piglet')
+
+class PlanCache:
+  """
+  A least recently used map from PDDL problems to the plans solved for them.
+  """
+
+  def __init__(self, maxSize = PLAN_CACHE_SIZE):
+    self.maxSize = maxSize
+    self.plans = collections.OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.loadedFrom = None
+
+  def __len__(self):
+    return len(self.plans)
+
+  def __str__(self):
+    total = self.hits + self.misses
+    return 'PlanCache(%d plans, %d hits, %d misses, %.0f%% hit rate)' % (
+      len(self.plans), self.hits, self.misses, 100.0 * self.hits / total if total else 0)
+
+  def key(backend, objects, initState, positiveGoals, negativeGoals):
+    "The canonical form of a problem: the backend solving it and a frozenset of atoms for each of its parts"
+    return (backend,) + tuple(frozenset(tuple(atom) for atom in atoms)
+                              for atoms in (objects, initState, positiveGoals, negativeGoals))
+  key = staticmethod(key)
+
+  def get(self, key):
+    "The plan stored for key, or None; counts a hit or a miss"
+    if key in self.plans:
+      self.hits += 1
+      self.plans.move_to_end(key)
+      return self.plans[key]
+    self.misses += 1
+    return None
+
+  def put(self, key, plan):
+    self.plans[key] = plan
+    self.plans.move_to_end(key)
+    while len(self.plans) > self.maxSize:
+      self.plans.popitem(last=False)
+
+  def plan(self, solver, objects, initState, positiveGoals, negativeGoals):
+    """
+    The plan for a problem, from the cache or else from solver (a
+    pddl_solver for the cache's domain).  Plans are returned as new lists,
+    so callers may change them.  A solver that raises leaves the cache as
+    it was.
+    """
+    key = PlanCache.key(solverName(solver), objects, initState, positiveGoals, negativeGoals)
+    plan = self.get(key)
+    if plan == None:
+      solver.parser_.reset_problem()
+      solver.parser_.set_objects(objects)
+      solver.parser_.set_state(initState)
+      solver.parser_.set_positive_goals(positiveGoals)
+      solver.parser_.set_negative_goals(negativeGoals)
+      plan = list(solver.solve() or [])
+      self.put(key, plan)
+    return list(plan)
+
+  def load(self, path):
+    "Adds the plans saved in path, if it exists and was saved by this version"
+    self.loadedFrom = path
+    if not os.path.exists(path): return
+    with open(path, 'rb') as f:
+      saved = pickle.load(f)
+    if not isinstance(saved, dict) or saved.get('version') != PLAN_CACHE_VERSION: return
+    for key, plan in saved['plans']:
+      self.put(key, plan)
+
+  def save(self, path):
+    """
+    Writes the plans to path.  The file is written under a temporary name
+    and renamed into place, so concurrent readers never see a partial file.
+    Failures are ignored; the cache is only an optimization.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmpPath = None
+    try:
+      fd, tmpPath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+      with os.fdopen(fd, 'wb') as f:
+        pickle.dump({'version': PLAN_CACHE_VERSION, 'plans': list(self.plans.items())}, f)
+      os.replace(tmpPath, path)
+      return path
+    except OSError:
+      if tmpPath != None and os.path.exists(tmpPath):
+        os.remove(tmpPath)
+      return None
+
+PLAN_CACHES = {}
+
+def getPlanCache(domainFile, path = None):
+  """
+  The cache of plans for domainFile, shared by every caller in this process.
+  The first call with a path loads the plans saved there.
+  """
+  domainFile = os.path.abspath(domainFile)
+  if domainFile not in PLAN_CACHES:
+    PLAN_CACHES[domainFile] = PlanCache()
+  cache = PLAN_CACHES[domainFile]
+  if path != None and cache.loadedFrom != path:
+    cache.load(path)
+  return cache
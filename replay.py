@@ -0,0 +1,374 @@
+# replay.py
+# ---------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A compact binary format for recorded capture games.
+
+A ReplayWriter is attached to a Game before it runs (game.recorder) and
+writes one record per move as the game is played, so a crashed game still
+leaves a replay of everything up to the crash.  A file is laid out as
+
+  header    magic, version, then length-prefixed fields: the sha1 of the
+            layout text, the layout name (or, for layouts that are not in
+            layouts/, the layout text itself), the team names, the game
+            length, the number of agents and the keyframe interval
+  records   a varint per move, 2 + agentIndex * 5 + direction code;
+            0 followed by a length-prefixed keyframe: the full state after
+            that many moves, written at move 0 and every keyframe interval
+  index     1, then (move, offset) varint pairs locating every keyframe,
+            then the 8 byte offset of the index and INDEX_MAGIC
+
+A ReplayReader uses the index (or, for a file cut short before the index
+was written, a scan of the records) to restore the state at any turn from
+the nearest keyframe before it, so only the moves since that keyframe are
+simulated.
+
+  python replay.py replay-0          # summary of a recorded game
+"""
+
+import hashlib, os, struct, sys, zlib
+
+import capture
+import layout as layoutModule
+from game import Agent, AgentState, BitGrid, Configuration, Directions
+
+MAGIC = b'PACR'
+INDEX_MAGIC = b'PACX'
+VERSION = 1
+KEYFRAME_INTERVAL = 100
+
+KEYFRAME = 0
+END = 1
+FIRST_MOVE = 2
+
+DIRECTIONS = [Directions.STOP, Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+DIRECTION_CODES = dict((d, i) for i, d in enumerate(DIRECTIONS))
+
+TRAILER = struct.Struct('<Q4s')
+
+############
+# Encoding #
+############
+
+def writeVarint(out, n):
+  "Appends the unsigned int n to the bytearray out, 7 bits per byte"
+  while n >= 0x80:
+    out.append((n & 0x7F) | 0x80)
+    n >>= 7
+  out.append(n)
+
+def readVarint(data, offset):
+  "Returns (value, offset after it) for the varint at data[offset]"
+  n = shift = 0
+  while True:
+    b = data[offset]
+    offset += 1
+    n |= (b & 0x7F) << shift
+    if b < 0x80: return n, offset
+    shift += 7
+
+def zigzag(n):
+  return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+def unzigzag(n):
+  return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+def writeBytes(out, b):
+  writeVarint(out, len(b))
+  out.extend(b)
+
+def readBytes(data, offset):
+  size, offset = readVarint(data, offset)
+  return bytes(data[offset:offset + size]), offset + size
+
+def layoutHash(layout):
+  return hashlib.sha1('\n'.join(layout.layoutText).encode()).digest()
+
+_layoutNames = None
+
+def findLayoutName(layout):
+  "Returns the name of the file in layouts/ holding this layout, or None"
+  global _layoutNames
+  if _layoutNames == None:
+    _layoutNames = {}
+    for f in sorted(os.listdir('layouts')):
+      if not f.endswith('.lay'): continue
+      lay = layoutModule.tryToLoad(os.path.join('layouts', f))
+      _layoutNames.setdefault(layoutHash(lay), f[:-len('.lay')])
+  return _layoutNames.get(layoutHash(layout))
+
+def encodeKeyframe(move, state):
+  data = state.data
+  food = data.food if isinstance(data.food, BitGrid) else BitGrid.fromGrid(data.food)
+  out = bytearray()
+  writeVarint(out, move)
+  writeVarint(out, zigzag(data.score))
+  writeVarint(out, data.timeleft)
+  writeBytes(out, food._bits.to_bytes((food.width * food.height + 7) // 8, 'little'))
+  writeVarint(out, len(data.capsules))
+  for x, y in data.capsules:
+    writeVarint(out, x)
+    writeVarint(out, y)
+  for agentState in data.agentStates:
+    x, y = agentState.configuration.pos
+    writeVarint(out, int(x))
+    writeVarint(out, int(y))
+    writeVarint(out, DIRECTION_CODES[agentState.configuration.direction])
+    writeVarint(out, int(agentState.isPacman))
+    writeVarint(out, agentState.scaredTimer)
+    writeVarint(out, agentState.numCarrying)
+    writeVarint(out, agentState.numReturned)
+  return out
+
+def decodeKeyframe(payload, initialState):
+  """
+  Returns (move, state): initialState, the start of the recorded game, with
+  everything that changes during play replaced by the keyframe's values.
+  """
+  state = capture.GameState(initialState)
+  data = state.data
+  move, offset = readVarint(payload, 0)
+  score, offset = readVarint(payload, offset)
+  data.score = unzigzag(score)
+  data.timeleft, offset = readVarint(payload, offset)
+  food, offset = readBytes(payload, offset)
+  data.food = BitGrid(data.food.width, data.food.height, bits=int.from_bytes(food, 'little'))
+  numCapsules, offset = readVarint(payload, offset)
+  capsules = []
+  for i in range(numCapsules):
+    x, offset = readVarint(payload, offset)
+    y, offset = readVarint(payload, offset)
+    capsules.append((x, y))
+  data.capsules = capsules
+  data._sharedCapsules = False
+  agentStates = []
+  for start in initialState.data.agentStates:
+    values = []
+    for i in range(7):
+      value, offset = readVarint(payload, offset)
+      values.append(value)
+    x, y, direction, isPacman, scaredTimer, numCarrying, numReturned = values
+    agentState = AgentState(start.start, bool(isPacman))
+    agentState.configuration = Configuration((x, y), DIRECTIONS[direction])
+    agentState.scaredTimer = scaredTimer
+    agentState.numCarrying = numCarrying
+    agentState.numReturned = numReturned
+    agentStates.append(agentState)
+  data.agentStates = agentStates
+  data._sharedAgentStates = 0
+  return move, state
+
+##########
+# Writer #
+##########
+
+class ReplayWriter:
+  """
+  Streams a game to path.  Game.run calls record after every move; close
+  writes the keyframe index.
+  """
+
+  def __init__(self, path, layout, initialState, length, redTeamName='Red', blueTeamName='Blue',
+               keyframeInterval=KEYFRAME_INTERVAL):
+    self.path = path
+    self.keyframeInterval = keyframeInterval
+    self.file = open(path, 'wb')
+    name = findLayoutName(layout)
+    header = bytearray(MAGIC)
+    header.append(VERSION)
+    writeBytes(header, layoutHash(layout))
+    writeBytes(header, (name or '').encode())
+    writeBytes(header, b'' if name else zlib.compress('\n'.join(layout.layoutText).encode()))
+    writeBytes(header, redTeamName.encode())
+    writeBytes(header, blueTeamName.encode())
+    writeVarint(header, length)
+    writeVarint(header, initialState.getNumAgents())
+    writeVarint(header, keyframeInterval)
+    self.file.write(header)
+    self.offset = len(header)
+    self.numMoves = 0
+    self.keyframes = []
+    self.writeKeyframe(initialState)
+
+  def writeKeyframe(self, state):
+    out = bytearray()
+    writeVarint(out, KEYFRAME)
+    writeBytes(out, encodeKeyframe(self.numMoves, state))
+    self.keyframes.append((self.numMoves, self.offset))
+    self.write(out)
+    # Keep what has been played so far on disk
+    self.file.flush()
+
+  def write(self, out):
+    self.file.write(out)
+    self.offset += len(out)
+
+  def record(self, agentIndex, action, state):
+    "Records agentIndex playing action, which led to state"
+    out = bytearray()
+    writeVarint(out, FIRST_MOVE + agentIndex * len(DIRECTIONS) + DIRECTION_CODES[action])
+    self.write(out)
+    self.numMoves += 1
+    if self.numMoves % self.keyframeInterval == 0:
+      self.writeKeyframe(state)
+
+  def close(self):
+    if self.file == None: return
+    out = bytearray()
+    writeVarint(out, END)
+    indexOffset = self.offset + len(out)
+    writeVarint(out, len(self.keyframes))
+    for move, offset in self.keyframes:
+      writeVarint(out, move)
+      writeVarint(out, offset)
+    out.extend(TRAILER.pack(indexOffset, INDEX_MAGIC))
+    self.write(out)
+    self.file.close()
+    self.file = None
+
+##########
+# Reader #
+##########
+
+class ReplayReader:
+  """
+  Reads a replay written by ReplayWriter.  The layout is taken from the
+  file, or looked up in layouts/ by name and checked against the hash.
+  """
+
+  def __init__(self, path):
+    with open(path, 'rb') as f:
+      self.data = f.read()
+    if self.data[:len(MAGIC)] != MAGIC:
+      raise Exception('%s is not a replay file' % path)
+    version = self.data[len(MAGIC)]
+    if version != VERSION:
+      raise Exception('%s has replay format version %d, not %d' % (path, version, VERSION))
+    offset = len(MAGIC) + 1
+    self.layoutHash, offset = readBytes(self.data, offset)
+    name, offset = readBytes(self.data, offset)
+    text, offset = readBytes(self.data, offset)
+    red, offset = readBytes(self.data, offset)
+    blue, offset = readBytes(self.data, offset)
+    self.length, offset = readVarint(self.data, offset)
+    self.numAgents, offset = readVarint(self.data, offset)
+    self.keyframeInterval, offset = readVarint(self.data, offset)
+    self.layoutName = name.decode() or None
+    self.redTeamName = red.decode()
+    self.blueTeamName = blue.decode()
+    self.recordsOffset = offset
+    if text:
+      self.layout = layoutModule.Layout(zlib.decompress(text).decode().split('\n'))
+    else:
+      self.layout = layoutModule.getLayout(self.layoutName)
+    if self.layout == None or layoutHash(self.layout) != self.layoutHash:
+      raise Exception('%s was recorded on a layout %s that cannot be found' % (path, self.layoutName))
+    self.initialState = capture.GameState()
+    self.initialState.initialize(self.layout, self.numAgents)
+    self.initialState.data.timeleft = self.length
+    self.readIndex()
+
+  def readIndex(self):
+    "Sets keyframes to the sorted [(move, offset)] and numMoves"
+    data = self.data
+    indexOffset, magic = (None, None)
+    if len(data) >= self.recordsOffset + TRAILER.size:
+      indexOffset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    if magic == INDEX_MAGIC:
+      count, offset = readVarint(data, indexOffset)
+      self.keyframes = []
+      for i in range(count):
+        move, offset = readVarint(data, offset)
+        keyframeOffset, offset = readVarint(data, offset)
+        self.keyframes.append((move, keyframeOffset))
+      lastMove, lastOffset = self.keyframes[-1]
+      self.numMoves = lastMove + sum(1 for record in self.records(lastOffset) if record[0] >= FIRST_MOVE)
+    else:
+      # Cut short before the index was written: find the keyframes by scanning
+      self.keyframes = []
+      self.numMoves = 0
+      for code, offset, payload in self.records(self.recordsOffset):
+        if code == KEYFRAME:
+          self.keyframes.append((self.numMoves, offset))
+        else:
+          self.numMoves += 1
+
+  def records(self, offset):
+    """
+    Yields (code, offset, keyframe payload or None) for each record from
+    offset up to the index, stopping quietly at a record that was cut off.
+    """
+    data = self.data
+    try:
+      while offset < len(data):
+        code, next = readVarint(data, offset)
+        if code == END: return
+        payload = None
+        if code == KEYFRAME:
+          payload, next = readBytes(data, next)
+          if next > len(data): return
+        yield code, offset, payload
+        offset = next
+    except IndexError:
+      return
+
+  def keyframeBefore(self, turn):
+    "Returns the (move, offset) of the last keyframe at or before turn"
+    best = self.keyframes[0]
+    for keyframe in self.keyframes:
+      if keyframe[0] > turn: break
+      best = keyframe
+    return best
+
+  def actions(self, start = 0):
+    "Yields the (agentIndex, action) of every move from move start on"
+    move, offset = self.keyframeBefore(start)
+    for code, offset, payload in self.records(offset):
+      if code == KEYFRAME: continue
+      if move >= start:
+        yield divmod(code - FIRST_MOVE, len(DIRECTIONS))[0], DIRECTIONS[(code - FIRST_MOVE) % len(DIRECTIONS)]
+      move += 1
+
+  def stateAt(self, turn):
+    """
+    Returns the GameState after turn moves, restored from the nearest
+    keyframe and the moves since it.
+    """
+    if turn < 0 or turn > self.numMoves:
+      raise Exception('Turn %d is outside the %d recorded moves' % (turn, self.numMoves))
+    move, offset = self.keyframeBefore(turn)
+    state = None
+    for code, offset, payload in self.records(offset):
+      if code == KEYFRAME:
+        if state == None: move, state = decodeKeyframe(payload, self.initialState)
+        continue
+      if move == turn: break
+      agentIndex, direction = divmod(code - FIRST_MOVE, len(DIRECTIONS))
+      state = state.generateSuccessor(agentIndex, DIRECTIONS[direction])
+      move += 1
+    return state
+
+  def components(self):
+    "The arguments capture.replayGame takes, less the display"
+    return {'layout': self.layout, 'agents': [Agent() for i in range(self.numAgents)],
+            'actions': list(self.actions()), 'length': self.length,
+            'redTeamName': self.redTeamName, 'blueTeamName': self.blueTeamName}
+
+if __name__ == '__main__':
+  for path in sys.argv[1:]:
+    replay = ReplayReader(path)
+    final = replay.stateAt(replay.numMoves)
+    print('%s: %s vs %s on %s, %d moves, %d keyframes, %d bytes, final score %d' % (
+      path, replay.redTeamName, replay.blueTeamName, replay.layoutName or 'an unnamed layout',
+      replay.numMoves, len(replay.keyframes), len(replay.data), final.data.score))
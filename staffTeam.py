@@ -35,9 +35,18 @@ import sys,os
 # the folder of current file.
 BASE_FOLDER = os.path.dirname(os.path.abspath(__file__))
 
-from lib_piglet.utils.pddl_solver import pddl_solver
-from lib_piglet.domains.pddl import pddl_state
-from lib_piglet.utils.pddl_parser import Action
+import pddlDomain
+import pddlState
+import linearQ
+import weightStore
+try:
+    from lib_piglet.domains.pddl import pddl_state
+    from lib_piglet.utils.pddl_parser import Action
+except ImportError:
+    # Only needed for type hints; the bitset backend of pddlDomain plans without lib_piglet
+    from pddlDomain import GroundAction as Action
+    pddl_state = frozenset
+import planCache
 
 CLOSE_DISTANCE = 4
 MEDIUM_DISTANCE = 15
@@ -89,14 +98,26 @@ class MixedAgent(CaptureAgent):
             "defensiveWeights": {'numInvaders': -1000, 'onDefense': 100,'teamDistance':2 ,'invaderDistance': -10, 'stop': -100, 'reverse': -2},
             "escapeWeights": {'onDefense': 1000, 'enemyDistance': 30, 'stop': -100, 'distanceToHome': -20}
         }
-    QLWeightsFile = BASE_FOLDER+'/QLWeightsStaffTeam.txt'
+    QLWeightsFile = BASE_FOLDER+'/QLWeightsStaffTeam.json'
+    # Checkpoint of QLWeightsFile to load (see weightStore.py); None loads the latest, or the file itself if there are none.
+    QLWeightsVersion = None
+    # trainer.py sets this to a list to train: agents then record their q learning transitions in it
+    # for the trainer to apply, instead of updating the weights themselves.
+    Transitions = None
+    # Set to a file name (e.g. BASE_FOLDER+'/staffTeam.plans') to keep solved pddl plans between runs.
+    PlanCacheFile = None
+    # PDDL planner: 'piglet', 'bitset' (built in, see pddlDomain.py), or None for pddlDomain.DEFAULT_BACKEND
+    PDDLBackend = None
 
     # Also can use class variable to exchange information between agents.
     CURRENT_ACTION = {}
+    # linearQ.LinearQ of each weights dict in QLWeights, shared like the weights; see getQFunction.
+    QFunctions = {}
 
 
     def registerInitialState(self, gameState: GameState):
-        self.pddl_solver = pddl_solver(BASE_FOLDER+'/staffTeam.pddl')
+        self.pddl_solver = pddlDomain.DomainSolver(BASE_FOLDER+'/staffTeam.pddl', MixedAgent.PDDLBackend) # domain compiled once per process
+        self.planCache = planCache.getPlanCache(BASE_FOLDER+'/staffTeam.pddl', MixedAgent.PlanCacheFile) # shared by both agents
         self.highLevelPlan: List[Tuple[Action,pddl_state]] = None # Plan is a list Action and pddl_state
         self.currentNegativeGoalStates = []
         self.currentPositiveGoalStates = []
@@ -104,6 +125,9 @@ class MixedAgent(CaptureAgent):
 
         self.startPosition = gameState.getAgentPosition(self.index) # the start location of the agent
         CaptureAgent.registerInitialState(self, gameState)
+        self.predicates = self.buildPredicates(gameState) # incremental :init states, see get_pddl_state
+        self.pddlChanges = None
+        self.currentActionRunning = False # last check found the current action still running
 
         self.lowLevelPlan: List[Tuple[str,Tuple]] = []
         self.lowLevelActionIndex = 0
@@ -113,6 +137,8 @@ class MixedAgent(CaptureAgent):
         self.epsilon = 0.1 #default exploration prob, change to take a random step
         self.alpha = 0.02 #default learning rate
         self.discountRate = 0.9 # default discount rate on successor state q value when update
+        if MixedAgent.Transitions is not None:
+            self.trainning = True # playing a trainer.py game
         
         # Use a dictionary to save information about current agent.
         MixedAgent.CURRENT_ACTION[self.index]={}
@@ -121,22 +147,21 @@ class MixedAgent(CaptureAgent):
         NEEDS TO BE CHANGED BEFORE SUBMISSION
 
         """
-        if os.path.exists(MixedAgent.QLWeightsFile):
-            with open(MixedAgent.QLWeightsFile, "r") as file:
-                MixedAgent.QLWeights = eval(file.read())
-            print("Load QLWeights:",MixedAgent.QLWeights )
+        if MixedAgent.QLWeightsFile:
+            path = weightStore.resolve(MixedAgent.QLWeightsFile, MixedAgent.QLWeightsVersion) # the latest checkpoint, if any
+            weights = weightStore.load(path) # read once per process
+            if weights != None:
+                MixedAgent.QLWeights = weights
+                print("Load QLWeights:",path,MixedAgent.QLWeights )
         
     
     def final(self, gameState : GameState):
         """
-        This function write weights into files after the game is over. 
-        You may want to comment (disallow) this function when submit to contest server.
+        This function saves the solved plans after the game is over, if PlanCacheFile is set.
+        Weights are no longer written here: trainer.py trains them and saves versioned checkpoints.
         """
-        if self.trainning:
-            print("Write QLWeights:", MixedAgent.QLWeights)
-            file = open(MixedAgent.QLWeightsFile, 'w')
-            file.write(str(MixedAgent.QLWeights))
-            file.close()
+        if MixedAgent.PlanCacheFile:
+            self.planCache.save(MixedAgent.PlanCacheFile)
         
 
     def chooseAction(self, gameState: GameState):
@@ -162,6 +187,7 @@ class MixedAgent(CaptureAgent):
             # print("\tOBJ:"+str(objects),"\tINIT:"+str(initState), "\tPOSITIVE_GOAL:"+str(positiveGoal), "\tNEGTIVE_GOAL:"+str(negtiveGoal),sep="\n")
             self.highLevelPlan: List[Tuple[Action,pddl_state]] = self.getHighLevelPlan(objects, initState,positiveGoal, negtiveGoal) # Plan is a list Action and pddl_state
             self.currentActionIndex = 0
+            self.currentActionRunning = False
             self.lowLevelPlan = [] # reset low level plan
             self.currentNegativeGoalStates = negtiveGoal
             self.currentPositiveGoalStates = positiveGoal
@@ -192,131 +218,113 @@ class MixedAgent(CaptureAgent):
     
     def getHighLevelPlan(self, objects, initState, positiveGoal, negtiveGoal) -> List[Tuple[Action,pddl_state]]:
         """
-        This function prepare the pddl problem, solve it and return pddl plan
+        This function prepare the pddl problem, solve it and return pddl plan.
+        Problems solved before (by either agent) are answered from the plan cache.
         """
-        # Prepare pddl problem
-        self.pddl_solver.parser_.reset_problem()
-        self.pddl_solver.parser_.set_objects(objects)
-        self.pddl_solver.parser_.set_state(initState)
-        self.pddl_solver.parser_.set_negative_goals(negtiveGoal)
-        self.pddl_solver.parser_.set_positive_goals(positiveGoal)
-        
-        # Solve the problem and return the plan
-        return self.pddl_solver.solve()
+        return self.planCache.plan(self.pddl_solver, objects, initState, positiveGoal, negtiveGoal)
 
     def get_pddl_state(self,gameState:GameState) -> Tuple[List[Tuple],List[Tuple]]:
         """
         This function collects pddl :objects and :init states from simulator gameState.
+        The :init states come from self.predicates, which only recomputes the predicates
+        whose inputs changed; what changed is left in self.pddlChanges.
         """
-        # Collect objects and states from the gameState
-
-        states = []
-        objects = []
+        objects = [("a{}".format(agent_index), "current_agent" if agent_index == self.index else "ally")
+                   for agent_index in self.getTeam(gameState)]
+        objects += [("e{}".format(enemy_index), "enemy{}".format(typeIndex))
+                    for typeIndex, enemy_index in enumerate(self.getOpponents(gameState), 1)]
+        states, self.pddlChanges = self.predicates.update(gameState)
+        return objects, states
 
+    def buildPredicates(self, gameState: GameState) -> pddlState.PredicateBuilder:
+        """
+        Groups the predicates get_pddl_state collects by the parts of the gameState they read.
+        """
+        myObj = "a{}".format(self.index)
+        builder = pddlState.PredicateBuilder()
 
         # Collect available foods on the map
-        foodLeft = self.getFood(gameState).asList()
-        if len(foodLeft) > 0:
-            states.append(("food_available",))
-        myPos = gameState.getAgentPosition(self.index)
-        myObj = "a{}".format(self.index)
-        cloestFoodDist = self.closestFood(myPos,self.getFood(gameState), gameState.getWalls())
-        if cloestFoodDist != None and cloestFoodDist <=CLOSE_DISTANCE:
-            states.append(("near_food",myObj))
+        def foodStates(gameState):
+            return [("food_available",)] if self.getFood(gameState).count() > 0 else []
+        def nearFoodStates(gameState):
+            cloestFoodDist = self.getDistanceFields(gameState).food.distance(gameState.getAgentPosition(self.index))
+            if cloestFoodDist != None and cloestFoodDist <=CLOSE_DISTANCE:
+                return [("near_food",myObj)]
+            return []
+        builder.addGroup(("food",), foodStates)
+        builder.addGroup(("food", "positions"), nearFoodStates)
 
         # Collect capsule states
-        capsules = self.getCapsules(gameState)
-        if len(capsules) > 0 :
-            states.append(("capsule_available",))
-        for cap in capsules:
-            if self.getMazeDistance(cap,myPos) <=CLOSE_DISTANCE:
-                states.append(("near_capsule",myObj))
-                break
-        
+        def capsuleStates(gameState):
+            states = []
+            myPos = gameState.getAgentPosition(self.index)
+            capsules = self.getCapsules(gameState)
+            if len(capsules) > 0 :
+                states.append(("capsule_available",))
+                capsuleDist = self.getDistanceFields(gameState).capsules.distance(myPos)
+                if capsuleDist != None and capsuleDist <=CLOSE_DISTANCE:
+                    states.append(("near_capsule",myObj))
+            return states
+        builder.addGroup(("capsules", "positions"), capsuleStates)
+
         # Collect winning states
-        currentScore = gameState.data.score
-        if gameState.isOnRedTeam(self.index):
-            if currentScore > 0:
-                states.append(("winning",))
-            if currentScore> 3:
-                states.append(("winning_gt3",))
-            if currentScore> 5:
-                states.append(("winning_gt5",))
-            if currentScore> 10:
-                states.append(("winning_gt10",))
-            if currentScore> 20:
-                states.append(("winning_gt20",))
-        else:
-            if currentScore < 0:
-                states.append(("winning",))
-            if currentScore < -3:
-                states.append(("winning_gt3",))
-            if currentScore < -5:
-                states.append(("winning_gt5",))
-            if currentScore < -10:
-                states.append(("winning_gt10",))
-            if currentScore < -20:
-                states.append(("winning_gt20",))
+        def winningStates(gameState):
+            lead = gameState.data.score if gameState.isOnRedTeam(self.index) else -gameState.data.score
+            return [(name,) for name, margin in (("winning", 0), ("winning_gt3", 3), ("winning_gt5", 5),
+                                                 ("winning_gt10", 10), ("winning_gt20", 20)) if lead > margin]
+        builder.addGroup(("score",), winningStates)
 
         # Collect team agents states
-        agents : List[Tuple[int,AgentState]] = [(i,gameState.getAgentState(i)) for i in self.getTeam(gameState)]
-        for agent_index, agent_state in agents :
-            agent_object = "a{}".format(agent_index)
-            agent_type = "current_agent" if agent_index == self.index else "ally"
-            objects += [(agent_object, agent_type)]
-
-            if agent_index != self.index and self.getMazeDistance(gameState.getAgentPosition(self.index), gameState.getAgentPosition(agent_index)) <= CLOSE_DISTANCE:
-                states.append(("near_ally",))
-            
-            if agent_state.scaredTimer>0:
-                states.append(("is_scared",agent_object))
-
-            if agent_state.numCarrying>0:
-                states.append(("food_in_backpack",agent_object))
-                if agent_state.numCarrying >=20 :
-                    states.append(("20_food_in_backpack",agent_object))
-                if agent_state.numCarrying >=10 :
-                    states.append(("10_food_in_backpack",agent_object))
-                if agent_state.numCarrying >=5 :
-                    states.append(("5_food_in_backpack",agent_object))
-                if agent_state.numCarrying >=3 :
-                    states.append(("3_food_in_backpack",agent_object))
-                
-            if agent_state.isPacman:
-                states.append(("is_pacman",agent_object))
-            
-            
-
-        # Collect enemy agents states
-        enemies : List[Tuple[int,AgentState]] = [(i,gameState.getAgentState(i)) for i in self.getOpponents(gameState)]
-        noisyDistance = gameState.getAgentDistances()
-        typeIndex = 1
-        for enemy_index, enemy_state in enemies:
-            enemy_position = enemy_state.getPosition()
-            enemy_object = "e{}".format(enemy_index)
-            objects += [(enemy_object, "enemy{}".format(typeIndex))]
-
-            if enemy_state.scaredTimer>0:
-                states.append(("is_scared",enemy_object))
-
-            if enemy_position != None:
-                for agent_index, agent_state in agents:
-                    if self.getMazeDistance(agent_state.getPosition(), enemy_position) <= CLOSE_DISTANCE:
-                        states.append(("enemy_around",enemy_object, "a{}".format(agent_index)))
-            else:
-                if noisyDistance[enemy_index] >=LONG_DISTANCE :
-                    states.append(("enemy_long_distance",enemy_object, "a{}".format(self.index)))
+        team = [(agent_index, "a{}".format(agent_index)) for agent_index in self.getTeam(gameState)]
+        def allyStates(gameState):
+            for agent_index, agent_object in team:
+                if agent_index != self.index and self.getMazeDistance(gameState.getAgentPosition(self.index), gameState.getAgentPosition(agent_index)) <= CLOSE_DISTANCE:
+                    return [("near_ally",)]
+            return []
+        def carryingStates(gameState):
+            states = []
+            for agent_index, agent_object in team:
+                numCarrying = gameState.getAgentState(agent_index).numCarrying
+                if numCarrying>0:
+                    states.append(("food_in_backpack",agent_object))
+                    for amount in (20, 10, 5, 3):
+                        if numCarrying >= amount:
+                            states.append(("{}_food_in_backpack".format(amount),agent_object))
+            return states
+        builder.addGroup(("positions",), allyStates)
+        builder.addGroup(("carrying",), carryingStates)
+
+        # Collect scared and pacman states of every agent
+        everyone = team + [(enemy_index, "e{}".format(enemy_index)) for enemy_index in self.getOpponents(gameState)]
+        def scaredStates(gameState):
+            return [("is_scared",agent_object) for agent_index, agent_object in everyone
+                    if gameState.getAgentState(agent_index).scaredTimer>0]
+        def pacmanStates(gameState):
+            return [("is_pacman",agent_object) for agent_index, agent_object in everyone
+                    if gameState.getAgentState(agent_index).isPacman]
+        builder.addGroup(("scared",), scaredStates)
+        builder.addGroup(("pacman",), pacmanStates)
+
+        # Collect enemy agents distances
+        def enemyDistanceStates(gameState):
+            states = []
+            noisyDistance = gameState.getAgentDistances()
+            for enemy_index in self.getOpponents(gameState):
+                enemy_position = gameState.getAgentState(enemy_index).getPosition()
+                enemy_object = "e{}".format(enemy_index)
+                if enemy_position != None:
+                    for agent_index, agent_object in team:
+                        if self.getMazeDistance(gameState.getAgentPosition(agent_index), enemy_position) <= CLOSE_DISTANCE:
+                            states.append(("enemy_around",enemy_object, agent_object))
+                elif noisyDistance[enemy_index] >=LONG_DISTANCE :
+                    states.append(("enemy_long_distance",enemy_object, myObj))
                 elif noisyDistance[enemy_index] >=MEDIUM_DISTANCE :
-                    states.append(("enemy_medium_distance",enemy_object, "a{}".format(self.index)))
+                    states.append(("enemy_medium_distance",enemy_object, myObj))
                 else:
-                    states.append(("enemy_short_distance",enemy_object, "a{}".format(self.index)))                                                                                                                                                                                                 
-
-
-            if enemy_state.isPacman:
-                states.append(("is_pacman",enemy_object))
-            typeIndex += 1
-            
-        return objects, states
+                    states.append(("enemy_short_distance",enemy_object, myObj))
+            return states
+        builder.addGroup(("positions", "distances"), enemyDistanceStates)
+        return builder
     
     def stateSatisfyCurrentPlan(self, init_state: List[Tuple],positiveGoal, negtiveGoal):
         if self.highLevelPlan is None or len(self.highLevelPlan) == 0:
@@ -327,6 +335,12 @@ class MixedAgent(CaptureAgent):
         
         if positiveGoal != self.currentPositiveGoalStates or negtiveGoal != self.currentNegativeGoalStates:
             return False
+
+        # If none of the facts the current action reads or changes did change, the last check still holds
+        action = self.highLevelPlan[self.currentActionIndex][0]
+        if self.currentActionRunning and self.pddlChanges != None and not self.pddlChanges.touches(pddlState.actionAtoms(action)):
+            return True
+        self.currentActionRunning = False
         
         if self.pddl_solver.matchEffect(init_state, self.highLevelPlan[self.currentActionIndex][0] ):
             # The current state match the effect of current action, current action action done, move to next action
@@ -341,6 +355,7 @@ class MixedAgent(CaptureAgent):
 
         if self.pddl_solver.satisfyPrecondition(init_state, self.highLevelPlan[self.currentActionIndex][0]):
             # Current action precondition satisfied, continue executing current action of the plan
+            self.currentActionRunning = True
             return True
         
         # Current action precondition not satisfied anymore, need new plan
@@ -426,24 +441,24 @@ class MixedAgent(CaptureAgent):
         ##########
         if highLevelAction == "attack":
             # The q learning process for offensive actions are complete, 
-            # you can improve getOffensiveFeatures to collect more useful feature to pass more information to Q learning model
+            # you can improve getOffensiveFeatureMatrix to collect more useful feature to pass more information to Q learning model
             # you can improve the getOffensiveReward function to give reward for new features and improve the trainning process .
             rewardFunction = self.getOffensiveReward
-            featureFunction = self.getOffensiveFeatures
+            featureFunction = self.getOffensiveFeatureMatrix
             weights = self.getOffensiveWeights()
             learningRate = self.alpha
         elif highLevelAction == "go_home":
             # The q learning process for escape actions are NOT complete,
             # Introduce more features and complete the q learning process
             rewardFunction = self.getEscapeReward
-            featureFunction = self.getEscapeFeatures
+            featureFunction = self.counterFeatures(self.getEscapeFeatures)
             weights = self.getEscapeWeights()
             learningRate = 0 # learning rate set to 0 as reward function not implemented for this action, do not do q update, 
         else:
             # The q learning process for defensive actions are NOT complete,
             # Introduce more features and complete the q learning process
             rewardFunction = self.getDefensiveReward
-            featureFunction = self.getDefensiveFeatures
+            featureFunction = self.counterFeatures(self.getDefensiveFeatures)
             weights = self.getDefensiveWeights()
             learningRate = 0 # learning rate set to 0 as reward function not implemented for this action, do not do q update 
 
@@ -452,56 +467,71 @@ class MixedAgent(CaptureAgent):
             if prob and self.trainning:
                 action = random.choice(legalActions)
             else:
-                for action in legalActions:
-                        if self.trainning:
-                            self.updateWeights(gameState, action, rewardFunction, featureFunction, weights,learningRate)
-                            # print("Agent",self.index," weights:", weights)
-                        values.append((self.getQValue(featureFunction(gameState, action), weights), action))
+                # Features of every legal action at once, one row per action
+                q = self.getQFunction(weights)
+                features, orders = featureFunction(gameState, legalActions, q)
+                if self.trainning:
+                    for row, action in enumerate(legalActions):
+                        self.updateWeights(gameState, action, rewardFunction, featureFunction, q, features[row], orders[row], learningRate)
+                        # print("Agent",self.index," weights:", weights)
+                        values.append((float(features[row].dot(q.vector)), action))
+                else:
+                    values = list(zip(q.values(features).tolist(), legalActions))
                 action = max(values)[1]
         myPos = gameState.getAgentPosition(self.index)
         nextPos = Actions.getSuccessor(myPos,action)
         return [(action, nextPos)]
 
+    def getQFunction(self, weights) -> linearQ.LinearQ:
+        """
+        The linearQ.LinearQ of a weights dict, made once and shared by both agents like the dict.
+        Its updates are written back into the dict, so they are kept with QLWeights.
+        """
+        q = MixedAgent.QFunctions.get(id(weights))
+        if q is None or q.weights is not weights:
+            q = linearQ.LinearQ(weights)
+            MixedAgent.QFunctions[id(weights)] = q
+        return q
+
+    def counterFeatures(self, featureFunction):
+        """
+        Turns a feature function returning a util.Counter for one action into one that returns the
+        (actions x features) matrix and update orders of linearQ.LinearQ.fromCounters.
+        """
+        return lambda gameState, actions, q: q.fromCounters([featureFunction(gameState, action) for action in actions])
+
 
-    """
-    Iterate through all features (closest food, bias, ghost dist),
-    multiply each of the features' value to the feature's weight,
-    and return the sum of all these values to get the q-value.
-    """
-    def getQValue(self, features, weights):
-        return features * weights
-    
     """
     Iterate through all features and for each feature, update
     its weight values using the following formula:
     w(i) = w(i) + alpha((reward + discount*value(nextState)) - Q(s,a)) * f(i)(s,a)
+    features is the row of action, order the feature ids in the order to update them.
     """
-    def updateWeights(self, gameState, action, rewardFunction, featureFunction, weights, learningRate):
-        features = featureFunction(gameState, action)
+    def updateWeights(self, gameState, action, rewardFunction, featureFunction, q, features, order, learningRate):
+        if MixedAgent.Transitions is not None and learningRate == 0:
+            return # nothing for trainer.py to apply
         nextState = self.getSuccessor(gameState, action)
 
         reward = rewardFunction(gameState, nextState)
-        for feature in features:
-            correction = (reward + self.discountRate*self.getValue(nextState, featureFunction, weights)) - self.getQValue(features, weights)
-            weights[feature] =weights[feature] + learningRate*correction * features[feature]
+        nextFeatures, nextOrders = featureFunction(nextState, nextState.getLegalActions(self.index), q)
+        if MixedAgent.Transitions is not None:
+            # trainer.py applies the update after the game
+            MixedAgent.Transitions.append((self.getWeightsName(q.weights), features.copy(), list(order), reward,
+                                           nextFeatures, self.discountRate, learningRate))
+            return
+        q.tdUpdate(features, order, reward, nextFeatures, self.discountRate, learningRate)
+        q.store()
+
+    def getWeightsName(self, weights):
+        """
+        The key of a weights dict in QLWeights.
+        """
+        for name, value in MixedAgent.QLWeights.items():
+            if value is weights:
+                return name
+        raise Exception("Weights not in QLWeights: %s" % weights)
         
     
-    """
-    Iterate through all q-values that we get from all
-    possible actions, and return the highest q-value
-    """
-    def getValue(self, nextState: GameState, featureFunction, weights):
-        qVals = []
-        legalActions = nextState.getLegalActions(self.index)
-
-        if len(legalActions) == 0:
-            return 0.0
-        else:
-            for action in legalActions:
-                features = featureFunction(nextState, action)
-                qVals.append(self.getQValue(features,weights))
-            return max(qVals)
-    
     def getOffensiveReward(self, gameState: GameState, nextState: GameState):
         # Calculate the reward. 
         currentAgentState:AgentState = gameState.getAgentState(self.index)
@@ -538,44 +568,36 @@ class MixedAgent(CaptureAgent):
 
 
     
-    def getOffensiveFeatures(self, gameState: GameState, action):
-        food = self.getFood(gameState) 
+    def getOffensiveFeatureMatrix(self, gameState: GameState, actions, q):
+        """
+        The offensive features of each of actions as the rows of a matrix in the columns of q, with
+        the closest food read off the food distance field rather than found by a BFS per action.
+        """
         currAgentState = gameState.getAgentState(self.index)
 
         walls = gameState.getWalls()
         ghosts = self.getGhostLocs(gameState)
-        
-        # Initialize features
-        features = util.Counter()
-        nextState = self.getSuccessor(gameState, action)
-
-        # Successor Score
-        features['successorScore'] = self.getScore(nextState)/(walls.width+walls.height) * 10
-
-        # Bias
-        features["bias"] = 1.0
-        
-        # Get the location of pacman after he takes the action
-        next_x, next_y = nextState.getAgentPosition(self.index)
-
-        # Number of Ghosts 1-step away
-        features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in Actions.getLegalNeighbors(g, walls) for g in ghosts) 
-        
-        
-        dist_home =  self.getMazeDistance((next_x, next_y), gameState.getInitialAgentPosition(self.index))+1
-
-        features["chance-return-food"] = (currAgentState.numCarrying)*(1 - dist_home/(walls.width+walls.height)) # The closer to home, the larger food carried, more chance return food
-        
-        # Closest food
-        dist = self.closestFood((next_x, next_y), food, walls)
-        if dist is not None:
-                # make the distance a number less than one otherwise the update
-                # will diverge wildly
-                features["closest-food"] = dist/(walls.width+walls.height)
-        else:
-            features["closest-food"] = 0
-
-        return features
+        ghostNeighbors = [Actions.getLegalNeighbors(g, walls) for g in ghosts]
+        start = gameState.getInitialAgentPosition(self.index)
+        foodField = self.getDistanceFields(gameState).food
+
+        names = ['successorScore', 'bias', '#-of-ghosts-1-step-away', 'chance-return-food', 'closest-food']
+        order = [q.ids[name] for name in names if name in q.ids]
+        features = q.newMatrix(len(actions))
+        for row, action in enumerate(actions):
+            nextState = self.getSuccessor(gameState, action)
+            next_x, next_y = nextState.getAgentPosition(self.index)
+            dist_home =  self.getMazeDistance((next_x, next_y), start)+1
+            dist = foodField.distance((next_x, next_y))
+            values = [self.getScore(nextState)/(walls.width+walls.height) * 10,
+                      1.0,
+                      sum((next_x, next_y) in neighbors for neighbors in ghostNeighbors),
+                      (currAgentState.numCarrying)*(1 - dist_home/(walls.width+walls.height)),
+                      dist/(walls.width+walls.height) if dist is not None else 0]
+            for name, value in zip(names, values):
+                if name in q.ids:
+                    features[row, q.ids[name]] = value
+        return features, [order] * len(actions)
 
     def getOffensiveWeights(self):
         return MixedAgent.QLWeights["offensiveWeights"]
@@ -642,44 +664,8 @@ class MixedAgent(CaptureAgent):
     def getDefensiveWeights(self):
         return MixedAgent.QLWeights["defensiveWeights"]
     
-    def closestFood(self, pos, food, walls):
-        fringe = [(pos[0], pos[1], 0)]
-        expanded = set()
-        while fringe:
-            pos_x, pos_y, dist = fringe.pop(0)
-            if (pos_x, pos_y) in expanded:
-                continue
-            expanded.add((pos_x, pos_y))
-            # if we find a food at this location then exit
-            if food[pos_x][pos_y]:
-                return dist
-            # otherwise spread out from the location to its neighbours
-            nbrs = Actions.getLegalNeighbors((pos_x, pos_y), walls)
-            for nbr_x, nbr_y in nbrs:
-                fringe.append((nbr_x, nbr_y, dist+1))
-        # no food found
-        return None
-    
     def stateClosestFood(self, gameState:GameState):
-        pos = gameState.getAgentPosition(self.index)
-        food = self.getFood(gameState)
-        walls = gameState.getWalls()
-        fringe = [(pos[0], pos[1], 0)]
-        expanded = set()
-        while fringe:
-            pos_x, pos_y, dist = fringe.pop(0)
-            if (pos_x, pos_y) in expanded:
-                continue
-            expanded.add((pos_x, pos_y))
-            # if we find a food at this location then exit
-            if food[pos_x][pos_y]:
-                return dist
-            # otherwise spread out from the location to its neighbours
-            nbrs = Actions.getLegalNeighbors((pos_x, pos_y), walls)
-            for nbr_x, nbr_y in nbrs:
-                fringe.append((nbr_x, nbr_y, dist+1))
-        # no food found
-        return None
+        return self.getDistanceFields(gameState).food.distance(gameState.getAgentPosition(self.index))
     
     def getSuccessor(self, gameState: GameState, action):
         """
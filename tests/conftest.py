@@ -0,0 +1,32 @@
+# conftest.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+The tests import the game modules from the repository root and load layouts
+by relative path, as capture.py does when run from there.
+"""
+
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse=True)
+def fromRoot(monkeypatch, tmp_path):
+  monkeypatch.chdir(ROOT)
+  # Keep the distance tables the tests compute out of the user's cache
+  import distanceCalculator
+  monkeypatch.setattr(distanceCalculator, 'DISTANCE_CACHE_DIR', str(tmp_path / 'distances'))
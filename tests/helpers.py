@@ -0,0 +1,43 @@
+# helpers.py
+# ----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+What the tests compare states and plans by.  The games they build come from
+benchmark.py, next to the reference implementations the fast paths replaced.
+"""
+
+import layout
+
+LAYOUTS = ['tinyCapture', 'defaultCapture', 'fastCapture']
+
+def getLayouts():
+  return [layout.getLayout(name) for name in LAYOUTS]
+
+def stateSignature(state):
+  "Everything an agent can observe about a state, as plain values"
+  data = state.data
+  agents = tuple((a.configuration.pos, a.configuration.direction, a.isPacman, a.scaredTimer,
+                  a.numCarrying, a.numReturned) for a in data.agentStates)
+  return (agents, hash(data.food), data.food.asList(), tuple(data.capsules), data.score, data.scoreChange,
+          data.timeleft, data._foodEaten, data._foodAdded, data._capsuleEaten, data._agentMoved, data._win)
+
+def planReaches(domain, init, positiveGoals, negativeGoals, plan):
+  "Whether plan, a list of (GroundAction, state), is applicable from init and ends with the goals met"
+  state = domain.mask(init)
+  for action, after in plan:
+    if not action.applicable(state): return False
+    state = action.apply(state)
+    if frozenset(domain.atoms(state)) != after: return False
+  atoms = set(domain.atoms(state))
+  return set(positiveGoals) <= atoms and not set(negativeGoals) & atoms
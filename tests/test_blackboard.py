@@ -0,0 +1,41 @@
+# test_blackboard.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import contextlib, io
+
+import capture
+import layout
+import textDisplay
+from captureAgents import CaptureAgent
+
+class OldStyleAgent(CaptureAgent):
+  "Overrides registerTeam as agents written for the original CaptureAgent do"
+  def registerTeam(self, agentsOnTeam):
+    CaptureAgent.registerTeam(self, agentsOnTeam)
+    self.teamSize = len(agentsOnTeam)
+
+def newGame(agents):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return capture.CaptureRules(quiet=True).newGame(layout.getLayout('tinyCapture'), agents,
+                                                    textDisplay.NullGraphics(), 10, False, False)
+
+def testTeamsShareABlackboard():
+  agents = [OldStyleAgent(i) for i in range(4)]
+  newGame(agents)
+  assert [agent.teamSize for agent in agents] == [2, 2, 2, 2]
+  assert agents[0].blackboard is agents[2].blackboard and agents[1].blackboard is agents[3].blackboard
+  assert agents[0].blackboard is not agents[1].blackboard
+  first = agents[0].blackboard
+  newGame(agents)
+  assert agents[0].blackboard is not first and agents[0].blackboard is agents[2].blackboard
@@ -0,0 +1,42 @@
+# test_distances.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import pytest
+
+import benchmark
+import distanceCalculator
+import layout
+from helpers import LAYOUTS
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testTableMatchesSearch(name):
+  lay = layout.getLayout(name)
+  table = distanceCalculator.computeDistances(lay)
+  for key, d in benchmark.legacyComputeDistances(lay).items():
+    assert table.getDistance(*key) == d, key
+
+def testCacheRoundTrip(tmp_path):
+  lay = layout.getLayout('defaultCapture')
+  table = distanceCalculator.computeDistances(lay)
+  assert distanceCalculator.loadDistances(lay.walls, str(tmp_path)) == None
+  path = distanceCalculator.saveDistances(lay.walls, table, str(tmp_path))
+  assert [p.name for p in tmp_path.iterdir()] == [path.split('/')[-1]]
+  cached = distanceCalculator.loadDistances(lay.walls, str(tmp_path))
+  assert list(cached.distances) == list(table.distances)
+
+def testTruncatedCacheIsIgnored(tmp_path):
+  lay = layout.getLayout('tinyCapture')
+  path = distanceCalculator.saveDistances(lay.walls, distanceCalculator.computeDistances(lay), str(tmp_path))
+  with open(path, 'r+b') as f: f.truncate(10)
+  assert distanceCalculator.loadDistances(lay.walls, str(tmp_path)) == None
@@ -0,0 +1,57 @@
+# test_grids.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import pytest
+
+import benchmark
+import capture
+import layout
+from game import Actions, Configuration, Directions, Grid
+from helpers import LAYOUTS
+
+def listGrid(grid):
+  copy = Grid(grid.width, grid.height)
+  for x, y in grid.asList(): copy[x][y] = True
+  return copy
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testBitGridMatchesListGrid(name):
+  bits = layout.getLayout(name).food.copy()
+  plain = listGrid(bits)
+  assert hash(bits) == hash(plain) and bits.asList() == plain.asList() and bits.count() == plain.count()
+  x, y = bits.asList()[0]
+  copy = bits.copy()
+  copy[x][y] = False
+  plain[x][y] = False
+  assert bits[x][y] and hash(copy) == hash(plain) and copy.asList() == plain.asList()
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testLegalMoveTable(name):
+  walls = layout.getLayout(name).walls
+  plain = walls.copy()
+  assert walls.legalMoves is not None and plain.legalMoves is None
+  for cell in walls.asList(False):
+    config = Configuration(cell, Directions.STOP)
+    assert Actions.getPossibleActions(config, walls) == Actions.getPossibleActions(config, plain)
+    assert Actions.getLegalNeighbors(cell, walls) == Actions.getLegalNeighbors(cell, plain)
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testTeamFoodViews(name):
+  for state in benchmark.playout(benchmark.initialState(layout.getLayout(name)), 0, 600):
+    plain = listGrid(state.data.food)
+    for red in (True, False):
+      half = capture.halfGrid(state.data.food, red)
+      view = state.getTeamFood(red)
+      assert view == half and view.asList() == half.asList() == capture.halfGrid(plain, red).asList()
+      assert view.count() == half.count()
@@ -0,0 +1,73 @@
+# test_maze.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import contextlib, io
+
+import pytest
+
+import benchmark
+import distanceCalculator
+import distanceFields
+import layout
+import mazeAnalysis
+from captureAgents import CaptureAgent
+from helpers import LAYOUTS
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testTraps(name):
+  lay = layout.getLayout(name)
+  table = distanceCalculator.computeDistances(lay)
+  maze = mazeAnalysis.MazeAnalysis(lay.walls)
+  for cell, depth in maze.depths.items():
+    assert maze.trapExit(cell) not in maze.depths and table.getDistance(cell, maze.trapExit(cell)) == depth
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testHomeDistances(name):
+  lay = layout.getLayout(name)
+  table = distanceCalculator.computeDistances(lay)
+  maze = mazeAnalysis.MazeAnalysis(lay.walls)
+  for red in (True, False):
+    home = [cell for cell in maze.cells if (cell[0] < lay.width // 2) == red]
+    for cell in maze.cells:
+      if cell not in home:
+        assert maze.homeDistance(cell, red) == min(table.getDistance(cell, other) for other in home)
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testFoodFieldFollowsGame(name):
+  lay = layout.getLayout(name)
+  maze = mazeAnalysis.getMazeAnalysis(lay.walls)
+  fields = distanceFields.TeamFields(maze, True)
+  for state in benchmark.playout(benchmark.initialState(lay), 0, 600)[::3]:
+    fields.update(state)
+    food = state.getBlueFood()
+    for cell in maze.cells[::7]:
+      assert fields.food.distance(cell) == benchmark.legacyClosestFood(cell, food, lay.walls)
+
+def testLookaheadLeavesSharedFieldsAlone():
+  lay = layout.getLayout('defaultCapture')
+  states = benchmark.playout(benchmark.initialState(lay), 0, 200)
+  agent = CaptureAgent(0)
+  with contextlib.redirect_stdout(io.StringIO()):
+    agent.registerInitialState(states[0])
+  observation = states[-1]
+  agent.observationHistory.append(observation)
+  shared = agent.getDistanceFields(observation)
+  foodGrid, updates = shared.foodGrid, shared.updates
+  for action in observation.getLegalActions(0):
+    successor = observation.generateSuccessor(0, action)
+    food = successor.getBlueFood()
+    pos = successor.getAgentPosition(0)
+    assert agent.getDistanceFields(successor).food.distance(pos) == benchmark.legacyClosestFood(pos, food, lay.walls)
+  assert (shared.foodGrid, shared.updates) == (foodGrid, updates)
+  assert agent.getDistanceFields(observation) is shared
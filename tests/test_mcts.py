@@ -0,0 +1,33 @@
+# test_mcts.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import contextlib, io
+
+import benchmark
+import layout
+from captureAgents import MCTSAgent
+from helpers import stateSignature
+
+def testSearchLeavesStateAlone():
+  state = benchmark.playout(benchmark.initialState(layout.getLayout('defaultCapture')), 0, 100)[-1]
+  before = stateSignature(state)
+  agent = MCTSAgent(0)
+  with contextlib.redirect_stdout(io.StringIO()):
+    agent.registerInitialState(state)
+  assert agent.search(state, None, 200) == 200
+  assert agent.tree.visits[0] == 200 and stateSignature(state) == before
+  # Leaves are scored with the agent's own fields, not the ones the team shares
+  assert 'distanceFields' not in agent.blackboard.shared and agent.rolloutFields.updates > 0
+  agent.maxIterations = 50
+  assert agent.getAction(state) in state.getLegalActions(0) and stateSignature(state) == before
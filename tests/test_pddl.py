@@ -0,0 +1,43 @@
+# test_pddl.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import pytest
+
+import benchmark
+import pddlDomain
+from helpers import planReaches
+
+DOMAINS = ['myTeam.pddl', 'staffTeam.pddl']
+
+def solve(name, backend, greedy, problems):
+  return benchmark.solveProblems(pddlDomain.DomainSolver(name, backend, greedy), problems)
+
+@pytest.mark.parametrize('name', DOMAINS)
+def testPlansReachGoals(name):
+  domain = pddlDomain.getDomain(name)
+  problems = benchmark.pddlProblems(domain, 60, 0)
+  optimal = solve(name, 'bitset', False, problems)
+  greedy = solve(name, 'bitset', True, problems)
+  assert any(optimal)
+  for (init, positiveGoals, negativeGoals), best, quick in zip(problems, optimal, greedy):
+    for plan in (best, quick):
+      if plan: assert planReaches(domain, init, positiveGoals, negativeGoals, plan)
+    assert bool(best) == bool(quick) and len(best) <= len(quick)
+
+@pytest.mark.skipif(pddlDomain.pddl_solver == None, reason='piglet is not installed')
+@pytest.mark.parametrize('name', DOMAINS)
+def testPigletSolvesTheSameProblems(name):
+  problems = benchmark.pddlProblems(pddlDomain.getDomain(name), 60, 0)
+  piglet = solve(name, 'piglet', False, problems)
+  assert [bool(p) for p in piglet] == [bool(p) for p in solve(name, 'bitset', False, problems)]
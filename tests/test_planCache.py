@@ -0,0 +1,54 @@
+# test_planCache.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import pickle
+
+import benchmark
+import pddlDomain
+from planCache import PlanCache
+
+def problems():
+  return benchmark.pddlProblems(pddlDomain.getDomain('myTeam.pddl'), 20, 0)
+
+def described(plans):
+  "plans with each action by its name, as unpickled ground actions are new objects"
+  return [[(str(action), state) for action, state in plan] for plan in plans]
+
+def testPlansAreKeyedByBackend():
+  cache = PlanCache()
+  optimal = pddlDomain.DomainSolver('myTeam.pddl', 'bitset')
+  greedy = pddlDomain.DomainSolver('myTeam.pddl', 'bitset', True)
+  init, positiveGoals, negativeGoals = problems()[0]
+  for solver in (optimal, greedy, optimal):
+    cache.plan(solver, benchmark.PDDL_OBJECTS, init, positiveGoals, negativeGoals)
+  assert (len(cache), cache.hits, cache.misses) == (2, 1, 2)
+
+def testSaveAndLoad(tmp_path):
+  cache = PlanCache()
+  solver = pddlDomain.DomainSolver('myTeam.pddl', 'bitset')
+  plans = [cache.plan(solver, benchmark.PDDL_OBJECTS, *problem) for problem in problems()]
+  path = str(tmp_path / 'plans')
+  assert cache.save(path) == path and [p.name for p in tmp_path.iterdir()] == ['plans']
+  loaded = PlanCache()
+  loaded.load(path)
+  reloaded = [loaded.plan(solver, benchmark.PDDL_OBJECTS, *problem) for problem in problems()]
+  assert any(plans) and described(reloaded) == described(plans)
+  assert loaded.misses == 0
+
+def testOldFilesAreIgnored(tmp_path):
+  path = tmp_path / 'plans'
+  path.write_bytes(pickle.dumps([]))
+  cache = PlanCache()
+  cache.load(str(path))
+  assert len(cache) == 0
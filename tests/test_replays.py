@@ -0,0 +1,38 @@
+# test_replays.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import random
+
+import pytest
+
+import benchmark
+import layout
+import replay
+from helpers import LAYOUTS, stateSignature
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testReplayRoundTrip(name, tmp_path):
+  lay = layout.getLayout(name)
+  root = benchmark.initialState(lay)
+  moves = []
+  states = benchmark.playout(root, 0, 1200, moves)
+  path = str(tmp_path / 'replay')
+  writer = replay.ReplayWriter(path, lay, root, 1200)
+  for (agentIndex, action), state in zip(moves, states[1:]):
+    writer.record(agentIndex, action, state)
+  writer.close()
+  reader = replay.ReplayReader(path)
+  assert list(reader.actions()) == moves
+  for turn in [0, len(moves)] + random.Random(0).sample(range(len(moves) + 1), 20):
+    assert stateSignature(reader.stateAt(turn))[:5] == stateSignature(states[turn])[:5], turn
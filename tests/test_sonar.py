@@ -0,0 +1,30 @@
+# test_sonar.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import pytest
+
+import benchmark
+import capture
+import layout
+import util
+from helpers import LAYOUTS
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testLikelihoodMatchesDistanceProb(name):
+  state = benchmark.initialState(layout.getLayout(name))
+  model = state.getSonarModel()
+  for pos in model.cells[::5]:
+    for noisyDistance in (0, 3, 7, 12):
+      expected = [state.getDistanceProb(util.manhattanDistance(pos, cell), noisyDistance) for cell in model.cells]
+      assert list(model.likelihood(pos, noisyDistance)) == pytest.approx(expected)
@@ -0,0 +1,92 @@
+# test_successors.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import contextlib, io, random
+
+import pytest
+
+import benchmark
+import capture
+import game
+import layout
+import textDisplay
+from captureAgents import CaptureAgent
+from helpers import LAYOUTS, stateSignature
+
+@pytest.fixture
+def copyOnWrite():
+  "Sets capture.COPY_ON_WRITE for one test"
+  def set(value):
+    capture.COPY_ON_WRITE = value
+  yield set
+  capture.COPY_ON_WRITE = True
+
+def midgame(name):
+  return benchmark.playout(benchmark.initialState(layout.getLayout(name)), 0, 100)[-1]
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testCopyOnWriteSuccessors(name, copyOnWrite):
+  root = benchmark.initialState(layout.getLayout(name))
+  build = lambda: benchmark.successorTree(midgame(name), 0, 4) + benchmark.playout(root, 1, 1200)
+  signatures = []
+  for value in (False, True):
+    copyOnWrite(value)
+    signatures.append([stateSignature(s) for s in build()])
+    # Building again from the same roots must not see any change
+    assert [stateSignature(s) for s in build()] == signatures[-1]
+  assert signatures[0] == signatures[1]
+
+class RandomCaptureAgent(CaptureAgent):
+  def chooseAction(self, gameState):
+    return random.choice(gameState.getLegalActions(self.index))
+
+def playGame(lay, seed):
+  random.seed(seed)
+  agents = [RandomCaptureAgent(i) for i in range(4)]
+  with contextlib.redirect_stdout(io.StringIO()):
+    g = capture.CaptureRules(quiet=True).newGame(lay, agents, textDisplay.NullGraphics(), 1200, False, False)
+    g.run()
+  return g.moveHistory, g.state.data.score
+
+def testSharedLayoutGames(monkeypatch):
+  "Games are the same whether or not GameStateData.deepCopy shares the layout"
+  lay = layout.getLayout('defaultCapture')
+  shared = [playGame(lay, seed) for seed in range(2)]
+  monkeypatch.setattr(game.GameStateData, 'deepCopy', benchmark.legacyDeepCopy)
+  assert [playGame(lay, seed) for seed in range(2)] == shared
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testSimulatorPlayouts(name):
+  root = benchmark.initialState(layout.getLayout(name))
+  before = stateSignature(root)
+  for seed in range(3):
+    moves = []
+    states = benchmark.playout(root, seed, 1200, moves)
+    sim = capture.Simulator(root)
+    for (agentIndex, action), state in zip(moves, states[1:]):
+      assert stateSignature(sim.apply(agentIndex, action)) == stateSignature(state)
+    # Each undo must give back the state before the move, markers and all
+    for state in reversed(states[:-1]):
+      assert stateSignature(sim.undo()) == stateSignature(state)
+    assert sim.depth() == 0
+  assert stateSignature(root) == before
+
+@pytest.mark.parametrize('name', LAYOUTS)
+def testSimulatorTree(name):
+  state = midgame(name)
+  before = stateSignature(state)
+  expected = [stateSignature(s) for s in benchmark.successorTree(state, 0, 4)]
+  visited = []
+  benchmark.simulatorTree(capture.Simulator(state), 0, 4, lambda s: visited.append(stateSignature(s)))
+  assert visited == expected and stateSignature(state) == before
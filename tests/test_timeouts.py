@@ -0,0 +1,48 @@
+# test_timeouts.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import threading, time
+
+import pytest
+
+from util import TimeoutFunction, TimeoutFunctionException
+
+def inThread(function):
+  "Runs function() in another thread and returns what it returned or raised, and the seconds taken"
+  outcome = []
+  def run():
+    start = time.perf_counter()
+    try:
+      outcome.append(function())
+    except Exception as e:
+      outcome.append(e)
+    outcome.append(time.perf_counter() - start)
+  worker = threading.Thread(target=run)
+  worker.start()
+  worker.join()
+  return outcome
+
+def testMainThreadInterrupts():
+  start = time.perf_counter()
+  with pytest.raises(TimeoutFunctionException):
+    TimeoutFunction(time.sleep, 0.1)(2)
+  assert time.perf_counter() - start < 0.5
+
+def testOtherThreadStopsWaitingOnTime():
+  result, seconds = inThread(lambda: TimeoutFunction(time.sleep, 0.1)(1))
+  assert isinstance(result, TimeoutFunctionException) and seconds < 0.5
+
+def testOtherThreadReturnsAndRaises():
+  assert inThread(lambda: TimeoutFunction(sum, 1)([1, 2]))[0] == 3
+  assert isinstance(inThread(lambda: TimeoutFunction(int, 1)('x'))[0], ValueError)
@@ -0,0 +1,27 @@
+# test_trainer.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+import copy
+
+import batchRunner
+import trainer
+from staffTeam import MixedAgent
+
+def testTrainingGameLeavesTheTeamAsItWas(monkeypatch):
+  monkeypatch.setattr(batchRunner, '_options', {'length': 100})
+  before = (MixedAgent.QLWeights, MixedAgent.QLWeightsFile, MixedAgent.Transitions)
+  result = trainer.playTrainingGame(('defaultCapture', 0, 'staffTeam', copy.deepcopy(MixedAgent.QLWeights)))
+  assert result['moves'] == 100 and result['transitions']
+  after = (MixedAgent.QLWeights, MixedAgent.QLWeightsFile, MixedAgent.Transitions)
+  assert all(a is b for a, b in zip(before, after))
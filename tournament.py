@@ -0,0 +1,187 @@
+# tournament.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs a round-robin tournament between teams.
+
+Every pair of teams plays on every layout, once with each colour assignment
+and once per seed.  Games are played in parallel by batchRunner.  Each
+finished game is appended to a checkpoint file straight away, so a run that
+crashes or is interrupted picks up where it stopped when started again with
+the same checkpoint.  Unless one is named, the checkpoint is kept in the user
+cache directory under a name made from the tournament's settings, so the
+same command resumes the same run.  At the end a standings table with Elo ratings is
+printed.
+
+  python tournament.py -l ALL -n 2 -j 8
+  python tournament.py -t myTeam -t staffTeam -t berkeleyTeam --checkpoint night1.jsonl
+"""
+
+import hashlib, json, os, sys, time
+
+import batchRunner
+import util
+
+DEFAULT_TEAMS = ['berkeleyTeam', 'bravo', 'wise', 'staffTeam', 'myTeam']
+
+ELO_START = 1500
+ELO_K = 32
+
+def schedule(teams, layouts, numGames, firstSeed = 0):
+  """
+  Returns the (layout, seed, red, blue) jobs of a full round robin: every
+  pair of teams, on every layout, with both colour assignments.
+  """
+  jobs = []
+  for i in range(len(teams)):
+    for j in range(i + 1, len(teams)):
+      for name in layouts:
+        for seed in range(firstSeed, firstSeed + numGames):
+          jobs.append((name, seed, teams[i], teams[j]))
+          jobs.append((name, seed, teams[j], teams[i]))
+  return jobs
+
+##############
+# Checkpoint #
+##############
+
+def defaultCheckpoint(teams, layouts, numGames, firstSeed, length):
+  "The checkpoint of a tournament with these settings, when none is named"
+  key = json.dumps([teams, layouts, numGames, firstSeed, length])
+  return os.path.join(util.cacheDirectory('tournaments'), hashlib.sha1(key.encode()).hexdigest()[:16] + '.jsonl')
+
+def loadCheckpoint(path):
+  """
+  Returns {job: result} for every game recorded in the checkpoint file.  A
+  truncated last line (from a crash mid-write) is ignored.
+  """
+  results = {}
+  if path == None or not os.path.exists(path):
+    return results
+  with open(path) as f:
+    for line in f:
+      try:
+        result = json.loads(line)
+      except ValueError:
+        continue
+      result['job'] = tuple(result['job'])
+      results[result['job']] = result
+  return results
+
+def openCheckpoint(path):
+  """
+  Opens the checkpoint for appending, first ending any line left unfinished
+  by a crash so that it does not swallow the next record.
+  """
+  if os.path.dirname(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+  f = open(path, 'a+')
+  if f.tell() > 0:
+    f.seek(f.tell() - 1)
+    if f.read(1) != '\n':
+      f.write('\n')
+  return f
+
+def appendCheckpoint(f, result):
+  f.write(json.dumps(result) + '\n')
+  f.flush()
+  os.fsync(f.fileno())
+
+#############
+# Standings #
+#############
+
+def expectedScore(rating, opponentRating):
+  return 1.0 / (1 + 10 ** ((opponentRating - rating) / 400.0))
+
+def standings(teams, jobs, results):
+  """
+  Folds the results of jobs, in schedule order so the ratings do not depend
+  on which game happened to finish first, into one row per team:
+  [team, played, wins, ties, losses, points for, points against, elo].
+  """
+  rows = dict((team, [team, 0, 0, 0, 0, 0, 0, float(ELO_START)]) for team in teams)
+  for job in jobs:
+    if job not in results: continue
+    layoutName, seed, red, blue = job
+    score = results[job]['score']
+    redResult = 1.0 if score > 0 else 0.5 if score == 0 else 0.0
+    redRow, blueRow = rows[red], rows[blue]
+    for row, result, margin in ((redRow, redResult, score), (blueRow, 1 - redResult, -score)):
+      row[1] += 1
+      row[{1.0: 2, 0.5: 3, 0.0: 4}[result]] += 1
+      row[5] += max(margin, 0)
+      row[6] += max(-margin, 0)
+    redExpected = expectedScore(redRow[7], blueRow[7])
+    redRow[7] += ELO_K * (redResult - redExpected)
+    blueRow[7] += ELO_K * ((1 - redResult) - (1 - redExpected))
+  return sorted(rows.values(), key=lambda row: -row[7])
+
+def printStandings(rows):
+  print('%-4s %-20s %6s %5s %5s %5s %7s %7s %7s' % ('', 'Team', 'Played', 'Won', 'Tied', 'Lost', 'For', 'Against', 'Elo'))
+  for rank, row in enumerate(rows):
+    print('%-4s %-20s %6d %5d %5d %5d %7d %7d %7.0f' % tuple(['%d.' % (rank + 1)] + row))
+
+def readCommand(argv):
+  from optparse import OptionParser
+  parser = OptionParser('python tournament.py [options]')
+  parser.add_option('-t', '--team', dest='teams', action='append', default=None,
+                    help='Team to enter; may be repeated [Default: %s]' % ', '.join(DEFAULT_TEAMS))
+  parser.add_option('-l', '--layout', dest='layouts', action='append', default=None, metavar='LAYOUT_FILE',
+                    help='Layout to play on; may be repeated.  ALL means every layout in layouts/, '
+                         'RANDOM<seed> a random maze [Default: defaultCapture]')
+  parser.add_option('-n', '--numGames', type='int', default=1,
+                    help='Seeds per pairing, layout and colour assignment [Default: %default]')
+  parser.add_option('-s', '--seed', type='int', default=0, help='First seed [Default: %default]')
+  parser.add_option('-j', '--processes', type='int', default=None, help='Worker processes [Default: one per CPU]')
+  parser.add_option('-i', '--time', type='int', dest='length', default=1200, metavar='TIME',
+                    help='TIME limit of a game in moves [Default: %default]')
+  parser.add_option('-c', '--catchExceptions', action='store_true', default=False,
+                    help='Catch exceptions and enforce time limits')
+  parser.add_option('--hostAgents', action='store_true', default=False,
+                    help='Run each team in a process of its own, killed if it runs out of time (see agentHost.py)')
+  parser.add_option('--checkpoint', default=None,
+                    help='File finished games are recorded in, and resumed from '
+                         '[Default: a file per set of options in %s]' % util.cacheDirectory('tournaments'))
+  options, otherjunk = parser.parse_args(argv)
+  assert len(otherjunk) == 0, "Unrecognized options: " + str(otherjunk)
+  options.teams = options.teams or DEFAULT_TEAMS
+  options.layouts = options.layouts or ['defaultCapture']
+  if 'ALL' in options.layouts:
+    options.layouts = batchRunner.layoutNames()
+  if options.checkpoint == None:
+    options.checkpoint = defaultCheckpoint(options.teams, options.layouts, options.numGames, options.seed, options.length)
+  return options
+
+if __name__ == '__main__':
+  options = readCommand(sys.argv[1:])
+  jobs = schedule(options.teams, options.layouts, options.numGames, options.seed)
+  results = loadCheckpoint(options.checkpoint)
+  pending = [job for job in jobs if job not in results]
+  print('%d games scheduled, %d already played, %d to go' % (len(jobs), len(jobs) - len(pending), len(pending)))
+  print('Checkpoint: %s' % options.checkpoint)
+
+  start = time.time()
+  if pending:
+    with openCheckpoint(options.checkpoint) as checkpoint:
+      for done, (i, result) in enumerate(batchRunner.runBatch(pending, options.processes, length=options.length,
+                                                                catchExceptions=options.catchExceptions,
+                                                                hostAgents=options.hostAgents)):
+        appendCheckpoint(checkpoint, result)
+        results[result['job']] = result
+        print('[%4d/%d] %s' % (done + 1, len(pending), batchRunner.describe(result)))
+        sys.stdout.flush()
+    print('Played %d games in %.1fs' % (len(pending), time.time() - start))
+  print('')
+  printStandings(standings(options.teams, jobs, results))
@@ -0,0 +1,220 @@
+# trainer.py
+# ----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Trains the Q-learning weights of a MixedAgent team by parallel self-play.
+
+Training used to mean setting trainning in MixedAgent and playing games
+one at a time, every agent updating the shared weights as it played and
+each final() rewriting the weights file.  Here training goes in rounds.
+Every round plays a number of headless games of the team against itself
+in a pool of worker processes (the workers of batchRunner.py), all with
+the same weights.  The agents only record their transitions (features,
+reward, the features of the next state, learning rate and discount) in
+MixedAgent.Transitions, which each game sends back.  The weights are
+then updated here, either by applying every transition in game order
+(--mode sync) or by averaging the change each game's transitions alone
+would make (--mode average), and saved as the next checkpoint of the
+weights file (see weightStore.py):
+
+  QLWeightsStaffTeam.json -> QLWeightsStaffTeam.v0001.json, .v0002.json, ...
+
+MixedAgent loads the latest checkpoint (or a given QLWeightsVersion), and
+falls back on the weights file itself when there are none.  Training
+starts from the weights the team would load.
+
+  python trainer.py -t staffTeam -g 8 -r 10 -j 4
+  python trainer.py -t staffTeam -l defaultCapture -l jumboCapture --mode average
+"""
+
+import copy, io, os, sys, time, random, contextlib
+import concurrent.futures
+
+import capture
+import textDisplay
+import batchRunner
+import linearQ
+import weightStore
+
+MODES = ['sync', 'average']
+
+###########
+# Workers #
+###########
+
+def getMixedAgentClass(agent):
+  "The MixedAgent class of agent, whose class attributes its team shares"
+  for cls in type(agent).__mro__:
+    if cls.__name__ == 'MixedAgent':
+      return cls
+  raise Exception('%s is not a MixedAgent' % type(agent).__name__)
+
+def playTrainingGame(job):
+  """
+  Plays one (layout, seed, team, weights) job of the team against itself,
+  and returns its result with the transitions both sides recorded.
+  """
+  layoutName, seed, team, weights = job
+  start = time.time()
+  with contextlib.ExitStack() as muted:
+    if not batchRunner._options.get('verbose', False):
+      sink = io.StringIO()
+      muted.enter_context(contextlib.redirect_stdout(sink))
+      muted.enter_context(contextlib.redirect_stderr(sink))
+    lay = batchRunner.getLayout(layoutName)
+    red, blue = batchRunner.getTeam(True, team), batchRunner.getTeam(False, team)
+    classes = []
+    for agent in red + blue:
+      cls = getMixedAgentClass(agent)
+      if cls not in classes: classes.append(cls)
+    # The classes are shared with anything else in this process, so what the
+    # game needs changed is put back afterwards
+    saved = [(cls, cls.QLWeights, cls.QLWeightsFile, cls.Transitions) for cls in classes]
+    try:
+      for cls in classes:
+        cls.QLWeights = copy.deepcopy(weights)
+        cls.QLWeightsFile = None # keep these weights rather than load the file
+        cls.Transitions = []
+      agents = sum([list(el) for el in zip(red, blue)], [])
+      random.seed(seed)
+      rules = capture.CaptureRules(quiet = True)
+      game = rules.newGame(lay, agents, textDisplay.NullGraphics(), batchRunner._options.get('length', 1200),
+                           True, batchRunner._options.get('catchExceptions', False))
+      game.run()
+      transitions = []
+      for cls in classes:
+        transitions.extend(cls.Transitions)
+    finally:
+      for cls, weightsDict, weightsFile, recorded in saved:
+        cls.QLWeights, cls.QLWeightsFile, cls.Transitions = weightsDict, weightsFile, recorded
+  return {'job': job[:3], 'score': game.state.data.score, 'moves': len(game.moveHistory),
+          'crashed': game.agentCrashed, 'timeout': game.agentTimeout, 'seconds': time.time() - start,
+          'transitions': transitions}
+
+def _playIndexed(indexedJob):
+  i, job = indexedJob
+  return i, playTrainingGame(job)
+
+############
+# Updating #
+############
+
+def applyTransitions(weights, games, mode = 'sync'):
+  """
+  New weights after the transitions of games (a list per game of
+  (weightsName, features, order, reward, nextFeatures, discount,
+  learningRate) tuples, as MixedAgent records them).  sync applies them
+  all in turn; average applies each game's to the old weights and adds
+  the mean change of the games that have transitions for a weights dict.
+  """
+  if mode not in MODES: raise Exception('Unknown training mode: %s' % mode)
+  weights = copy.deepcopy(weights)
+  if mode == 'sync':
+    games = [sum(games, [])]
+  changes = {}
+  for transitions in games:
+    engines = {}
+    for name, features, order, reward, nextFeatures, discount, learningRate in transitions:
+      if name not in engines:
+        engines[name] = linearQ.LinearQ(dict(weights[name]))
+      engines[name].tdUpdate(features, order, reward, nextFeatures, discount, learningRate)
+    for name, q in engines.items():
+      changes.setdefault(name, []).append(q.vector - linearQ.LinearQ(weights[name]).vector)
+  for name, deltas in changes.items():
+    q = linearQ.LinearQ(weights[name])
+    q.vector = q.vector + sum(deltas) / len(deltas)
+    q.store()
+  return weights
+
+##########
+# Runner #
+##########
+
+def train(team, layouts, gamesPerRound, rounds, processes = None, mode = 'sync', firstSeed = 0, **options):
+  """
+  Trains team for rounds rounds of gamesPerRound games (cycling through
+  layouts), saving a checkpoint of the weights after each.  Yields the
+  (round, version, results) of every round as it is done.
+  """
+  cls = getMixedAgentClass(capture.loadAgents(True, team, True, {})[0])
+  weightsFile = cls.QLWeightsFile
+  weights = weightStore.load(weightsFile) or copy.deepcopy(cls.QLWeights)
+  if processes == None: processes = os.cpu_count() or 1
+  processes = max(1, min(processes, gamesPerRound))
+  pool = None
+  if processes > 1:
+    pool = concurrent.futures.ProcessPoolExecutor(processes, initializer=batchRunner.initWorker, initargs=(options,))
+  else:
+    batchRunner.initWorker(options)
+  try:
+    for round in range(rounds):
+      seed = firstSeed + round * gamesPerRound
+      jobs = [(layouts[i % len(layouts)], seed + i, team, weights) for i in range(gamesPerRound)]
+      results = [None] * len(jobs)
+      if pool == None:
+        for i, job in enumerate(jobs):
+          results[i] = playTrainingGame(job)
+      else:
+        for future in concurrent.futures.as_completed([pool.submit(_playIndexed, job) for job in enumerate(jobs)]):
+          i, result = future.result()
+          results[i] = result
+      # Games are applied in job order, whichever finished first
+      weights = applyTransitions(weights, [result['transitions'] for result in results], mode)
+      version = weightStore.saveCheckpoint(weightsFile, weights)
+      yield round, version, results
+  finally:
+    if pool != None:
+      pool.shutdown(wait=True, cancel_futures=True)
+
+def readCommand(argv):
+  from optparse import OptionParser
+  parser = OptionParser('python trainer.py [options]')
+  parser.add_option('-t', '--team', help=capture.default('Team to train (its MixedAgent weights)'), default='staffTeam')
+  parser.add_option('-l', '--layout', dest='layouts', action='append', default=None, metavar='LAYOUT_FILE',
+                    help='Layout to play on; may be repeated, games cycle through them.  ALL means every '
+                         'layout in layouts/, RANDOM<seed> a random maze [Default: defaultCapture]')
+  parser.add_option('-g', '--games', type='int', help=capture.default('Games per round'), default=8)
+  parser.add_option('-r', '--rounds', type='int', help=capture.default('Rounds, each saving a checkpoint'), default=1)
+  parser.add_option('-m', '--mode', type='choice', choices=MODES, default='sync',
+                    help='How the transitions of a round update the weights: sync applies them all in '
+                         'turn, average averages the change of each game [Default: sync]')
+  parser.add_option('-s', '--seed', type='int', help=capture.default('Random seed of the first game'), default=0)
+  parser.add_option('-j', '--processes', type='int', help='Worker processes [Default: one per CPU]', default=None)
+  parser.add_option('-i', '--time', type='int', dest='length', help=capture.default('TIME limit of a game in moves'),
+                    default=1200, metavar='TIME')
+  parser.add_option('-c', '--catchExceptions', action='store_true', default=False,
+                    help='Catch exceptions and enforce time limits')
+  parser.add_option('-v', '--verbose', action='store_true', default=False,
+                    help='Show game and agent output (interleaved between workers)')
+  options, otherjunk = parser.parse_args(argv)
+  assert len(otherjunk) == 0, "Unrecognized options: " + str(otherjunk)
+
+  layouts = options.layouts or ['defaultCapture']
+  if 'ALL' in layouts:
+    layouts = batchRunner.layoutNames()
+  return options, layouts
+
+if __name__ == '__main__':
+  options, layouts = readCommand(sys.argv[1:])
+  start = time.time()
+  for round, version, results in train(options.team, layouts, options.games, options.rounds, options.processes,
+                                       options.mode, options.seed, length=options.length,
+                                       catchExceptions=options.catchExceptions, verbose=options.verbose):
+    scores = [result['score'] for result in results]
+    notes = sum(1 for result in results if result['crashed'] or result['timeout'])
+    print('Round %d: %d games, %d transitions, mean score %.2f%s -> checkpoint v%04d (%.1fs)' % (
+      round + 1, len(results), sum(len(result['transitions']) for result in results),
+      float(sum(scores)) / len(scores), ' (%d crashed or timed out)' % notes if notes else '', version,
+      time.time() - start))
+    sys.stdout.flush()
@@ -13,6 +13,7 @@
 
 
 import sys
+import os
 import inspect
 import heapq, random
 import io
@@ -578,6 +579,15 @@ def pause():
     print("<Press enter/return to continue>")
     input()
 
+def cacheDirectory(name):
+    """
+    Where files cached under name are kept between runs: a directory in
+    $XDG_CACHE_HOME, or ~/.cache, rather than in the source checkout, which
+    may be read-only or shared.  It is not created here.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pacman-capture', name)
+
 
 # code to handle timeouts
 #
@@ -588,6 +598,7 @@ def pause():
 # this have all student code so wrapped.
 #
 import signal
+import threading
 import time
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
@@ -595,6 +606,16 @@ class TimeoutFunctionException(Exception):
 
 
 class TimeoutFunction:
+    """
+    Calls function, raising TimeoutFunctionException if it takes more than
+    timeout seconds (which need not be whole).  In the main thread a
+    SIGALRM interval timer interrupts the call when the time is up.  Where
+    signals can not be used (other threads, or no SIGALRM), the call runs in
+    a daemon thread of its own, which is abandoned, still running, when the
+    time is up; the caller gets the exception on time either way.  Methods of
+    agents hosted in another process (see agentHost.py) are stopped by
+    killing the host.
+    """
     def __init__(self, function, timeout):
         self.timeout = timeout
         self.function = function
@@ -603,23 +624,34 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
+        host = getattr(self.function, '__self__', None)
+        if hasattr(host, 'callWithTimeout'):
+            return host.callWithTimeout(self.function.__name__, self.timeout, *args, **keyArgs)
+        if self.timeout <= 0:
+            self.handle_timeout(None, None)
+        if hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread():
             old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
         else:
-            startTime = time.time()
-            result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
+            outcome = []
+            def run():
+                try:
+                    outcome.append((True, self.function(*args, **keyArgs)))
+                except BaseException as e:
+                    outcome.append((False, e))
+            worker = threading.Thread(target=run, daemon=True)
+            worker.start()
+            worker.join(self.timeout)
+            if not outcome:
                 self.handle_timeout(None, None)
+            finished, result = outcome[0]
+            if not finished:
+                raise result
         return result
 
 
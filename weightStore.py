@@ -0,0 +1,190 @@
+# weightStore.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Stores the Q-learning weights of a team.
+
+Weights used to be kept as str(dict) text files read back with eval, by
+every agent at the start of every game.  A weight file here is JSON with
+a small schema,
+
+  {"format": "pacman-qlweights", "schema": 1,
+   "weights": {"offensiveWeights": {"bias": 1.0, ...}, ...}}
+
+so reading one runs no code, and a file of the wrong shape is an error
+rather than a strange dict.  Old str(dict) files are still read (with
+ast.literal_eval), so they can be converted:
+
+  python weightStore.py QLWeightsStaffTeam.txt QLWeightsStaffTeam.json
+
+Files are written to a temporary file that then replaces the old one, so
+a reader never sees half a file, and writers take a lock on path.lock
+(where fcntl is available) so two of them cannot interleave.  Versioned
+checkpoints of a weight file sit next to it (QLWeightsStaffTeam.v0001.json,
+...); load reads the latest one by default and the file itself when
+there are none:
+
+  weights = weightStore.load(BASE_FOLDER + '/QLWeightsStaffTeam.json')
+  version = weightStore.saveCheckpoint(BASE_FOLDER + '/QLWeightsStaffTeam.json', weights)
+
+Loaded files are cached per process until they change on disk, so the
+agents of both teams and later games of a run do not read them again.
+"""
+
+import ast, contextlib, copy, json, os, re, sys
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+FORMAT = 'pacman-qlweights'
+SCHEMA = 1
+
+##########
+# Format #
+##########
+
+def validate(weights):
+  """
+  Checks weights is a dict of weight sets, each a dict from feature names
+  to numbers, and returns it with the numbers as floats.
+  """
+  if not isinstance(weights, dict):
+    raise Exception('Weights must be a dict of weight sets, not %s' % type(weights).__name__)
+  checked = {}
+  for name, weightSet in weights.items():
+    if not isinstance(name, str) or not isinstance(weightSet, dict):
+      raise Exception('Weight set %r must be a dict named by a string' % (name,))
+    checked[name] = {}
+    for feature, weight in weightSet.items():
+      if not isinstance(feature, str) or isinstance(weight, bool) or not isinstance(weight, (int, float)):
+        raise Exception('Weight %r of %s must be a number named by a string' % (feature, name))
+      checked[name][feature] = float(weight)
+  return checked
+
+def parse(text):
+  "The weights in the text of a weight file, or of an old str(dict) one"
+  try:
+    data = json.loads(text)
+  except ValueError:
+    return validate(ast.literal_eval(text))
+  if not isinstance(data, dict) or data.get('format') != FORMAT:
+    raise Exception('Not a weight file (format should be %s)' % FORMAT)
+  if data.get('schema') != SCHEMA:
+    raise Exception('Unsupported weight file schema: %r' % data.get('schema'))
+  return validate(data.get('weights'))
+
+def dumps(weights):
+  return json.dumps({'format': FORMAT, 'schema': SCHEMA, 'weights': validate(weights)}, indent=1) + '\n'
+
+###############
+# Checkpoints #
+###############
+
+def checkpointPath(path, version):
+  "The file of checkpoint version of path"
+  root, ext = os.path.splitext(path)
+  return '%s.v%04d%s' % (root, version, ext)
+
+def checkpointVersions(path):
+  "The versions of path there are checkpoints of, in order"
+  directory, name = os.path.split(os.path.abspath(path))
+  root, ext = os.path.splitext(name)
+  pattern = re.compile(re.escape(root) + r'\.v(\d+)' + re.escape(ext) + '$')
+  if not os.path.isdir(directory): return []
+  matches = [pattern.match(f) for f in os.listdir(directory)]
+  return sorted(int(match.group(1)) for match in matches if match)
+
+def resolve(path, version = None):
+  """
+  The file to load the weights of path from: its checkpoint version, by
+  default the latest checkpoint, or path itself if it has none.
+  """
+  if version != None:
+    return checkpointPath(path, version)
+  versions = checkpointVersions(path)
+  if versions:
+    return checkpointPath(path, versions[-1])
+  return path
+
+###########
+# Storage #
+###########
+
+WEIGHT_CACHE = {}
+
+@contextlib.contextmanager
+def lock(path):
+  "Holds an exclusive lock on path.lock (no lock without fcntl)"
+  with open(path + '.lock', 'a') as f:
+    if fcntl != None:
+      fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+      yield
+    finally:
+      if fcntl != None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+def read(path):
+  """
+  The weights in path, from the cache unless the file changed since it was
+  read.  The returned dict is shared; load gives a copy.
+  """
+  path = os.path.abspath(path)
+  stat = os.stat(path)
+  key = (stat.st_mtime_ns, stat.st_size)
+  cached = WEIGHT_CACHE.get(path)
+  if cached == None or cached[0] != key:
+    with open(path, 'r') as f:
+      cached = (key, parse(f.read()))
+    WEIGHT_CACHE[path] = cached
+  return cached[1]
+
+def load(path, version = None):
+  """
+  A copy of the weights of path (see resolve), or None if there is no such
+  file.
+  """
+  path = resolve(path, version)
+  if not os.path.exists(path): return None
+  return copy.deepcopy(read(path))
+
+def write(path, weights):
+  "Writes weights to path, replacing the file only once it is complete"
+  text = dumps(weights)
+  with open(path + '.tmp', 'w') as f:
+    f.write(text)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(path + '.tmp', path)
+
+def save(path, weights):
+  "Writes weights to path while holding its lock"
+  with lock(path):
+    write(path, weights)
+
+def saveCheckpoint(path, weights):
+  "Writes weights as the next checkpoint of path and returns its version"
+  with lock(path):
+    versions = checkpointVersions(path)
+    version = versions[-1] + 1 if versions else 1
+    write(checkpointPath(path, version), weights)
+  return version
+
+if __name__ == '__main__':
+  if len(sys.argv) != 3:
+    print('Usage: python weightStore.py OLD_WEIGHTS NEW_WEIGHTS.json')
+    sys.exit(2)
+  save(sys.argv[2], read(sys.argv[1]))